@@ -1,8 +1,18 @@
 from flask import Flask
 from .db import db, migrate
-from .models import task, goal
+from .json_provider import make_json_provider
+from .pool import POOL_SETTINGS, build_engine_options, env_setting
+from .replicas import replica_router
+from . import lazy_loads
+from . import counters
+from .notifications import notifier
+from .cache import response_cache
+from .instrumentation import instrumentation
+from .models import task, goal, outbox, resource_version
 from .routes.task_routes import tasks_bp
 from .routes.goal_routes import goals_bp
+from .routes.internal_routes import internal_bp
+from .commands import outbox_cli, goals_cli, tasks_cli
 import os
 
 def create_app(config=None):
@@ -11,16 +21,62 @@ def create_app(config=None):
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI')
 
+    # listings stay unpaginated unless a client sends ?limit=, set a number here to always paginate
+    app.config['PAGINATION_DEFAULT_LIMIT'] = None
+    app.config['PAGINATION_MAX_LIMIT'] = 1000
+
+    # rows fetched from the database at a time when streaming a listing
+    app.config['STREAM_BATCH_SIZE'] = 1000
+
+    # ids or rows sent to the database per statement by the bulk endpoints
+    app.config['BULK_CHUNK_SIZE'] = 5000
+
+    # "orjson" encodes responses with orjson when it's installed, "default" keeps the standard library
+    app.config['JSON_PROVIDER'] = os.environ.get('JSON_PROVIDER', 'orjson')
+
+    # GET /goals/<id>/stats reads the totals from the goal's counters, turn it off to count the tasks instead
+    app.config['STATS_USE_COUNTERS'] = True
+
+    # makes a relationship loading lazily during a GET request raise, see app/lazy_loads.py
+    app.config['RAISE_ON_LAZY_LOAD'] = False
+
+    # the operational endpoints under /_internal (pool, cache, replica and request stats)
+    # show the app's internals to whoever asks, so they're only served when turned on
+    app.config['INTERNAL_ENDPOINTS_ENABLED'] = env_setting('INTERNAL_ENDPOINTS_ENABLED', False)
+
+    # connection pool settings from the environment, see app/pool.py
+    for name, default in POOL_SETTINGS.items():
+        app.config[name] = env_setting(name, default)
+
     if config:
         # Merge `config` into the app's configuration
         # to override the app's default settings for testing
         app.config.update(config)
 
+    # engine options built from the pool settings, unless they were given outright
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+
+    app.json = make_json_provider(app)
+
+    # adds the read replicas to SQLALCHEMY_BINDS, so it has to come before db.init_app
+    replica_router.init_app(app)
     db.init_app(app)
+    replica_router.detach_metadata(app, db)
     migrate.init_app(app, db)
+    notifier.init_app(app)
+    response_cache.init_app(app)
+    instrumentation.init_app(app)
 
     # Register Blueprints here
     app.register_blueprint(tasks_bp)
     app.register_blueprint(goals_bp)
+    if app.config['INTERNAL_ENDPOINTS_ENABLED']:
+        app.register_blueprint(internal_bp)
+
+    # Register CLI commands here
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(goals_cli)
+    app.cli.add_command(tasks_cli)
 
     return app
@@ -0,0 +1,486 @@
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool, StaticPool
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers, QueryParams
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import http_date, parse_accept_header, quote_etag
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+from . import create_app
+from .cache import response_cache
+from .db import db
+from .json_provider import orjson
+from .models.goal import Goal
+from .models.outbox import OutboxEvent
+from .models.task import Task
+from .notifications import DELIVERY_MODES, RETRYABLE_STATUS_CODES, SLACK_POST_MESSAGE_URL, notifier
+from .pool import POOL_SETTINGS, env_setting
+from .routes.route_utilities import apply_sort, encode_cursor, get_sort_columns, keyset_condition, model_cache_entry, parse_cursor, versions_etag, versions_last_modified
+from .serializers import GOAL_FIELDS, GOAL_TASK_FIELDS, TASK_FIELDS, columns, goal_to_dict, serialize_goal_rows, serialize_task_rows
+from .versions import collect_versions, goal_version_names, versions_query
+import asyncio
+import httpx
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# the async deployment mode: the hot task and goal endpoints as a plain ASGI app on an async
+# SQLAlchemy engine (asyncpg on postgres, aiosqlite on sqlite) and an async slack client,
+# sharing the models and serializers of the flask app. a request waiting on the database or on
+# slack doesn't hold a thread, so one process keeps thousands of connections open.
+# every other request (updates and deletes, goal writes, bulk endpoints, search, stats, export)
+# falls through to the flask app, mounted over WSGI in the same process, so the whole api is
+# served. those requests run on a2wsgi's thread pool against the flask app's own sync engine.
+# so do the reads the async routes don't answer themselves (see FlaskReads): ?include=, streamed
+# listings, conditional requests, and every read once the flask app has replicas configured.
+# the async reads send the same ETag and Last-Modified headers and share the response cache,
+# and the async writes run flask's commit listeners, which clear the cache and the search index.
+#
+#   uvicorn --factory app.asgi:create_asgi_app --workers 4
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+class HTTPError(Exception):
+    def __init__(self, body, status_code):
+        self.body = body
+        self.status_code = status_code
+
+
+# json responses encoded with orjson when it's installed, like the flask app's provider
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+# the same settings the flask app reads, from the environment unless `config` has them
+def load_config(config=None):
+    settings = {
+        "SQLALCHEMY_DATABASE_URI": os.environ.get("SQLALCHEMY_DATABASE_URI"),
+        "PAGINATION_DEFAULT_LIMIT": None,
+        "PAGINATION_MAX_LIMIT": 1000,
+        "SLACK_NOTIFICATIONS_ENABLED": True,
+        "SLACK_DELIVERY": os.environ.get("SLACK_DELIVERY", "queue"),
+        "SLACK_API_URL": SLACK_POST_MESSAGE_URL,
+        "SLACK_API_KEY": os.environ.get("SLACK_API_KEY"),
+        "SLACK_CHANNEL": os.environ.get("CHANNEL"),
+        "SLACK_TIMEOUT": (3.05, 10),
+        "SLACK_POOL_SIZE": 4,
+        "SLACK_MAX_RETRIES": 3,
+        "SLACK_RETRY_BACKOFF": 0.5
+    }
+    for name, default in POOL_SETTINGS.items():
+        settings[name] = env_setting(name, default)
+
+    settings.update(config or {})
+
+    if settings["SLACK_DELIVERY"] not in DELIVERY_MODES:
+        raise ValueError(f"unknown SLACK_DELIVERY {settings['SLACK_DELIVERY']!r}")
+
+    return settings
+
+
+# postgresql://... becomes postgresql+asyncpg://..., sqlite:///... becomes sqlite+aiosqlite:///...
+def async_database_uri(database_uri):
+    url = make_url(database_uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver for {backend!r} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+# the async counterpart of app.pool.build_engine_options
+def build_async_engine_options(url, config):
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return {"poolclass": StaticPool}
+        return {}
+
+    if config["DB_PGBOUNCER"]:
+        # asyncpg prepares every statement, which breaks on PgBouncer's transaction pooling
+        return {
+            "poolclass": NullPool,
+            "connect_args": {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        }
+
+    options = {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"]
+    }
+    if config["DB_STATEMENT_TIMEOUT"]:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(config["DB_STATEMENT_TIMEOUT"])}}
+    return options
+
+
+# posts to slack's chat.postMessage over one pooled keep-alive httpx.AsyncClient,
+# retrying with exponential backoff like SlackDispatcher.deliver
+class AsyncSlackClient:
+    def __init__(self, config):
+        self.url = config["SLACK_API_URL"]
+        self.channel = config["SLACK_CHANNEL"]
+        self.max_retries = config["SLACK_MAX_RETRIES"]
+        self.retry_backoff = config["SLACK_RETRY_BACKOFF"]
+        connect_timeout, read_timeout = config["SLACK_TIMEOUT"]
+        self.client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {config['SLACK_API_KEY']}"},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=config["SLACK_POOL_SIZE"])
+        )
+        self.counters = {"sent": 0, "retries": 0, "failed": 0}
+
+    async def post_message(self, text):
+        return await self.client.post(self.url, json={"channel": self.channel, "text": text})
+
+    # returns True if slack accepted the message
+    async def deliver(self, text):
+        for attempt in range(self.max_retries + 1):
+            delay = self.retry_backoff * (2 ** attempt)
+
+            try:
+                response = await self.post_message(text)
+            except httpx.HTTPError as error:
+                logger.warning("slack post failed (attempt %s): %s", attempt + 1, error)
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    accepted = response.status_code < 400 and self._accepted(response)
+                    self.counters["sent" if accepted else "failed"] += 1
+                    return accepted
+
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                logger.warning("slack returned %s (attempt %s)", response.status_code, attempt + 1)
+
+            if attempt < self.max_retries:
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+
+        self.counters["failed"] += 1
+        return False
+
+    def _accepted(self, response):
+        try:
+            body = response.json()
+        except ValueError:
+            return True
+
+        if isinstance(body, dict) and body.get("ok") is False:
+            logger.error("slack rejected notification: %s", body.get("error"))
+            return False
+        return True
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def get_state(request):
+    return request.app.state
+
+
+def int_param(value, message):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError({"message": message}, 400)
+    if number < 1:
+        raise HTTPError({"message": message}, 400)
+    return number
+
+
+def model_id(cls, value):
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError({"message": f"invalid {cls.__name__} id"}, 400)
+
+
+# with for_update the row stays locked until the commit, like validate_model(..., for_update=True)
+async def get_model(session, cls, value, for_update=False):
+    model = await session.get(cls, model_id(cls, value), with_for_update=for_update)
+    if model is None:
+        raise HTTPError({"message": f"{cls.__name__} not found"}, 404)
+    return model
+
+
+# keyset pagination like app.routes.route_utilities.paginate, returning the rows and the next cursor
+async def paginate(request, session, query, sort_columns, sort_param):
+    config = get_state(request).config
+    limit_param = request.query_params.get("limit", config["PAGINATION_DEFAULT_LIMIT"])
+    cursor = request.query_params.get("cursor")
+
+    if limit_param is None and cursor:
+        limit_param = config["PAGINATION_MAX_LIMIT"]
+
+    if limit_param is None:
+        return (await session.execute(apply_sort(query, sort_columns))).all(), None
+
+    limit = min(int_param(limit_param, "invalid limit"), config["PAGINATION_MAX_LIMIT"])
+
+    if cursor:
+        try:
+            values = parse_cursor(cursor, sort_param, sort_columns)
+        except ValueError:
+            raise HTTPError({"message": "invalid cursor"}, 400)
+        query = query.where(keyset_condition(sort_columns, values))
+
+    rows = (await session.execute(apply_sort(query, sort_columns).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort_param, [getattr(rows[-1], column.key) for column, _ in sort_columns])
+
+    return rows, next_cursor
+
+
+def page_response(request, body, next_cursor, headers=None):
+    response = FastJSONResponse(body, headers=headers)
+    if next_cursor:
+        args = dict(request.query_params)
+        args["cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.path}?{urlencode(args)}>; rel="next"'
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+# the ETag and Last-Modified the flask app sends with a listing that depends on `version_names`.
+# conditional requests go to flask, so these are only ever sent, never compared.
+async def listing_headers(request, session, version_names):
+    rows = (await session.execute(versions_query(version_names))).all()
+    versions = collect_versions(version_names, rows)
+    full_path = f"{request.url.path}?{request.scope['query_string'].decode()}"
+
+    headers = {"ETag": quote_etag(versions_etag(versions, full_path, False)), "Vary": "Accept"}
+    last_modified = versions_last_modified(versions)
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+# answers GET /<model>/<id> from the flask app's response cache, like make_cached_model_response
+async def cached_model_response(session, cls, value, build_body):
+    row_id = model_id(cls, value)
+
+    entry = response_cache.get(cls, row_id)
+    if entry is None:
+        writes_before = response_cache.write_count()
+        model = await get_model(session, cls, row_id)
+        entry = model_cache_entry(model, build_body(model))
+        response_cache.set_unless_written(cls, row_id, entry, writes_before)
+
+    last_modified = datetime.fromtimestamp(entry["last_modified"], timezone.utc)
+    return FastJSONResponse(
+        entry["body"], headers={"ETag": quote_etag(entry["etag"]), "Last-Modified": http_date(last_modified)}
+    )
+
+
+async def get_all_tasks(request, session):
+    headers = await listing_headers(request, session, ["tasks"])
+    query = select(*columns(Task, TASK_FIELDS))
+
+    title_param = request.query_params.get("title")
+    if title_param:
+        query = query.where(Task.title.ilike(f"%{title_param}%"))
+
+    sort_param = request.query_params.get("sort")
+    rows, next_cursor = await paginate(request, session, query, get_sort_columns(Task, sort_param), sort_param)
+    return page_response(request, serialize_task_rows(rows), next_cursor, headers)
+
+
+async def create_task(request, session):
+    try:
+        request_body = await request.json()
+    except ValueError:
+        request_body = None
+
+    if not isinstance(request_body, dict) or not request_body.get("title") or not request_body.get("description"):
+        raise HTTPError({"details": "Invalid data"}, 400)
+
+    new_task = Task(title=request_body["title"], description=request_body["description"])
+    session.add(new_task)
+    await session.commit()
+
+    return FastJSONResponse({"task": new_task.to_dict()}, status_code=201)
+
+
+async def get_one_task(request, session):
+    return await cached_model_response(session, Task, request.path_params["task_id"], lambda task: {"task": task.to_dict()})
+
+
+# marks the task completed and tells slack once the commit went through. in "queue" mode the message
+# is posted after the response has been sent, in "outbox" mode it's written in the same transaction.
+async def mark_task_as_complete(request, session):
+    task = await get_model(session, Task, request.path_params["task_id"], for_update=True)
+    task.completed_at = datetime.now(timezone.utc)
+
+    state = get_state(request)
+    text = f"Someone just completed the task {task.title}"
+    background = None
+
+    if state.config["SLACK_NOTIFICATIONS_ENABLED"]:
+        if state.config["SLACK_DELIVERY"] == "outbox":
+            session.add(OutboxEvent(event_type="task.completed", payload={"task_id": task.id, "text": text}))
+        else:
+            background = BackgroundTask(state.slack.deliver, text)
+
+    await session.commit()
+
+    return FastJSONResponse({"task": task.to_dict()}, background=background)
+
+
+async def mark_task_as_incomplete(request, session):
+    task = await get_model(session, Task, request.path_params["task_id"], for_update=True)
+    task.completed_at = None
+    await session.commit()
+
+    return FastJSONResponse({"task": task.to_dict()})
+
+
+async def get_all_goals(request, session):
+    headers = await listing_headers(request, session, ["goals"])
+    query = select(*columns(Goal, GOAL_FIELDS))
+
+    title_param = request.query_params.get("title")
+    if title_param:
+        query = query.where(Goal.title.ilike(f"%{title_param}%"))
+
+    sort_param = request.query_params.get("sort")
+    rows, next_cursor = await paginate(request, session, query, get_sort_columns(Goal, sort_param), sort_param)
+    return page_response(request, serialize_goal_rows(rows), next_cursor, headers)
+
+
+async def get_one_goal(request, session):
+    return await cached_model_response(session, Goal, request.path_params["goal_id"], lambda goal: {"goal": goal.to_dict()})
+
+
+# the goal and its tasks in one outer join query, like the flask endpoint
+async def get_tasks_by_goal(request, session):
+    goal_id = model_id(Goal, request.path_params["goal_id"])
+    headers = await listing_headers(request, session, goal_version_names(goal_id))
+
+    query = (
+        select(Goal.id, Goal.title, *columns(Task, GOAL_TASK_FIELDS))
+        .outerjoin(Task, Task.goal_id == Goal.id)
+        .where(Goal.id == goal_id)
+        .order_by(Task.id)
+    )
+    rows = (await session.execute(query)).all()
+
+    if not rows:
+        raise HTTPError({"message": "Goal not found"}, 404)
+
+    task_rows = [row[2:] for row in rows if row[2] is not None]
+    response_body = goal_to_dict(rows[0][0], rows[0][1])
+    response_body["tasks"] = serialize_task_rows(task_rows)
+
+    return FastJSONResponse(response_body, headers=headers)
+
+
+# wraps a handler(request, session) into a starlette endpoint with a session per request.
+# the handler runs in the flask app's app context: the response cache lives there, and the
+# commit listeners of app/changes.py only run in it (sqlalchemy runs them in a greenlet that
+# carries the context along), so an async write clears what it changed like a flask write does.
+def endpoint(handler):
+    async def run(request):
+        state = get_state(request)
+        with state.flask_app.app_context():
+            async with state.sessionmaker() as session:
+                try:
+                    return await handler(request, session)
+                except HTTPError as error:
+                    return FastJSONResponse(error.body, status_code=error.status_code)
+
+    return run
+
+
+# sends the reads the async routes don't answer like flask would straight to the flask app:
+# ?include= and ?stream=, an Accept header that prefers ndjson, If-None-Match and If-Modified-Since
+# (the async routes never answer 304), and every read once the flask app reads from replicas,
+# which only its session knows how to route
+class FlaskReads:
+    def __init__(self, app, flask, replicas=False):
+        self.app = app
+        self.flask = flask
+        self.replicas = replicas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD") and self.is_flask_read(scope):
+            await self.flask(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    def is_flask_read(self, scope):
+        if self.replicas:
+            return True
+
+        headers = Headers(scope=scope)
+        if "if-none-match" in headers or "if-modified-since" in headers:
+            return True
+
+        query_params = QueryParams(scope["query_string"])
+        if "include" in query_params or "stream" in query_params:
+            return True
+
+        accept = parse_accept_header(headers.get("accept"), MIMEAccept)
+        return accept.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+
+# ids only match digits, so /tasks/search, /tasks/bulk and the like reach the flask app.
+# a path matched here with another method (PUT /tasks/1) also falls through to flask.
+ROUTES = [
+    Route("/tasks", endpoint(get_all_tasks), methods=["GET"]),
+    Route("/tasks", endpoint(create_task), methods=["POST"]),
+    Route("/tasks/{task_id:int}", endpoint(get_one_task), methods=["GET"]),
+    Route("/tasks/{task_id:int}/mark_complete", endpoint(mark_task_as_complete), methods=["PATCH"]),
+    Route("/tasks/{task_id:int}/mark_incomplete", endpoint(mark_task_as_incomplete), methods=["PATCH"]),
+    Route("/goals", endpoint(get_all_goals), methods=["GET"]),
+    Route("/goals/{goal_id:int}", endpoint(get_one_goal), methods=["GET"]),
+    Route("/goals/{goal_id:int}/tasks", endpoint(get_tasks_by_goal), methods=["GET"])
+]
+
+
+def create_asgi_app(config=None):
+    config = load_config(config)
+    url = async_database_uri(config["SQLALCHEMY_DATABASE_URI"])
+    engine = create_async_engine(url, **build_async_engine_options(url, config))
+
+    # the same settings, so both apps share the database, pagination and slack delivery
+    flask_app = create_app(dict(config))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await app.state.slack.close()
+        await engine.dispose()
+        notifier.get_dispatcher(flask_app).shutdown()
+        with flask_app.app_context():
+            for flask_engine in db.engines.values():
+                flask_engine.dispose()
+
+    flask = WSGIMiddleware(flask_app)
+    replicas = bool(flask_app.extensions["replica_router"]["keys"])
+    app = Starlette(
+        routes=ROUTES + [Mount("/", app=flask)],
+        middleware=[Middleware(FlaskReads, flask=flask, replicas=replicas)],
+        lifespan=lifespan
+    )
+    app.state.config = config
+    app.state.flask_app = flask_app
+    app.state.engine = engine
+    # objects stay usable after commit, the responses are built from them
+    app.state.sessionmaker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    app.state.slack = AsyncSlackClient(config)
+    return app
@@ -0,0 +1,228 @@
+from flask import current_app
+from collections import OrderedDict
+from .changes import on_commit
+import os
+import threading
+import time
+
+CACHE_BACKENDS = ("lru", "shared", "null")
+
+
+# an in-process least-recently-used cache where every entry also expires after `ttl` seconds.
+# each worker process has its own, so with several workers an entry written elsewhere
+# can be served stale for up to `ttl` seconds; use the shared backend when that matters.
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.counters["invalidations"] += 1
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+                self.counters["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["size"] = len(self._data)
+        return stats
+
+
+# a cache shared by every worker, kept in a redis-like server. `client` needs get(key),
+# set(key, value, ex=seconds), delete(key) and incr(key), which redis.Redis has.
+# deleting every key of a model isn't possible there, so keys carry a per-model
+# generation number that is bumped instead.
+class SharedCache:
+    def __init__(self, client, ttl=30, namespace="task-list"):
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _generation(self, prefix):
+        generation = self.client.get(f"{self.namespace}:{prefix}generation")
+        return int(generation or 0)
+
+    def _key(self, key):
+        prefix = key.split(":", 1)[0] + ":"
+        return f"{self.namespace}:{prefix}{self._generation(prefix)}:{key}"
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return current_app.json.loads(raw)
+
+    def set(self, key, value):
+        # stored as the json the client would get, so datetimes come back the way flask formats them
+        self.client.set(self._key(key), current_app.json.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+        self._count("invalidations")
+
+    def delete_prefix(self, prefix):
+        self.client.incr(f"{self.namespace}:{prefix}generation")
+        self._count("invalidations")
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+# caches nothing, for turning the cache off
+class NullCache:
+    def __init__(self):
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key):
+        self.counters["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def stats(self):
+        return dict(self.counters)
+
+
+# read-through cache for single-resource responses (GET /tasks/<id>, GET /goals/<id>),
+# keyed by model and id. entries are dropped after any commit that wrote their row,
+# and every entry of a model is dropped after a bulk statement on it.
+class ResponseCache:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RESPONSE_CACHE_BACKEND", os.environ.get("RESPONSE_CACHE_BACKEND", "lru"))
+        app.config.setdefault("RESPONSE_CACHE_MAXSIZE", 10_000)
+        app.config.setdefault("RESPONSE_CACHE_TTL", 30)
+        # the redis-like client for the "shared" backend
+        app.config.setdefault("RESPONSE_CACHE_CLIENT", None)
+
+        backend = app.config["RESPONSE_CACHE_BACKEND"]
+        if backend not in CACHE_BACKENDS:
+            raise ValueError(f"unknown RESPONSE_CACHE_BACKEND {backend!r}")
+
+        if backend == "lru":
+            store = LRUCache(app.config["RESPONSE_CACHE_MAXSIZE"], app.config["RESPONSE_CACHE_TTL"])
+        elif backend == "shared":
+            if app.config["RESPONSE_CACHE_CLIENT"] is None:
+                raise ValueError("RESPONSE_CACHE_BACKEND 'shared' needs RESPONSE_CACHE_CLIENT")
+            store = SharedCache(app.config["RESPONSE_CACHE_CLIENT"], app.config["RESPONSE_CACHE_TTL"])
+        else:
+            store = NullCache()
+
+        app.extensions["response_cache"] = {"store": store, "writes": 0, "lock": threading.Lock()}
+
+    def _state(self):
+        return current_app.extensions["response_cache"]
+
+    def get_store(self):
+        return self._state()["store"]
+
+    # returns the cached response for this row, or builds it with `load()` and caches it.
+    # if a commit invalidates anything while load() runs, or `cacheable()` says afterwards that
+    # what load() read may be stale, the result isn't cached, so a slow read or a lagging
+    # replica can't put back a row that was just changed.
+    def get_or_load(self, cls, model_id, load, cacheable=lambda: True):
+        cached = self.get(cls, model_id)
+        if cached is not None:
+            return cached
+
+        writes_before = self.write_count()
+        value = load()
+
+        if cacheable():
+            self.set_unless_written(cls, model_id, value, writes_before)
+
+        return value
+
+    # the pieces of get_or_load, for callers whose load can't be a plain function (the async app).
+    # read write_count() before loading and hand it to set_unless_written() afterwards.
+    def get(self, cls, model_id):
+        return self.get_store().get(f"{cls.__name__}:{model_id}")
+
+    def write_count(self):
+        return self._state()["writes"]
+
+    def set_unless_written(self, cls, model_id, value, writes_before):
+        state = self._state()
+        with state["lock"]:
+            if state["writes"] == writes_before:
+                state["store"].set(f"{cls.__name__}:{model_id}", value)
+
+    def invalidate(self, changes):
+        state = self._state()
+
+        with state["lock"]:
+            state["writes"] += 1
+            for cls in changes.bulk:
+                state["store"].delete_prefix(f"{cls.__name__}:")
+            for cls, model_id in changes.rows:
+                state["store"].delete(f"{cls.__name__}:{model_id}")
+
+    def stats(self):
+        stats = self.get_store().stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+response_cache = ResponseCache()
+
+
+@on_commit
+def _invalidate_cached_responses(changes):
+    if "response_cache" in current_app.extensions:
+        response_cache.invalidate(changes)
@@ -0,0 +1,108 @@
+from flask import has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# key in session.info where the rows touched by the current transaction are collected
+CHANGES_KEY = "pending_changes"
+
+_commit_listeners = []
+
+
+# the rows one transaction wrote, handed to every commit listener once it has committed.
+#   rows: (model class, id) -> dict of the row's loaded column values, or None if it was deleted
+#   bulk: model classes changed by bulk INSERT/UPDATE/DELETE statements that didn't say which rows
+#   goal_ids: goals whose tasks (or themselves) changed, including the goal a task moved away from
+class ChangeSet:
+    def __init__(self):
+        self.rows = {}
+        self.bulk = set()
+        self.goal_ids = set()
+
+    def __bool__(self):
+        return bool(self.rows or self.bulk or self.goal_ids)
+
+    def touched(self, cls):
+        return cls in self.bulk or any(model is cls for model, _ in self.rows)
+
+
+def get_changes(session):
+    return session.info.setdefault(CHANGES_KEY, ChangeSet())
+
+
+# registers `listener(changes)` to run after every commit that wrote something.
+# listeners run inside the app context of the commit, and can't emit sql.
+def on_commit(listener):
+    _commit_listeners.append(listener)
+    return listener
+
+
+# lets routes that write with bulk statements say exactly which rows (and goals) they touched.
+# pair it with .execution_options(changes_recorded=True) on the statement,
+# otherwise the statement also marks the whole model as changed.
+def record_bulk_changes(session, cls, ids=(), goal_ids=(), deleted=False):
+    changes = get_changes(session)
+    for model_id in ids:
+        changes.rows[(cls, model_id)] = None if deleted else {}
+    changes.goal_ids.update(goal_id for goal_id in goal_ids if goal_id is not None)
+
+
+def _snapshot(instance):
+    state = inspect(instance)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+
+def _goal_ids_of(instance):
+    if type(instance).__tablename__ == "goal":
+        return {instance.id}
+
+    goal_ids = set()
+    if "goal_id" in type(instance).__mapper__.column_attrs:
+        history = inspect(instance).attrs.goal_id.history
+        goal_ids.update(history.deleted or ())
+        goal_ids.update(history.unchanged or ())
+        goal_ids.update(history.added or ())
+    return {goal_id for goal_id in goal_ids if goal_id is not None}
+
+
+# copies what the flush wrote while the values are still at hand
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_changes(session, flush_context):
+    changes = get_changes(session)
+
+    for instance in list(session.new) + list(session.dirty):
+        if not session.is_modified(instance) and instance not in session.new:
+            continue
+        changes.rows[(type(instance), instance.id)] = _snapshot(instance)
+        changes.goal_ids.update(_goal_ids_of(instance))
+
+    for instance in session.deleted:
+        changes.rows[(type(instance), instance.id)] = None
+        changes.goal_ids.update(_goal_ids_of(instance))
+
+
+# bulk statements run through the session don't go through the flush
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get("changes_recorded"):
+        return
+
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        get_changes(orm_execute_state.session).bulk.add(mapper.class_)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    changes = session.info.pop(CHANGES_KEY, None)
+    if not changes or not has_app_context():
+        return
+
+    for listener in _commit_listeners:
+        listener(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(CHANGES_KEY, None)
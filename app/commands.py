@@ -0,0 +1,170 @@
+from flask.cli import AppGroup
+from datetime import datetime, timedelta
+from .counters import recount_goal_counters
+from .db import db
+from .models.outbox import OutboxEvent
+from .notifications import notifier
+from .transfer import FORMATS, TaskImportError, export_tasks, format_of, import_tasks
+import click
+import sys
+import time
+
+# creates the `flask outbox ...` command group
+outbox_cli = AppGroup("outbox", help="Deliver events written to the outbox table.")
+
+# creates the `flask goals ...` command group
+goals_cli = AppGroup("goals", help="Maintain goals.")
+
+# creates the `flask tasks ...` command group
+tasks_cli = AppGroup("tasks", help="Export and import tasks in bulk.")
+
+
+# claims up to batch_size undelivered events that no other drainer holds, in a transaction of
+# its own: each event gets claimed_until (now + lease seconds) and an attempt, and the claim is
+# committed before anything is sent, so no row lock is held while slack is called and retried.
+# an event whose drainer died mid-send is claimed again once its lease runs out.
+# on postgres the rows are picked with FOR UPDATE SKIP LOCKED so several drainers can claim
+# side by side without taking the same events. sqlite has no row locks (writers are serialized
+# anyway), so there only one drainer should run at a time.
+# returns (id, text) of each claimed event.
+def claim_outbox_batch(batch_size, max_attempts, lease):
+    now = datetime.utcnow()
+    query = (
+        db.select(OutboxEvent)
+        .where(
+            OutboxEvent.delivered_at.is_(None),
+            OutboxEvent.attempts < max_attempts,
+            db.or_(OutboxEvent.claimed_until.is_(None), OutboxEvent.claimed_until < now)
+        )
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+    )
+
+    if db.engine.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    claimed = []
+    for event in db.session.scalars(query):
+        event.attempts += 1
+        event.claimed_until = now + timedelta(seconds=lease)
+        claimed.append((event.id, event.payload["text"]))
+
+    db.session.commit()
+    return claimed
+
+
+# records how the delivery of `event_ids` went and gives up their claim, in one short transaction
+def finish_outbox_batch(event_ids, delivered):
+    if delivered:
+        values = {"delivered_at": datetime.utcnow(), "last_error": None, "claimed_until": None}
+    else:
+        values = {"last_error": "slack did not accept the message", "claimed_until": None}
+
+    db.session.execute(db.update(OutboxEvent).where(OutboxEvent.id.in_(event_ids)).values(**values))
+    db.session.commit()
+
+
+# claims one batch of events, delivers it as a single slack post and records the outcome.
+# returns how many events were claimed, so callers know when the outbox is empty.
+def drain_outbox_batch(batch_size=100, max_attempts=5, lease=300):
+    claimed = claim_outbox_batch(batch_size, max_attempts, lease)
+    if not claimed:
+        return 0
+
+    dispatcher = notifier.get_dispatcher()
+    delivered = dispatcher.deliver([text for _, text in claimed])
+
+    finish_outbox_batch([event_id for event_id, _ in claimed], delivered)
+    return len(claimed)
+
+
+@outbox_cli.command("drain")
+@click.option("--batch-size", default=100, show_default=True, help="Events claimed and sent per slack post.")
+@click.option("--max-attempts", default=5, show_default=True, help="Events that failed this often are skipped.")
+@click.option("--lease", default=300, show_default=True, help="Seconds a claimed batch is held, longer than slack's retries take.")
+@click.option("--loop", is_flag=True, help="Keep polling for new events instead of exiting when empty.")
+@click.option("--interval", default=1.0, show_default=True, help="Seconds to wait between polls with --loop.")
+def drain_outbox(batch_size, max_attempts, lease, loop, interval):
+    total = 0
+    start = time.perf_counter()
+
+    while True:
+        claimed = drain_outbox_batch(batch_size, max_attempts, lease)
+        total += claimed
+
+        if claimed:
+            continue
+        if not loop:
+            break
+        time.sleep(interval)
+
+    elapsed = time.perf_counter() - start
+    click.echo(f"Drained {total} outbox events in {elapsed:.2f}s")
+
+
+# rebuilds every goal's task_count and completed_count from its tasks, for counters
+# that drifted (say, after tasks were changed with sql outside the app)
+@goals_cli.command("recount")
+def recount_goals():
+    start = time.perf_counter()
+    count = recount_goal_counters(db.session)
+    db.session.commit()
+
+    elapsed = time.perf_counter() - start
+    click.echo(f"Recounted the tasks of {count} goals in {elapsed:.2f}s")
+
+
+def open_transfer_file(path, mode):
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def report_rate(verb, count, elapsed, extra="", err=False):
+    rate = count / elapsed if elapsed else 0
+    click.echo(f"{verb} {count} tasks{extra} in {elapsed:.2f}s ({rate:,.0f} rows/s)", err=err)
+
+
+# streams every task, with its goal's id and title, to PATH (- for stdout) as ndjson or csv
+@tasks_cli.command("export")
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True))
+@click.option("--format", "file_format", type=click.Choice(FORMATS), help="Defaults to csv for a .csv PATH, ndjson otherwise.")
+@click.option("--batch-size", default=10_000, show_default=True, help="Rows fetched from the database at a time.")
+def export_tasks_command(path, file_format, batch_size):
+    file_format = file_format or format_of(path)
+    start = time.perf_counter()
+
+    out = open_transfer_file(path, "w")
+    try:
+        count = export_tasks(out, file_format, batch_size)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    db.session.rollback()
+
+    report_rate("Exported", count, time.perf_counter() - start, err=path == "-")
+
+
+# adds the tasks of an export (PATH, - for stdin) as new tasks in one transaction, keeping
+# their goal links. a row that can't be imported rolls back the whole import.
+@tasks_cli.command("import")
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True))
+@click.option("--format", "file_format", type=click.Choice(FORMATS), help="Defaults to csv for a .csv PATH, ndjson otherwise.")
+@click.option("--chunk-size", default=10_000, show_default=True, help="Rows written per statement.")
+@click.option("--no-copy", is_flag=True, help="Use INSERTs on postgres too, instead of COPY.")
+def import_tasks_command(path, file_format, chunk_size, no_copy):
+    file_format = file_format or format_of(path)
+    start = time.perf_counter()
+
+    source = open_transfer_file(path, "r")
+    try:
+        count, goals_created = import_tasks(source, file_format, chunk_size, use_copy=not no_copy)
+        db.session.commit()
+    except TaskImportError as error:
+        db.session.rollback()
+        raise click.ClickException(f"Nothing imported, {error}")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    report_rate("Imported", count, time.perf_counter() - start, f" ({goals_created} new goals)")
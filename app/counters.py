@@ -0,0 +1,124 @@
+from sqlalchemy import bindparam, event, inspect
+from sqlalchemy.orm import Session
+from .db import db
+from .models.goal import Goal
+from .models.task import Task
+
+# key in session.info where the counter changes of the current transaction add up,
+# goal id -> [change in task_count, change in completed_count]
+COUNTER_DELTAS_KEY = "goal_counter_deltas"
+
+
+# Goal.task_count and Goal.completed_count follow the tasks incrementally: every transaction adds
+# up how many tasks each goal gained or lost and how many of them got completed or reopened, and
+# applies that with one UPDATE goal SET task_count = task_count + ... right before it commits.
+# tasks written through the ORM are counted by the flush listener below. routes that move or
+# delete tasks with bulk statements count those with adjust_goal_counters themselves.
+# `flask goals recount` rebuilds the counters from the tasks if they ever drift.
+def adjust_goal_counters(session, goal_id, tasks=0, completed=0):
+    if goal_id is None or not (tasks or completed):
+        return
+
+    delta = session.info.setdefault(COUNTER_DELTAS_KEY, {}).setdefault(goal_id, [0, 0])
+    delta[0] += tasks
+    delta[1] += completed
+
+
+# sets every goal's counters (or just those of goal_ids) from its tasks, with one UPDATE
+def recount_goal_counters(session, goal_ids=None):
+    goal = Goal.__table__
+    task = Task.__table__
+
+    statement = goal.update().values(
+        task_count=db.select(db.func.count(task.c.id)).where(task.c.goal_id == goal.c.id).scalar_subquery(),
+        completed_count=db.select(db.func.count(task.c.completed_at)).where(task.c.goal_id == goal.c.id).scalar_subquery(),
+        updated_at=goal.c.updated_at
+    )
+    if goal_ids is not None:
+        statement = statement.where(goal.c.id.in_(goal_ids))
+
+    return session.execute(statement.execution_options(changes_recorded=True)).rowcount
+
+
+def _old_and_new(state, key):
+    history = state.attrs[key].history
+    old = (history.deleted or history.unchanged or (None,))[0]
+    new = (history.added or history.unchanged or (None,))[0]
+    return old, new
+
+
+# the goal of a deleted task has to be known after the flush, so it's loaded now if it was expired
+@event.listens_for(Session, "before_flush")
+def _load_deleted_tasks(session, flush_context, instances):
+    for instance in session.deleted:
+        if isinstance(instance, Task) and {"goal_id", "completed_at"} & inspect(instance).unloaded:
+            session.refresh(instance, ["goal_id", "completed_at"])
+
+
+# goal_id is compared after the flush, since a task added to goal.tasks only gets it during the flush
+@event.listens_for(Session, "after_flush")
+def _count_flushed_tasks(session, flush_context):
+    for instance in session.new:
+        if isinstance(instance, Task):
+            adjust_goal_counters(session, instance.goal_id, 1, int(instance.completed_at is not None))
+
+    for instance in session.deleted:
+        if isinstance(instance, Task):
+            state = inspect(instance)
+            goal_id, _ = _old_and_new(state, "goal_id")
+            completed_at, _ = _old_and_new(state, "completed_at")
+            adjust_goal_counters(session, goal_id, -1, -int(completed_at is not None))
+
+    for instance in session.dirty:
+        if not isinstance(instance, Task) or not session.is_modified(instance):
+            continue
+
+        state = inspect(instance)
+        old_goal_id, new_goal_id = _old_and_new(state, "goal_id")
+        old_completed_at, new_completed_at = _old_and_new(state, "completed_at")
+        was_completed = int(old_completed_at is not None)
+        is_completed = int(new_completed_at is not None)
+
+        if old_goal_id == new_goal_id:
+            adjust_goal_counters(session, new_goal_id, 0, is_completed - was_completed)
+        else:
+            adjust_goal_counters(session, old_goal_id, -1, -was_completed)
+            adjust_goal_counters(session, new_goal_id, 1, is_completed)
+
+
+# the counters aren't part of a goal's response, so applying them leaves its updated_at
+# (and the cached response and etag that depend on it) alone
+@event.listens_for(Session, "before_commit")
+def _apply_goal_counters(session):
+    session.flush()
+
+    deltas = session.info.pop(COUNTER_DELTAS_KEY, None)
+    if not deltas:
+        return
+
+    # sorted so concurrent transactions lock the goal rows in the same order
+    rows = [
+        {"counted_goal_id": goal_id, "task_delta": tasks, "completed_delta": completed}
+        for goal_id, (tasks, completed) in sorted(deltas.items())
+        if tasks or completed
+    ]
+    if not rows:
+        return
+
+    goal = Goal.__table__
+    statement = (
+        goal.update()
+        .where(goal.c.id == bindparam("counted_goal_id"))
+        .values(
+            task_count=goal.c.task_count + bindparam("task_delta"),
+            completed_count=goal.c.completed_count + bindparam("completed_delta"),
+            updated_at=goal.c.updated_at
+        )
+        .execution_options(changes_recorded=True)
+    )
+    session.execute(statement, rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_goal_counters(session):
+    session.info.pop(COUNTER_DELTAS_KEY, None)
@@ -0,0 +1,241 @@
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter
+from .pool import env_setting
+import cProfile
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+# a request with this header is profiled when PROFILE_HEADER_ENABLED is on
+PROFILE_HEADER = "X-Profile"
+
+# the placeholder list of an IN (...), whatever the driver's paramstyle, so the same query
+# sent with a different number of ids still counts as the same statement
+PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+)"
+PLACEHOLDER_LIST = re.compile(rf"\(\s*{PLACEHOLDER}(?:\s*,\s*{PLACEHOLDER})*\s*\)")
+
+
+def statement_shape(statement):
+    return PLACEHOLDER_LIST.sub("(?)", " ".join(statement.split()))
+
+
+# what one request did, kept in flask.g while it runs
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slow_queries = 0
+        self.statements = Counter()
+        self.profiler = None
+
+
+# opt-in per-request instrumentation (INSTRUMENTATION_ENABLED):
+#   - counts the queries of every request and the time spent in them
+#   - sends both back in a Server-Timing header, next to the request's own time
+#   - logs queries slower than SLOW_QUERY_MS and requests slower than SLOW_REQUEST_MS
+#   - logs a possible N+1 when one statement runs N_PLUS_ONE_THRESHOLD or more times in a request
+#   - profiles a PROFILE_SAMPLE_RATE share of requests, and any request sending X-Profile
+#     when PROFILE_HEADER_ENABLED is on, with cProfile or pyinstrument (PROFILER) into PROFILE_DIR
+# the totals per endpoint are at GET /_internal/requests.
+# a streamed response is measured up to its first byte, the rest runs after the request hooks.
+class Instrumentation:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("INSTRUMENTATION_ENABLED", env_setting("INSTRUMENTATION_ENABLED", False))
+        app.config.setdefault("SLOW_QUERY_MS", env_setting("SLOW_QUERY_MS", 100))
+        app.config.setdefault("SLOW_REQUEST_MS", env_setting("SLOW_REQUEST_MS", 1000))
+        app.config.setdefault("N_PLUS_ONE_THRESHOLD", env_setting("N_PLUS_ONE_THRESHOLD", 10))
+        app.config.setdefault("PROFILE_SAMPLE_RATE", env_setting("PROFILE_SAMPLE_RATE", 0.0))
+        # lets any client ask for a profile, so keep it off where clients aren't trusted
+        app.config.setdefault("PROFILE_HEADER_ENABLED", env_setting("PROFILE_HEADER_ENABLED", False))
+        app.config.setdefault("PROFILER", os.environ.get("PROFILER", "cprofile"))
+        app.config.setdefault("PROFILE_DIR", os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "task-list-profiles")))
+
+        if app.config["PROFILER"] not in PROFILERS:
+            raise ValueError(f"unknown PROFILER {app.config['PROFILER']!r}")
+        if app.config["PROFILER"] == "pyinstrument" and pyinstrument is None:
+            raise ValueError("PROFILER 'pyinstrument' needs the pyinstrument package")
+
+        app.extensions["instrumentation"] = {"endpoints": {}, "lock": threading.Lock()}
+
+        if app.config["INSTRUMENTATION_ENABLED"]:
+            app.before_request(self._start_request)
+            app.after_request(self._finish_request)
+
+    def _state(self):
+        return current_app.extensions["instrumentation"]
+
+    def _start_request(self):
+        stats = g.request_stats = RequestStats()
+        if self._wants_profile():
+            stats.profiler = start_profiler(current_app.config["PROFILER"])
+
+    def _wants_profile(self):
+        config = current_app.config
+        if config["PROFILE_HEADER_ENABLED"] and request.headers.get(PROFILE_HEADER):
+            return True
+        return random.random() < config["PROFILE_SAMPLE_RATE"]
+
+    def _finish_request(self, response):
+        stats = g.pop("request_stats", None)
+        if stats is None:
+            return response
+
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or "<unmatched>"
+
+        if stats.profiler is not None:
+            response.headers[PROFILE_HEADER] = self._save_profile(stats.profiler, elapsed)
+
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+            f"app;dur={(elapsed - stats.db_time) * 1000:.2f}, total;dur={elapsed * 1000:.2f}"
+        )
+
+        repeated = self._find_repeated_statements(stats)
+        for shape, count in repeated:
+            logger.warning("possible N+1 in %s: ran %s times: %s", endpoint, count, shape)
+
+        if elapsed * 1000 >= current_app.config["SLOW_REQUEST_MS"]:
+            logger.warning(
+                "slow request (%.1f ms, %s queries, %.1f ms in the database): %s %s",
+                elapsed * 1000, stats.queries, stats.db_time * 1000, request.method, request.full_path
+            )
+
+        self._record(endpoint, stats, elapsed, len(repeated))
+        return response
+
+    def _find_repeated_statements(self, stats):
+        threshold = current_app.config["N_PLUS_ONE_THRESHOLD"]
+        return [(shape, count) for shape, count in stats.statements.most_common() if count >= threshold]
+
+    def _save_profile(self, profiler, elapsed):
+        directory = current_app.config["PROFILE_DIR"]
+        os.makedirs(directory, exist_ok=True)
+
+        path_name = request.path.strip("/").replace("/", ".") or "root"
+        name = f"{request.method}.{path_name}.{elapsed * 1000:.0f}ms.{time.time_ns()}"
+
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            name += ".prof"
+            profiler.dump_stats(os.path.join(directory, name))
+        else:
+            profiler.stop()
+            name += ".html"
+            with open(os.path.join(directory, name), "w") as profile_file:
+                profile_file.write(profiler.output_html())
+
+        logger.info("profiled %s %s into %s", request.method, request.full_path, os.path.join(directory, name))
+        return name
+
+    def _record(self, endpoint, stats, elapsed, repeated):
+        state = self._state()
+        with state["lock"]:
+            totals = state["endpoints"].setdefault(endpoint, {
+                "requests": 0, "queries": 0, "max_queries": 0, "db_time": 0.0, "time": 0.0,
+                "slow_queries": 0, "n_plus_one": 0
+            })
+            totals["requests"] += 1
+            totals["queries"] += stats.queries
+            totals["max_queries"] = max(totals["max_queries"], stats.queries)
+            totals["db_time"] += stats.db_time
+            totals["time"] += elapsed
+            totals["slow_queries"] += stats.slow_queries
+            totals["n_plus_one"] += bool(repeated)
+
+    # per endpoint: requests seen, queries per request (mean and max), mean database and total
+    # time, slow queries, and requests flagged as possible N+1, most queries per request first
+    def stats(self):
+        state = self._state()
+        with state["lock"]:
+            endpoints = {
+                endpoint: {
+                    "requests": totals["requests"],
+                    "queries_mean": round(totals["queries"] / totals["requests"], 2),
+                    "queries_max": totals["max_queries"],
+                    "db_ms_mean": round(totals["db_time"] / totals["requests"] * 1000, 3),
+                    "total_ms_mean": round(totals["time"] / totals["requests"] * 1000, 3),
+                    "slow_queries": totals["slow_queries"],
+                    "n_plus_one": totals["n_plus_one"]
+                }
+                for endpoint, totals in state["endpoints"].items()
+            }
+
+        ordered = sorted(endpoints.items(), key=lambda item: -item[1]["queries_mean"])
+        return {"enabled": current_app.config["INSTRUMENTATION_ENABLED"], "endpoints": dict(ordered)}
+
+
+def start_profiler(name):
+    if name == "pyinstrument":
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        return profiler
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # another profiler is already running on this thread
+        return None
+    return profiler
+
+
+instrumentation = Instrumentation()
+
+
+def _current_stats():
+    if not has_request_context():
+        return None
+    return g.get("request_stats")
+
+
+# the timers live on the connection, which is only used by one thread at a time
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    stats = _current_stats()
+    if not started or stats is None:
+        return
+
+    elapsed = time.perf_counter() - started.pop()
+    stats.queries += 1
+    stats.db_time += elapsed
+    stats.statements[statement_shape(statement)] += 1
+
+    if elapsed * 1000 >= current_app.config["SLOW_QUERY_MS"]:
+        stats.slow_queries += 1
+        logger.warning("slow query (%.1f ms) in %s: %s", elapsed * 1000, request.endpoint, statement_shape(statement))
+
+
+@event.listens_for(Engine, "handle_error")
+def _drop_query_timer(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
@@ -0,0 +1,27 @@
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class LazyLoadError(RuntimeError):
+    pass
+
+
+# with RAISE_ON_LAZY_LOAD on (the tests turn it on), a relationship that loads itself lazily
+# while a GET request is being handled raises instead of quietly running one more query per row.
+# read endpoints are supposed to select the columns they need or load relationships up front.
+# writes are left alone: the unit of work loads relationships it needs to flush, e.g. a goal's
+# tasks when the goal is deleted.
+@event.listens_for(Session, "do_orm_execute")
+def _refuse_lazy_loads(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    if not has_request_context() or request.method not in ("GET", "HEAD"):
+        return
+    if not current_app.config.get("RAISE_ON_LAZY_LOAD"):
+        return
+
+    instance = orm_execute_state.lazy_loaded_from
+    raise LazyLoadError(
+        f"lazy load from {instance.class_.__name__} {instance.identity} during {request.method} {request.path}"
+    )
@@ -1,12 +1,30 @@
+from sqlalchemy import DateTime, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..db import db
+from ..serializers import goal_to_dict
 from typing import TYPE_CHECKING
+from datetime import datetime
 
 # creates the layout of Goal table, will have id, title and lists of tasks as its attributes/columns.
 class Goal(db.Model):
+    # lets sorted goal listings (and their cursors) walk an index instead of sorting the table
+    __table_args__ = (
+        Index("ix_goal_title_id", "title", "id"),
+        Index("ix_goal_title_desc_id", text("title DESC"), "id"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     title: Mapped[str]
-    tasks: Mapped[list["Task"]] = relationship(back_populates="goal")
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # how many tasks the goal has and how many of them are complete, kept in step by app/counters.py
+    task_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    completed_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    # passive_deletes leaves a deleted goal's tasks to the database (and delete_goal) instead of
+    # loading every one of them to null its goal_id
+    tasks: Mapped[list["Task"]] = relationship(back_populates="goal", passive_deletes=True)
+
+    def to_dict(self):
+        return goal_to_dict(self.id, self.title)
 
 
 if TYPE_CHECKING:
@@ -0,0 +1,29 @@
+from sqlalchemy import DateTime, Index, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+from datetime import datetime
+from ..db import db
+
+# creates the layout of the outbox table. every event that has to leave the app (like the slack
+# message for a completed task) is written here in the same transaction as the change that caused it,
+# and the `flask outbox drain` command delivers it later.
+class OutboxEvent(db.Model):
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # keeps the drain query cheap once most of the table has been delivered
+        Index(
+            "ix_outbox_pending", "id",
+            postgresql_where=db.text("delivered_at IS NULL"),
+            sqlite_where=db.text("delivered_at IS NULL")
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    event_type: Mapped[str]
+    payload: Mapped[dict] = mapped_column(JSON)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int] = mapped_column(default=0)
+    # set while a drainer is sending the event, until when the claim holds
+    claimed_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]]
@@ -0,0 +1,14 @@
+from sqlalchemy import DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from ..db import db
+
+# creates the layout of the resource_version table: one counter per cached listing
+# ("tasks", "goals", "goal:<id>", ...) that goes up in the same transaction as every write
+# that changes what the listing would return. the etags of the read endpoints are built from it.
+class ResourceVersion(db.Model):
+    __tablename__ = "resource_version"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,18 +1,42 @@
-from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy import DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime
 from ..db import db
+from ..serializers import task_to_dict
 
 # creates the layout of Task table, will have id, title, description, an "is_complete", and the goal id(if applicable) 
 # associated with the tasks as attributes/columns.
 class Task(db.Model):
+    # indexes for the hot listing paths: sorting by title (asc and desc, ties broken by id)
+    # and the incomplete tasks. the trigram index for title search is postgres only,
+    # so it lives in the migration instead of here.
+    __table_args__ = (
+        Index("ix_task_title_id", "title", "id"),
+        Index("ix_task_title_desc_id", text("title DESC"), "id"),
+        Index(
+            "ix_task_incomplete", "id",
+            postgresql_where=text("completed_at IS NULL"),
+            sqlite_where=text("completed_at IS NULL")
+        ),
+        # completions per day for /tasks/stats and /goals/<id>/stats, read from the index alone
+        Index("ix_task_completed_at", "completed_at"),
+        Index("ix_task_goal_id_completed_at", "goal_id", "completed_at"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     title: Mapped[str]
     description: Mapped[str]
-    completed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
-    goal_id: Mapped[Optional[int]] = mapped_column(ForeignKey("goal.id"))
+    # active_history loads the old value even when a write replaces one that wasn't loaded,
+    # which the goal counters (app/counters.py) need to tell what changed
+    completed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, active_history=True)
+    goal_id: Mapped[Optional[int]] = mapped_column(ForeignKey("goal.id", ondelete="SET NULL"), index=True, active_history=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     goal: Mapped[Optional["Goal"]] = relationship(back_populates="tasks")
 
+    # the task as the api sends it back, with "goal_id" only when it belongs to a goal
+    def to_dict(self):
+        return task_to_dict(self.id, self.title, self.description, self.completed_at, self.goal_id)
+
 if TYPE_CHECKING:
     from .goal import Goal
@@ -0,0 +1,348 @@
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .db import db
+from .models.outbox import OutboxEvent
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+SLACK_POST_MESSAGE_URL = "https://slack.com/api/chat.postMessage"
+
+# status codes from slack that are worth trying again, anything else is treated as a final answer
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+# "queue" hands messages to the in-process dispatcher once the transaction commits,
+# "outbox" writes them to the outbox table for `flask outbox drain` to deliver
+DELIVERY_MODES = ("queue", "outbox")
+
+# key in session.info where messages wait for their transaction to commit
+PENDING_KEY = "pending_slack_notifications"
+
+
+# talks to slack's chat.postMessage over one pooled, keep-alive requests.Session per process,
+# so repeated posts reuse the same connection instead of paying a new tcp + tls handshake each time.
+# every call has explicit (connect, read) timeouts so a stalled slack can't hang a worker forever.
+class SlackClient:
+    def __init__(self, config):
+        self.url = config["SLACK_API_URL"]
+        self.api_key = config["SLACK_API_KEY"]
+        self.channel = config["SLACK_CHANNEL"]
+        self.timeout = config["SLACK_TIMEOUT"]
+        self.pool_size = config["SLACK_POOL_SIZE"]
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # sessions (and their sockets) are rebuilt after a fork so workers never share a connection
+    @property
+    def session(self):
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._build_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def _build_session(self):
+        session = requests.Session()
+        # retries are handled by the dispatcher with backoff, so the adapter never retries on its own
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+        return session
+
+    # builds the data for the slack api call and posts it
+    def post_message(self, text):
+        data = {
+            "channel": self.channel,
+            "text": text
+        }
+        return self.session.post(self.url, json=data, timeout=self.timeout)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+
+# holds the queue, worker threads and counters for one app.
+# messages go into a bounded queue and worker threads post them to slack in batches,
+# so the request that created the message never waits on slack.
+class SlackDispatcher:
+    def __init__(self, config, client=None):
+        self.client = client or SlackClient(config)
+        self.batch_size = config["SLACK_BATCH_SIZE"]
+        self.batch_window = config["SLACK_BATCH_WINDOW"]
+        self.max_retries = config["SLACK_MAX_RETRIES"]
+        self.retry_backoff = config["SLACK_RETRY_BACKOFF"]
+        self.overflow_policy = config["SLACK_OVERFLOW_POLICY"]
+        self.worker_count = config["SLACK_WORKERS"]
+
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown SLACK_OVERFLOW_POLICY {self.overflow_policy!r}")
+
+        self.queue = queue.Queue(maxsize=config["SLACK_QUEUE_SIZE"])
+        self.counters = {"queued": 0, "sent": 0, "batches": 0, "retries": 0, "failed": 0, "dropped": 0}
+        self._counters_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._workers = []
+        self._pid = None
+        self._stopping = threading.Event()
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self.counters[name] += amount
+
+    def stats(self):
+        with self._counters_lock:
+            stats = dict(self.counters)
+        stats["pending"] = self.queue.qsize()
+        return stats
+
+    # workers are started on first use (and again after a fork), since threads don't survive os.fork
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._workers:
+            return
+
+        with self._start_lock:
+            if self._pid == os.getpid() and self._workers:
+                return
+
+            self._stopping.clear()
+            self._workers = []
+            for number in range(self.worker_count):
+                worker = threading.Thread(
+                    target=self._run,
+                    name=f"slack-notifier-{number}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+            if self._pid is None:
+                # gives queued messages a short chance to go out when the process exits
+                atexit.register(self.shutdown, timeout=2)
+            self._pid = os.getpid()
+
+    # puts a message on the queue, applying the overflow policy when the queue is full
+    def submit(self, text):
+        self._ensure_started()
+
+        try:
+            self.queue.put_nowait(text)
+        except queue.Full:
+            if self.overflow_policy == "drop_newest":
+                self._count("dropped")
+                logger.warning("slack queue full, dropping new notification")
+                return False
+
+            # drop_oldest: make room by throwing away the message that has waited the longest
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self._count("dropped")
+                logger.warning("slack queue full, dropping oldest notification")
+            except queue.Empty:
+                pass
+
+            try:
+                self.queue.put_nowait(text)
+            except queue.Full:
+                self._count("dropped")
+                return False
+
+        self._count("queued")
+        return True
+
+    # waits until everything queued so far has been delivered, failed or dropped
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+
+        return True
+
+    def shutdown(self, timeout=5):
+        self.flush(timeout)
+        self._stopping.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        self.client.close()
+
+    # pulls one message (waiting for it), then whatever else shows up within the batch window
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            try:
+                if self.deliver(batch):
+                    self._count("sent", len(batch))
+                else:
+                    self._count("failed", len(batch))
+            except Exception:
+                logger.exception("slack notifier worker crashed while delivering a batch")
+                self._count("failed", len(batch))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    # slack answers most api errors (bad token, unknown channel) with a 200 and "ok": false
+    def _accepted(self, response):
+        try:
+            body = response.json()
+        except ValueError:
+            return True
+
+        if isinstance(body, dict) and body.get("ok") is False:
+            logger.error("slack rejected notification: %s", body.get("error"))
+            return False
+        return True
+
+    # sends a batch of messages to slack, retrying with exponential backoff on
+    # connection errors, rate limits and 5xx responses. returns True if slack accepted it.
+    def deliver(self, messages):
+        text = "\n".join(messages)
+        self._count("batches")
+
+        for attempt in range(self.max_retries + 1):
+            delay = self.retry_backoff * (2 ** attempt)
+
+            try:
+                response = self.client.post_message(text)
+            except requests.RequestException as error:
+                logger.warning("slack post failed (attempt %s): %s", attempt + 1, error)
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if response.status_code >= 400:
+                        logger.error("slack rejected notification with status %s", response.status_code)
+                        return False
+                    return self._accepted(response)
+
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                logger.warning("slack returned %s (attempt %s)", response.status_code, attempt + 1)
+
+            if attempt < self.max_retries:
+                self._count("retries")
+                if self._stopping.wait(delay):
+                    break
+
+        return False
+
+
+# flask extension that owns one SlackDispatcher per app, the same way db owns the engine.
+class SlackNotifier:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SLACK_NOTIFICATIONS_ENABLED", True)
+        app.config.setdefault("SLACK_DELIVERY", os.environ.get("SLACK_DELIVERY", "queue"))
+        app.config.setdefault("SLACK_API_URL", SLACK_POST_MESSAGE_URL)
+        app.config.setdefault("SLACK_API_KEY", os.environ.get("SLACK_API_KEY"))
+        app.config.setdefault("SLACK_CHANNEL", os.environ.get("CHANNEL"))
+        # (connect, read) timeouts in seconds for each post to slack
+        app.config.setdefault("SLACK_TIMEOUT", (3.05, 10))
+        # connections kept open to slack per process; match it to SLACK_WORKERS
+        app.config.setdefault("SLACK_POOL_SIZE", 4)
+        app.config.setdefault("SLACK_QUEUE_SIZE", 1000)
+        app.config.setdefault("SLACK_BATCH_SIZE", 20)
+        app.config.setdefault("SLACK_BATCH_WINDOW", 0.25)
+        app.config.setdefault("SLACK_MAX_RETRIES", 3)
+        app.config.setdefault("SLACK_RETRY_BACKOFF", 0.5)
+        app.config.setdefault("SLACK_OVERFLOW_POLICY", "drop_oldest")
+        app.config.setdefault("SLACK_WORKERS", 1)
+
+        if app.config["SLACK_DELIVERY"] not in DELIVERY_MODES:
+            raise ValueError(f"unknown SLACK_DELIVERY {app.config['SLACK_DELIVERY']!r}")
+
+        app.extensions["slack_client"] = SlackClient(app.config)
+        app.extensions["slack_notifier"] = SlackDispatcher(app.config, app.extensions["slack_client"])
+
+    def get_dispatcher(self, app=None):
+        app = app or current_app
+        return app.extensions["slack_notifier"]
+
+    def get_client(self, app=None):
+        app = app or current_app
+        return app.extensions["slack_client"]
+
+    # queues a message for slack and returns right away
+    def notify(self, text):
+        if not current_app.config["SLACK_NOTIFICATIONS_ENABLED"]:
+            return False
+
+        return self.get_dispatcher().submit(text)
+
+    # ties a message to the current db transaction: nothing is sent if the transaction
+    # rolls back, and nothing touches the network before the commit.
+    # call it before db.session.commit().
+    def publish(self, text, event_type, **payload):
+        if not current_app.config["SLACK_NOTIFICATIONS_ENABLED"]:
+            return
+
+        if current_app.config["SLACK_DELIVERY"] == "outbox":
+            payload["text"] = text
+            db.session.add(OutboxEvent(event_type=event_type, payload=payload))
+            return
+
+        pending = db.session().info.setdefault(PENDING_KEY, [])
+        pending.append((self.get_dispatcher(), text))
+
+
+# hands staged messages to their dispatcher once the transaction they belong to has committed
+@event.listens_for(Session, "after_commit")
+def _submit_pending_notifications(session):
+    for dispatcher, text in session.info.pop(PENDING_KEY, []):
+        dispatcher.submit(text)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_notifications(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+notifier = SlackNotifier()
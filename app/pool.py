@@ -0,0 +1,123 @@
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+import os
+import threading
+import time
+
+# the env variable each pool setting is read from, with its per-worker default.
+# a gunicorn worker holds at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so size these so that
+# workers * (pool size + overflow) stays under postgres' max_connections (or PgBouncer's pool).
+POOL_SETTINGS = {
+    "DB_POOL_SIZE": 5,
+    "DB_MAX_OVERFLOW": 5,
+    # seconds a request waits for a free connection before it fails
+    "DB_POOL_TIMEOUT": 10,
+    # seconds before a connection is replaced, under the usual idle timeouts of load balancers
+    "DB_POOL_RECYCLE": 1800,
+    # tests each connection with a cheap round trip when it's checked out,
+    # so a connection the database already dropped isn't handed to a request
+    "DB_POOL_PRE_PING": True,
+    # milliseconds postgres lets one statement run, 0 for no limit
+    "DB_STATEMENT_TIMEOUT": 30_000,
+    # for running behind PgBouncer in transaction pooling mode, see build_engine_options
+    "DB_PGBOUNCER": False
+}
+
+
+def env_setting(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes", "on")
+    if isinstance(default, float):
+        return float(value)
+    return int(value)
+
+
+# a QueuePool that also times how long checkouts wait for a free connection and counts
+# the ones that gave up, which is what connection starvation looks like from the app
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_stats = {"checkouts": 0, "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.wait_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.wait_stats["checkouts"] += 1
+                self.wait_stats["wait_total"] += waited
+                self.wait_stats["wait_max"] = max(self.wait_stats["wait_max"], waited)
+
+
+# turns the DB_* settings into SQLALCHEMY_ENGINE_OPTIONS for the database at `database_uri`.
+# in PgBouncer mode the app keeps no connections of its own (NullPool, PgBouncer is the pool)
+# and nothing relies on server-side prepared statements or per-connection settings, which
+# don't survive PgBouncer handing the server connection to another client after each transaction.
+def build_engine_options(database_uri, config):
+    if not database_uri:
+        return {}
+
+    url = make_url(database_uri)
+
+    # in-memory sqlite has a single connection that flask-sqlalchemy sets up itself
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    if config["DB_PGBOUNCER"]:
+        options = {"poolclass": NullPool, "pool_pre_ping": False}
+        if url.get_driver_name() == "psycopg":
+            # psycopg 3 prepares statements it sees often, psycopg2 never does
+            options["connect_args"] = {"prepare_threshold": None}
+        return options
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"]
+    }
+
+    if url.get_backend_name() == "postgresql" and config["DB_STATEMENT_TIMEOUT"]:
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"}
+
+    return options
+
+
+# what /_internal/pool shows about the pool of `engine`
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow()
+        })
+
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            wait_stats = dict(pool.wait_stats)
+        checkouts = wait_stats["checkouts"]
+        stats.update({
+            "checkouts": checkouts,
+            "timeouts": wait_stats["timeouts"],
+            "wait_mean_ms": round(wait_stats["wait_total"] / checkouts * 1000, 3) if checkouts else 0.0,
+            "wait_max_ms": round(wait_stats["wait_max"] * 1000, 3)
+        })
+
+    return stats
@@ -0,0 +1,238 @@
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import DateTime, column, event, func, select, table
+from .changes import on_commit
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REPLICA_SELECTIONS = ("round_robin", "least_latency")
+
+# session.info key holding the replica engine (or None for the primary) chosen for the current transaction
+REPLICA_CHOICE_KEY = "replica_engine"
+
+# cookie telling us a client wrote recently, and until when (epoch seconds) its reads go to the primary
+STICKY_COOKIE = "read_primary_until"
+
+# every write bumps resource_version.updated_at on the primary (see app/versions.py), so how far
+# a replica's newest version row trails the primary's is how far behind the replica is
+_resource_version = table("resource_version", column("updated_at", DateTime))
+LATEST_VERSION = select(func.max(_resource_version.c.updated_at))
+
+
+# sends the reads of GET requests to read replicas and everything else to the primary.
+# replicas are extra SQLALCHEMY_BINDS ("replica_0", "replica_1", ...) made from REPLICA_URIS.
+# a read stays on the primary when:
+#   - the request isn't a GET/HEAD, or the session has changes of its own waiting to be flushed
+#   - the client wrote something in the last REPLICA_STICKY_SECONDS (read-your-writes, via a cookie)
+#   - every replica is more than REPLICA_MAX_LAG seconds behind, or can't be reached
+# a replica is chosen once per transaction, so the version query behind an etag and the listing
+# it labels always read the same replica.
+class ReplicaRouter:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    # has to run before db.init_app, which creates the engines of the binds
+    def init_app(self, app):
+        replica_uris = os.environ.get("SQLALCHEMY_REPLICA_URIS", "")
+        app.config.setdefault("REPLICA_URIS", [uri for uri in replica_uris.split(",") if uri])
+        app.config.setdefault("REPLICA_SELECTION", os.environ.get("REPLICA_SELECTION", "round_robin"))
+        app.config.setdefault("REPLICA_MAX_LAG", 5.0)
+        # seconds between checks of each replica's lag and latency
+        app.config.setdefault("REPLICA_CHECK_INTERVAL", 1.0)
+        # should be longer than REPLICA_MAX_LAG, so a client never reads a replica that hasn't got its write
+        app.config.setdefault("REPLICA_STICKY_SECONDS", 10.0)
+
+        if app.config["REPLICA_SELECTION"] not in REPLICA_SELECTIONS:
+            raise ValueError(f"unknown REPLICA_SELECTION {app.config['REPLICA_SELECTION']!r}")
+
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        keys = []
+        for number, uri in enumerate(app.config["REPLICA_URIS"]):
+            key = f"replica_{number}"
+            binds[key] = uri
+            keys.append(key)
+
+        app.extensions["replica_router"] = {
+            "keys": keys,
+            "health": {key: {"lag": 0.0, "latency": 0.0, "checked_at": -math.inf, "reads": 0} for key in keys},
+            "primary_reads": 0,
+            "turn": itertools.count(),
+            "lock": threading.Lock()
+        }
+
+        app.after_request(self._stick_to_primary)
+
+    # flask-sqlalchemy gives every bind a metadata of its own, which db.create_all() and drop_all()
+    # would then run against. replicas get their tables from the primary, so theirs are dropped.
+    # call after db.init_app.
+    def detach_metadata(self, app, db):
+        for key in app.extensions["replica_router"]["keys"]:
+            db.metadatas.pop(key, None)
+
+    def _state(self):
+        return current_app.extensions["replica_router"]
+
+    # the replica engine a transaction's reads should use, or None for the primary
+    def choose(self, engines):
+        state = self._state()
+        if not state["keys"]:
+            return None
+
+        config = current_app.config
+        self._check_replicas(engines)
+
+        with state["lock"]:
+            healthy = [key for key in state["keys"] if state["health"][key]["lag"] <= config["REPLICA_MAX_LAG"]]
+            if not healthy:
+                state["primary_reads"] += 1
+                return None
+
+            if config["REPLICA_SELECTION"] == "least_latency":
+                key = min(healthy, key=lambda key: state["health"][key]["latency"])
+            else:
+                key = healthy[next(state["turn"]) % len(healthy)]
+
+            state["health"][key]["reads"] += 1
+
+        return engines[key]
+
+    # refreshes the lag and latency of replicas last checked more than REPLICA_CHECK_INTERVAL ago.
+    # only one request does the check, the others go on with what was measured last.
+    def _check_replicas(self, engines):
+        state = self._state()
+        now = time.monotonic()
+
+        due = []
+        with state["lock"]:
+            for key in state["keys"]:
+                health = state["health"][key]
+                if now - health["checked_at"] >= current_app.config["REPLICA_CHECK_INTERVAL"]:
+                    health["checked_at"] = now
+                    due.append(key)
+
+        if not due:
+            return
+
+        with engines[None].connect() as connection:
+            primary_latest = connection.scalar(LATEST_VERSION)
+
+        for key in due:
+            lag, latency = measure_replica(engines[key], primary_latest)
+            with state["lock"]:
+                health = state["health"][key]
+                health["lag"] = lag
+                # a moving average, so one slow check doesn't flip least_latency around
+                health["latency"] = latency if health["latency"] == 0.0 else 0.8 * health["latency"] + 0.2 * latency
+
+    # whether the session's current transaction read from a replica, whose rows may be behind the primary
+    def read_replica(self, session):
+        return session.info.get(REPLICA_CHOICE_KEY) is not None
+
+    def is_sticky(self):
+        until = request.cookies.get(STICKY_COOKIE)
+        try:
+            return until is not None and float(until) > time.time()
+        except ValueError:
+            return False
+
+    # after a request that committed a write, the client's reads go to the primary for a while
+    def _stick_to_primary(self, response):
+        if g.get("committed_writes") and self._state()["keys"]:
+            sticky_seconds = current_app.config["REPLICA_STICKY_SECONDS"]
+            response.set_cookie(
+                STICKY_COOKIE, str(round(time.time() + sticky_seconds, 3)),
+                max_age=math.ceil(sticky_seconds), httponly=True, samesite="Lax"
+            )
+        return response
+
+    def stats(self):
+        state = self._state()
+        with state["lock"]:
+            return {
+                "selection": current_app.config["REPLICA_SELECTION"],
+                "primary_reads": state["primary_reads"],
+                "replicas": [
+                    {
+                        "bind": key,
+                        "lag_s": round(state["health"][key]["lag"], 3),
+                        "latency_ms": round(state["health"][key]["latency"] * 1000, 3),
+                        "healthy": state["health"][key]["lag"] <= current_app.config["REPLICA_MAX_LAG"],
+                        "reads": state["health"][key]["reads"]
+                    }
+                    for key in state["keys"]
+                ]
+            }
+
+
+# returns (lag in seconds, round trip in seconds) of a replica. a replica that can't be
+# reached, or has none of the primary's writes yet, counts as infinitely behind.
+def measure_replica(engine, primary_latest):
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            replica_latest = connection.scalar(LATEST_VERSION)
+    except Exception:
+        logger.warning("read replica %s can't be reached", engine.url.render_as_string(), exc_info=True)
+        return math.inf, 0.0
+    latency = time.perf_counter() - start
+
+    if primary_latest is None:
+        return 0.0, latency
+    if replica_latest is None:
+        return math.inf, latency
+
+    return max(0.0, (primary_latest - replica_latest).total_seconds()), latency
+
+
+replica_router = ReplicaRouter()
+
+
+# flask-sqlalchemy's session, except that SELECTs of a GET request that would go to the
+# primary are sent to a replica when ReplicaRouter allows it
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+        if bind is None and self._reads_from_replica(engine, clause):
+            replica = self._transaction_replica()
+            if replica is not None:
+                return replica
+
+        return engine
+
+    # the first read of a transaction picks the replica, the rest of its reads reuse it
+    def _transaction_replica(self):
+        if REPLICA_CHOICE_KEY not in self.info:
+            self.info[REPLICA_CHOICE_KEY] = replica_router.choose(self._db.engines)
+        return self.info[REPLICA_CHOICE_KEY]
+
+    def _reads_from_replica(self, engine, clause):
+        if not has_request_context() or request.method not in ("GET", "HEAD"):
+            return False
+        if "replica_router" not in current_app.extensions or not getattr(clause, "is_select", False):
+            return False
+        if engine is not self._db.engines.get(None):
+            return False
+        if self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        return not replica_router.is_sticky()
+
+
+# the next transaction (after a commit, rollback or close) chooses again
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _forget_transaction_replica(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(REPLICA_CHOICE_KEY, None)
+
+
+@on_commit
+def _remember_committed_writes(changes):
+    if has_request_context():
+        g.committed_writes = True
@@ -1,9 +1,12 @@
-from flask import Blueprint, abort, make_response, request, Response
-from datetime import datetime, timezone
-from .route_utilities import validate_model
+from flask import Blueprint, abort, current_app, make_response, request, url_for, Response
+from .route_utilities import validate_model, validate_model_id, chunked, get_task_ids, get_sort_columns, paginate, make_page_response, wants_stream, make_stream_response, make_conditional_response, make_cached_model_response, get_nested_limit, encode_cursor, get_since_param
 from app.models.goal import Goal
 from app.models.task import Task
+from ..versions import goal_version_names
+from ..counters import adjust_goal_counters
 from ..db import db
+from ..stats import completion_stats, count_completions_per_day, count_tasks
+from ..serializers import GOAL_FIELDS, GOAL_TASK_FIELDS, columns, goal_to_dict, serialize_goal_rows, serialize_task_rows
 
 # creates the blueprint for our endpoints.
 goals_bp = Blueprint("goals_bp", __name__, url_prefix="/goals")
@@ -28,11 +31,7 @@ def create_goal():
     db.session.commit()
 
     # puts together dict response with new goal id and title
-    response = {
-        "goal":{
-        "id": new_goal.id,
-        "title": new_goal.title,
-    }}
+    response = {"goal": new_goal.to_dict()}
     
     return response, 201
 
@@ -42,118 +41,272 @@ def create_task_with_goal(goal_id):
     # turning json into python dict
     request_body = request.get_json()
 
-    if not request_body.get("task_ids") or not isinstance(request_body["task_ids"], list):
-        return {"details": "Invalid data"}, 400
-
-    # will get the goal with goal_id from database
-    goal = Goal.query.get(goal_id)
+    # returns 400 if task_ids is missing, not a list or not all ids
+    task_ids = get_task_ids(request_body)
 
-    # not sure if this would be wanted or needed
-    # if not goal:
-    #     return {"message": f"Goal with id {goal_id} not found"}, 404
+    # handles data validation and error responses as needed, once for the whole request
+    goal = validate_model(Goal, goal_id)
 
-    # creates an empty list to put the task_ids into
-    new_task_ids = []
-    
-    # for each task_id in the request body, it will find that in the db 
-    # and if task exists than it will add the ids from that task to new_task_ids list
-    for task_id in request_body["task_ids"]:
-        task = Task.query.get(task_id)
-        if task:
-            task.goal = goal  
-            new_task_ids.append(task.id)  
+    # links the tasks to the goal with one UPDATE ... WHERE id IN (...) per chunk of ids,
+    # and RETURNING tells us which of the ids actually exist without selecting them first
+    unique_task_ids = list(dict.fromkeys(task_ids))
+    linked_task_ids = set()
+
+    for chunk in chunked(unique_task_ids, current_app.config["BULK_CHUNK_SIZE"]):
+        # the goal counters need the goal each task moves away from. the rows are locked
+        # (FOR UPDATE, on databases that have it) until the commit, so a concurrent relink of
+        # the same tasks waits and then reads the goal_id this one wrote, instead of counting
+        # the same move twice. locked in id order so two relinks can't deadlock.
+        moving = db.session.execute(
+            db.select(Task.goal_id, Task.completed_at)
+            .where(Task.id.in_(chunk))
+            .order_by(Task.id)
+            .with_for_update()
+        )
+        for old_goal_id, completed_at in moving:
+            if old_goal_id != goal.id:
+                completed = int(completed_at is not None)
+                adjust_goal_counters(db.session, old_goal_id, -1, -completed)
+                adjust_goal_counters(db.session, goal.id, 1, completed)
+
+        statement = (
+            db.update(Task)
+            .where(Task.id.in_(chunk))
+            .values(goal_id=goal.id)
+            .returning(Task.id)
+        )
+        linked_task_ids.update(db.session.scalars(statement))
 
     # it will save those changes of linking the task and id to the db
     db.session.commit()
 
     # builds a dictionary that will show the goal_id 
-    # and list of all task ids associated/linked to that goal
+    # and list of all task ids associated/linked to that goal, in the order they were sent
     response = {
         "id": goal.id,
-        "task_ids": new_task_ids  
+        "task_ids": [task_id for task_id in unique_task_ids if task_id in linked_task_ids]
     }
 
+    # lets the client know about any ids that didn't match a task
+    missing_task_ids = [task_id for task_id in unique_task_ids if task_id not in linked_task_ids]
+    if missing_task_ids:
+        response["missing_task_ids"] = missing_task_ids
+
     return response, 200
 
-# will get a list of all goals.
+# will get a list of all goals, or 304 if the client's copy is still current.
+# with ?include=tasks every goal comes with its tasks, see build_goals_with_tasks_response
 @goals_bp.get("")
 def get_all_goals():
-    # this will select all the goals 
-    query = db.select(Goal)
+    if includes_tasks():
+        return make_conditional_response(["goals", "tasks"], build_goals_with_tasks_response)
+
+    return make_conditional_response(["goals"], build_all_goals_response)
+
+def build_all_goals_response():
+    # this will select the id and title of all the goals
+    query = db.select(*columns(Goal, GOAL_FIELDS))
 
     title_param = request.args.get("title")
 
     if title_param:
         query = query.where(Goal.title.ilike(f"%{title_param}%"))
     
+    # this will order the goals by title if asked to, and then by goal_id
     sort_param = request.args.get("sort")
-    
-    if sort_param == "asc":
-        query = query.order_by(Goal.title)
-    
-    if sort_param == "desc":
-        query = query.order_by(Goal.title.desc())
-    
-    # this will order the goals by goal_id
-    query = query.order_by(Goal.id)
+    sort_columns = get_sort_columns(Goal, sort_param)
 
-    # this will retrieve all those goals we selected into variable named goals
-    goals = db.session.scalars(query)
-
-    goals_response = []
+    # this will retrieve the goals we selected into variable named goals,
+    # one page at a time if the client sent ?limit= or ?cursor=
+    goals, next_cursor = paginate(query, sort_columns, sort_param)
 
     # builds a dict that will have a list of all the goals with their id and title
-    for goal in goals:
-        goals_response.append({
-            "id": goal.id,
-            "title": goal.title,
-        })
+    goals_response = serialize_goal_rows(goals)
+
+    return make_page_response(goals_response, next_cursor)
+
+# ?include=tasks asks for goals with their tasks nested in them, anything else is a 400
+def includes_tasks():
+    include_param = request.args.get("include")
+
+    if include_param is None:
+        return False
+
+    if include_param != "tasks":
+        abort(make_response({"message": "invalid include"}, 400))
+
+    return True
 
-    return goals_response
+# the page of goals (same filters, sort and cursor as without ?include=tasks), each with a "tasks" list.
+# all the tasks of the page are loaded with one IN query per chunk of goals instead of a query per goal.
+# ?tasks_limit= keeps only the first tasks of every goal, and a goal with more gets a "tasks_next"
+# url that pages through the rest with GET /goals/<id>?include=tasks.
+def build_goals_with_tasks_response():
+    query = db.select(*columns(Goal, GOAL_FIELDS))
+
+    title_param = request.args.get("title")
+
+    if title_param:
+        query = query.where(Goal.title.ilike(f"%{title_param}%"))
+
+    sort_param = request.args.get("sort")
+    goals, next_cursor = paginate(query, get_sort_columns(Goal, sort_param), sort_param)
+    goals_response = serialize_goal_rows(goals)
+
+    tasks_limit = get_nested_limit("tasks_limit")
+    tasks_by_goal = {goal["id"]: [] for goal in goals_response}
+
+    for chunk in chunked(list(tasks_by_goal), current_app.config["BULK_CHUNK_SIZE"]):
+        for task in serialize_task_rows(db.session.execute(goal_tasks_query(chunk, tasks_limit))):
+            tasks_by_goal[task["goal_id"]].append(task)
+
+    for goal in goals_response:
+        tasks = tasks_by_goal[goal["id"]]
+
+        # one extra task per goal was loaded to tell if there are more
+        if tasks_limit is not None and len(tasks) > tasks_limit:
+            tasks = tasks[:tasks_limit]
+            goal["tasks_next"] = url_for(
+                "goals_bp.get_one_goal",
+                goal_id=goal["id"],
+                include="tasks",
+                limit=tasks_limit,
+                cursor=encode_cursor(None, [tasks[-1]["id"]])
+            )
+
+        goal["tasks"] = tasks
+
+    return make_page_response(goals_response, next_cursor)
+
+# the tasks of `goal_ids` ordered by goal and id. with a limit, a window function numbers
+# the tasks of each goal so that only the first limit + 1 of every goal are sent back.
+def goal_tasks_query(goal_ids, limit=None):
+    query = db.select(*columns(Task, GOAL_TASK_FIELDS)).where(Task.goal_id.in_(goal_ids))
+
+    if limit is None:
+        return query.order_by(Task.goal_id, Task.id)
+
+    position = db.func.row_number().over(partition_by=Task.goal_id, order_by=Task.id).label("position")
+    ranked = query.add_columns(position).subquery()
+
+    return (
+        db.select(*(ranked.c[field] for field in GOAL_TASK_FIELDS))
+        .where(ranked.c.position <= limit + 1)
+        .order_by(ranked.c.goal_id, ranked.c.id)
+    )
 
 # will get the goal related to goal_id inputted.
+# with ?include=tasks the goal comes with its tasks, paginated with ?limit= and ?cursor=
 @goals_bp.get("/<goal_id>")
 def get_one_goal(goal_id):
-    # handles data validation and error responses as needed
-    goal = validate_model(Goal, goal_id)
+    if includes_tasks():
+        goal_id = validate_model_id(Goal, goal_id)
+        return make_conditional_response(
+            goal_version_names(goal_id),
+            lambda: build_goal_with_tasks_response(goal_id)
+        )
+
+    # serves the goal from the response cache with its etag, or 304 if the client's copy is still current
+    return make_cached_model_response(Goal, goal_id, build_one_goal_response)
+
+def build_goal_with_tasks_response(goal_id):
+    goal = db.session.execute(db.select(*columns(Goal, GOAL_FIELDS)).where(Goal.id == goal_id)).first()
+
+    if goal is None:
+        abort(make_response({"message": "Goal not found"}, 404))
+
+    query = db.select(*columns(Task, GOAL_TASK_FIELDS)).where(Task.goal_id == goal_id)
+    tasks, next_cursor = paginate(query, get_sort_columns(Task, None))
+
+    goal_response = goal_to_dict(*goal)
+    goal_response["tasks"] = serialize_task_rows(tasks)
+
+    return make_page_response({"goal": goal_response}, next_cursor)
 
+def build_one_goal_response(goal):
     # returns dict of the specific goal selected
-    return {
-        "goal":{
-        "id": goal.id,
-        "title": goal.title,
-        }}
+    return {"goal": goal.to_dict()}
 
-# will get all the tasks associated with the goal_id inputted.
+# will get all the tasks associated with the goal_id inputted,
+# or 304 if the client's copy is still current.
 @goals_bp.get("/<goal_id>/tasks")
 def get_tasks_by_goal(goal_id):
-    # handles data validation and error responses as needed
-    goal = validate_model(Goal, goal_id)
-    
-    # selects and retrieves all the tasks that have a goal_id 
+    goal_id = validate_model_id(Goal, goal_id)
+    return make_conditional_response(goal_version_names(goal_id), lambda: build_tasks_by_goal_response(goal_id))
+
+def build_tasks_by_goal_response(goal_id):
+    # selects the columns we send back of all the tasks that have a goal_id
     # that matches the goal_id that was inputted
-    tasks = Task.query.where(Task.goal_id == goal_id)
+    query = db.select(*columns(Task, GOAL_TASK_FIELDS)).where(Task.goal_id == goal_id).order_by(Task.id)
+
+    # sends the tasks as one json line at a time if the client asked for a stream,
+    # after making sure the goal exists so a missing one is still a 404
+    if wants_stream():
+        validate_model(Goal, goal_id)
+        return make_stream_response(query, serialize_task_rows)
+
+    # otherwise the goal and its tasks come back in one query, the goal's columns
+    # repeated on each of its task rows (or on a single row of NULL task columns if it has none)
+    goal_and_tasks = (
+        db.select(Goal.id, Goal.title, *columns(Task, GOAL_TASK_FIELDS))
+        .outerjoin(Task, Task.goal_id == Goal.id)
+        .where(Goal.id == goal_id)
+        .order_by(Task.id)
+    )
+    rows = db.session.execute(goal_and_tasks).all()
+
+    if not rows:
+        abort(make_response({"message": "Goal not found"}, 404))
+
+    task_rows = [row[2:] for row in rows if row[2] is not None]
 
-    task_list = []
-    
-    # builds a dict for each of the tasks associated with the goal_id and adds it to task_list
-    for task in tasks:
-            task_list.append({
-                "id": task.id,
-                "goal_id": goal.id,
-                "title": task.title,
-                "description": task.description,
-                "is_complete": task.completed_at is not None
-                })
-        
     response_body = {
-        "id": goal.id,
-        "title": goal.title, 
-        "tasks": task_list
+        "id": rows[0][0],
+        "title": rows[0][1],
+        "tasks": serialize_task_rows(task_rows)
     }
 
     return response_body, 200
 
+# counts the goal's tasks and their completions per day, or 304 if the client's copy is still current.
+# the totals come from the goal's counters unless STATS_USE_COUNTERS is off,
+# then they're counted from its tasks. ?since=YYYY-MM-DD limits the days of the histogram.
+@goals_bp.get("/<goal_id>/stats")
+def get_goal_stats(goal_id):
+    goal_id = validate_model_id(Goal, goal_id)
+    return make_conditional_response(goal_version_names(goal_id), lambda: build_goal_stats_response(goal_id))
+
+def build_goal_stats_response(goal_id):
+    since = get_since_param()
+
+    counters = db.session.execute(
+        db.select(Goal.task_count, Goal.completed_count).where(Goal.id == goal_id)
+    ).first()
+
+    if counters is None:
+        abort(make_response({"message": "Goal not found"}, 404))
+
+    if current_app.config["STATS_USE_COUNTERS"]:
+        total, completed = counters
+    else:
+        total, completed = count_tasks(Task.goal_id == goal_id)
+
+    per_day = count_completions_per_day(Task.goal_id == goal_id, since=since)
+
+    return {"id": goal_id, "stats": completion_stats(total, completed, per_day)}, 200
+
+# ?cascade=tasks deletes a goal's tasks along with it, anything else is a 400
+def cascades_to_tasks():
+    cascade_param = request.args.get("cascade")
+
+    if cascade_param is None:
+        return False
+
+    if cascade_param != "tasks":
+        abort(make_response({"message": "invalid cascade"}, 400))
+
+    return True
+
 # will replace the information associated with this goal id to the new info that was inputted.
 @goals_bp.put("/<goal_id>")
 def update_goal(goal_id):
@@ -167,20 +320,27 @@ def update_goal(goal_id):
 
     db.session.commit()
     
-    response_body = {
-            "goal": {
-            "id": goal.id,
-            "title": goal.title
-        }}
+    response_body = {"goal": goal.to_dict()}
     
     return response_body, 200
 
-# will delete the goal associated with goal_id
+# will delete the goal associated with goal_id. its tasks stay and just lose their goal,
+# unless ?cascade=tasks asks for them to be deleted with it
 @goals_bp.delete("/<goal_id>")
 def delete_goal(goal_id):
+    cascade_tasks = cascades_to_tasks()
+
     # handles data validation and error responses as needed
     goal = validate_model(Goal, goal_id)
 
+    # deals with all of the goal's tasks in one statement instead of loading them into the session.
+    # the foreign key's ON DELETE SET NULL would detach them too, but doing it here also works on
+    # sqlite (which doesn't enforce foreign keys) and stamps their updated_at
+    if cascade_tasks:
+        db.session.execute(db.delete(Task).where(Task.goal_id == goal.id))
+    else:
+        db.session.execute(db.update(Task).where(Task.goal_id == goal.id).values(goal_id=None))
+
     # deletes the goal and saves that change to db.
     db.session.delete(goal)
     db.session.commit()
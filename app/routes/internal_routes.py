@@ -0,0 +1,32 @@
+from flask import Blueprint
+from ..cache import response_cache
+from ..db import db
+from ..instrumentation import instrumentation
+from ..pool import pool_stats
+from ..replicas import replica_router
+
+# creates the blueprint for operational endpoints that aren't part of the public api,
+# only registered when INTERNAL_ENDPOINTS_ENABLED is on
+internal_bp = Blueprint("internal_bp", __name__, url_prefix="/_internal")
+
+# shows how well the response cache is doing: hits, misses, evictions and the hit rate
+@internal_bp.get("/cache")
+def get_cache_stats():
+    return response_cache.stats()
+
+# shows the database connection pool: connections checked out, overflow in use,
+# and how long requests waited for a connection
+@internal_bp.get("/pool")
+def get_pool_stats():
+    return pool_stats(db.engine)
+
+# shows each read replica's lag and latency and how many reads went to it
+@internal_bp.get("/replicas")
+def get_replica_stats():
+    return replica_router.stats()
+
+# shows how many queries each endpoint makes and where its time goes,
+# when INSTRUMENTATION_ENABLED is on
+@internal_bp.get("/requests")
+def get_request_stats():
+    return instrumentation.stats()
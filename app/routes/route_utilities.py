@@ -1,18 +1,29 @@
-from flask import abort, make_response
+from flask import abort, current_app, make_response, request, url_for, Response, stream_with_context
+from sqlalchemy import and_, or_
+from werkzeug.http import is_resource_modified
+from calendar import timegm
+from datetime import date, datetime, time, timezone
+from ..cache import response_cache
 from ..db import db
+from ..replicas import replica_router
+from ..versions import get_versions
+import base64
+import binascii
+import hashlib
+import json
 
 # will make sure that models(goal or task) will be an integer 
 # when it needs to be and respond appropriately if its not, 
 # or if its empty will also send appropriate message.
+# with for_update the row stays locked until the commit (on databases that have row locks),
+# for handlers whose write depends on what they read.
 
-def validate_model(cls, model_id):
-    try:
-        model_id = int(model_id)
-    except:
-        response = {"message": f"invalid {cls.__name__} id"}
-        abort(make_response(response, 400))
+def validate_model(cls, model_id, for_update=False):
+    model_id = validate_model_id(cls, model_id)
 
     query = db.select(cls).where(cls.id == model_id)
+    if for_update:
+        query = query.with_for_update()
     model = db.session.scalar(query)
 
     if not model:
@@ -20,3 +31,319 @@ def validate_model(cls, model_id):
         abort(make_response(response, 404))
         
     return model
+
+# reads the body of a bulk request: a json array, or newline-delimited json
+# (one object per line) when sent as application/x-ndjson
+def get_bulk_items():
+    try:
+        if request.mimetype == "application/x-ndjson":
+            items = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        else:
+            items = request.get_json(silent=True)
+    except ValueError:
+        items = None
+
+    if not isinstance(items, list) or not items:
+        abort(make_response({"details": "Invalid data"}, 400))
+
+    return items
+
+# reads a list of integer ids from the "task_ids" key of the request body
+def get_task_ids(request_body):
+    task_ids = request_body.get("task_ids") if isinstance(request_body, dict) else None
+
+    # only json integers are ids: int() would quietly turn true into task 1 and 1.7 into task 1.
+    # bool is a subclass of int, so the type is compared exactly
+    if not task_ids or not isinstance(task_ids, list) or any(type(task_id) is not int for task_id in task_ids):
+        abort(make_response({"details": "Invalid data"}, 400))
+
+    return task_ids
+
+# splits a list into lists of at most `size` items, to keep IN (...) lists and
+# executemany batches under the database's parameter limits
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+# turns the id from the url into an integer, or responds 400 if it isn't one
+def validate_model_id(cls, model_id):
+    try:
+        return int(model_id)
+    except:
+        response = {"message": f"invalid {cls.__name__} id"}
+        abort(make_response(response, 400))
+
+# builds the list of (column, descending) pairs a listing is ordered by,
+# based on the "sort" param. id always comes last so every row has a unique position,
+# which is what lets a cursor point at "the row after this one".
+def get_sort_columns(cls, sort_param):
+    sort_columns = []
+
+    if sort_param == "asc":
+        sort_columns.append((cls.title, False))
+
+    if sort_param == "desc":
+        sort_columns.append((cls.title, True))
+
+    sort_columns.append((cls.id, False))
+
+    return sort_columns
+
+def apply_sort(query, sort_columns):
+    for column, descending in sort_columns:
+        query = query.order_by(column.desc() if descending else column)
+    return query
+
+# reads the "limit" param. no limit means the old unpaginated list,
+# unless the app sets PAGINATION_DEFAULT_LIMIT to paginate every listing.
+def get_page_limit():
+    limit_param = request.args.get("limit", current_app.config["PAGINATION_DEFAULT_LIMIT"])
+
+    if limit_param is None and request.args.get("cursor"):
+        limit_param = current_app.config["PAGINATION_MAX_LIMIT"]
+
+    if limit_param is None:
+        return None
+
+    try:
+        limit = int(limit_param)
+    except (TypeError, ValueError):
+        abort(make_response({"message": "invalid limit"}, 400))
+
+    if limit < 1:
+        abort(make_response({"message": "invalid limit"}, 400))
+
+    return min(limit, current_app.config["PAGINATION_MAX_LIMIT"])
+
+# reads the limit of a nested collection, like ?tasks_limit= on GET /goals?include=tasks.
+# none means the whole collection.
+def get_nested_limit(param):
+    limit_param = request.args.get(param)
+
+    if limit_param is None:
+        return None
+
+    try:
+        limit = int(limit_param)
+    except ValueError:
+        abort(make_response({"message": f"invalid {param}"}, 400))
+
+    if limit < 1:
+        abort(make_response({"message": f"invalid {param}"}, 400))
+
+    return min(limit, current_app.config["PAGINATION_MAX_LIMIT"])
+
+# reads ?since=YYYY-MM-DD as the start of that day, none means from the beginning
+def get_since_param():
+    since_param = request.args.get("since")
+
+    if since_param is None:
+        return None
+
+    try:
+        return datetime.combine(date.fromisoformat(since_param), time.min)
+    except ValueError:
+        abort(make_response({"message": "invalid since"}, 400))
+
+# cursors are opaque to clients: base64 of the sort mode and the sort values of the last row sent
+def encode_cursor(sort_param, values):
+    raw = json.dumps({"sort": sort_param or "", "after": values}, separators=(",", ":"), default=datetime.isoformat)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, sort_param, sort_columns):
+    try:
+        return parse_cursor(cursor, sort_param, sort_columns)
+    except ValueError:
+        abort(make_response({"message": "invalid cursor"}, 400))
+
+# the sort values in a cursor, or ValueError if it isn't one of ours
+def parse_cursor(cursor, sort_param, sort_columns):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = data["after"]
+        cursor_sort = data["sort"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("invalid cursor")
+
+    # a cursor only makes sense for the sort order it was made with
+    if cursor_sort != (sort_param or "") or not isinstance(values, list) or len(values) != len(sort_columns):
+        raise ValueError("invalid cursor")
+
+    return [cursor_value(column, value) for (column, _), value in zip(sort_columns, values)]
+
+# checks a value from a cursor against the type of the column it's compared with,
+# so a tampered cursor is a 400 rather than a database error. timestamps travel as iso strings.
+def cursor_value(column, value):
+    python_type = column.type.python_type
+
+    if python_type is datetime:
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+    elif python_type is int:
+        # bool is a subclass of int, but true isn't an id
+        if type(value) is int:
+            return value
+    elif isinstance(value, python_type):
+        return value
+
+    raise ValueError("invalid cursor")
+
+# builds "comes after these values" for the sort columns, e.g. for (title, id):
+# title > :title OR (title = :title AND id > :id)
+def keyset_condition(sort_columns, values):
+    conditions = []
+
+    for index, (column, descending) in enumerate(sort_columns):
+        earlier_equal = [earlier == value for (earlier, _), value in zip(sort_columns[:index], values[:index])]
+        comparison = column < values[index] if descending else column > values[index]
+        conditions.append(and_(*earlier_equal, comparison))
+
+    return or_(*conditions)
+
+# runs a listing query with keyset pagination when a limit (or cursor) was asked for.
+# listings select only the columns they send back, so this returns Rows rather than
+# model objects, along with the cursor for the next page, which is None on the last page
+# and when the listing isn't paginated at all.
+def paginate(query, sort_columns, sort_param=None):
+    limit = get_page_limit()
+
+    if limit is None:
+        return db.session.execute(apply_sort(query, sort_columns)), None
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        values = decode_cursor(cursor, sort_param, sort_columns)
+        query = query.where(keyset_condition(sort_columns, values))
+
+    # asks for one extra row to find out if there is a next page without a count query
+    rows = list(db.session.execute(apply_sort(query, sort_columns).limit(limit + 1)))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_param, [getattr(last, column.key) for column, _ in sort_columns])
+
+    return rows, next_cursor
+
+# builds the response for a page of a listing, with a Link header pointing at the next page
+def make_page_response(body, next_cursor):
+    response = make_response(body)
+
+    if next_cursor:
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        next_url = url_for(request.endpoint, **(request.view_args or {}), **args)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return response
+
+# a client asks for a streamed listing with ?stream=1 or by preferring newline-delimited json
+def wants_stream():
+    if request.args.get("stream") in ("1", "true"):
+        return True
+
+    best = request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"])
+    return best == "application/x-ndjson"
+
+# streams a listing as newline-delimited json, one row per line.
+# rows are pulled from the database in batches of STREAM_BATCH_SIZE (a server-side cursor on postgres)
+# and written out as they arrive, so memory stays flat no matter how many rows there are.
+# `serialize_rows` turns one batch of Rows into dicts (see app/serializers.py).
+def make_stream_response(query, serialize_rows):
+    batch_size = current_app.config["STREAM_BATCH_SIZE"]
+    dumps = current_app.json.dumps
+
+    # the query only runs once the response starts being sent,
+    # and each batch of rows goes out as one chunk instead of one tiny write per row
+    def generate():
+        result = db.session.execute(query.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            yield "".join(dumps(item) + "\n" for item in serialize_rows(rows))
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+# a listing's etag comes from the version counters of what it lists (bumped by every write,
+# see app/versions.py) plus the exact url and whether it was streamed, never from hashing the body
+def listing_etag(versions):
+    return versions_etag(versions, request.full_path, wants_stream())
+
+# the same etag outside of a flask request, for the async app (app/asgi.py).
+# full_path is the path, "?" and the raw query string, like werkzeug's request.full_path.
+def versions_etag(versions, full_path, streamed):
+    raw = json.dumps(
+        [sorted((name, version) for name, (version, _) in versions.items()), full_path, streamed],
+        separators=(",", ":")
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def versions_last_modified(versions):
+    return max((updated_at for _, updated_at in versions.values() if updated_at), default=None)
+
+def make_not_modified_response(etag, last_modified):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.vary.add("Accept")
+    return response
+
+# answers a listing conditionally: the version counters it depends on are read first (one small query),
+# and a client whose If-None-Match (or If-Modified-Since) still matches gets 304 Not Modified
+# without `build_response()` and its listing query ever running
+def make_conditional_response(version_names, build_response):
+    versions = get_versions(version_names)
+    etag = listing_etag(versions)
+    last_modified = versions_last_modified(versions)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return make_not_modified_response(etag, last_modified)
+
+    response = make_response(build_response())
+    response.vary.add("Accept")
+    if response.status_code == 200:
+        response.set_etag(etag)
+        response.last_modified = last_modified
+
+    return response
+
+# the response cache entry of one row: its body, and an etag and Last-Modified (epoch seconds)
+# taken from its updated_at column. the async app builds the same entries.
+def model_cache_entry(model, body):
+    updated_at = model.updated_at.replace(tzinfo=timezone.utc)
+    return {
+        "body": body,
+        "etag": hashlib.sha1(f"{type(model).__name__}:{model.id}:{updated_at.isoformat()}".encode()).hexdigest(),
+        "last_modified": timegm(updated_at.timetuple())
+    }
+
+# answers GET /<model>/<id> from the response cache. each cached entry keeps the body
+# along with its etag and Last-Modified, both taken from the row's updated_at column.
+def make_cached_model_response(cls, model_id, build_body):
+    model_id = validate_model_id(cls, model_id)
+
+    def load():
+        model = validate_model(cls, model_id)
+        return model_cache_entry(model, build_body(model))
+
+    # a client that just wrote reads its row straight from the primary, never from the cache,
+    # which a request on a lagging replica could have filled with the row from before its write.
+    # everyone else only goes to the db when the row isn't cached, and only rows read from
+    # the primary are cached.
+    if replica_router.is_sticky():
+        entry = load()
+    else:
+        entry = response_cache.get_or_load(
+            cls, model_id, load, cacheable=lambda: not replica_router.read_replica(db.session)
+        )
+    last_modified = datetime.fromtimestamp(entry["last_modified"], timezone.utc)
+
+    if not is_resource_modified(request.environ, etag=entry["etag"], last_modified=last_modified):
+        return make_not_modified_response(entry["etag"], last_modified)
+
+    response = make_response(entry["body"])
+    response.set_etag(entry["etag"])
+    response.last_modified = last_modified
+    return response
@@ -1,10 +1,15 @@
-from flask import Blueprint, abort, make_response, request, Response
+from flask import Blueprint, abort, current_app, make_response, request, Response
 from datetime import datetime, timezone
+from app.models.goal import Goal
 from app.models.task import Task
-from .route_utilities import validate_model
+from .route_utilities import validate_model, chunked, get_bulk_items, get_task_ids, get_sort_columns, apply_sort, paginate, make_page_response, wants_stream, make_stream_response, make_conditional_response, make_cached_model_response, get_since_param
+from ..changes import record_bulk_changes
+from ..counters import adjust_goal_counters
 from ..db import db
-import requests
-import os
+from ..notifications import notifier
+from ..search import search_tasks
+from ..stats import completion_stats, count_completions_per_day, count_tasks
+from ..serializers import TASK_FIELDS, columns, serialize_task_rows
 
 # will create blueprint for tasks endpoints
 tasks_bp = Blueprint("tasks_bp", __name__, url_prefix="/tasks")
@@ -16,7 +21,7 @@ def create_task():
     request_body = request.get_json()
 
     # if the request body is missing title or description, will return 400
-    if not request_body.get("title") or not request_body.get("description"):
+    if not is_valid_task_data(request_body):
         return {"details": "Invalid data"}, 400
     
     title = request_body["title"]
@@ -29,35 +34,124 @@ def create_task():
     db.session.add(new_task)
     db.session.commit()
 
-    # creates the response that is sent back to user which changes None to False for "is_complete"
-    response = {
-        "task":{
-        "id": new_task.id,
-        "title": new_task.title,
-        "description": new_task.description,
-        "is_complete": new_task.completed if new_task.completed_at is not None else False
-    }}
+    # creates the response that is sent back to user
+    response = {"task": new_task.to_dict()}
     
     return response, 201
 
-# gets a list of all tasks
+# a task needs both a title and a description
+def is_valid_task_data(task_data):
+    return isinstance(task_data, dict) and bool(task_data.get("title")) and bool(task_data.get("description"))
+
+# will create/post many tasks at once, from a json array or ndjson body.
+# every task is checked with the same rules as create_task and then they're all
+# inserted in one transaction with one multi-row INSERT ... RETURNING per chunk.
+@tasks_bp.post("/bulk")
+def create_tasks_in_bulk():
+    tasks_data = get_bulk_items()
+
+    # if any task is missing title or description, nothing is saved and we say which ones
+    invalid_indexes = [index for index, task_data in enumerate(tasks_data) if not is_valid_task_data(task_data)]
+    if invalid_indexes:
+        return {"details": "Invalid data", "invalid_indexes": invalid_indexes}, 400
+
+    new_task_ids = []
+    for chunk in chunked(tasks_data, current_app.config["BULK_CHUNK_SIZE"]):
+        rows = [{"title": task_data["title"], "description": task_data["description"]} for task_data in chunk]
+        statement = db.insert(Task).returning(Task.id, sort_by_parameter_order=True)
+        new_task_ids.extend(db.session.scalars(statement, rows))
+
+    # saves all the new tasks at once
+    db.session.commit()
+
+    return {"task_ids": new_task_ids}, 201
+
+# will replace the title and/or description of many tasks at once.
+# each item needs the task "id" plus the fields to change.
+@tasks_bp.patch("/bulk")
+def update_tasks_in_bulk():
+    tasks_data = get_bulk_items()
+
+    invalid_indexes = []
+    for index, task_data in enumerate(tasks_data):
+        # bool is a subclass of int, but true isn't a task id
+        if not isinstance(task_data, dict) or type(task_data.get("id")) is not int:
+            invalid_indexes.append(index)
+            continue
+
+        # same rules as create_task for whichever fields are sent, and at least one has to be
+        fields = [field for field in ("title", "description") if field in task_data]
+        if not fields or not all(task_data[field] for field in fields):
+            invalid_indexes.append(index)
+
+    if invalid_indexes:
+        return {"details": "Invalid data", "invalid_indexes": invalid_indexes}, 400
+
+    # the last item wins if the same id is sent twice
+    changes = {}
+    for task_data in tasks_data:
+        changes.setdefault(task_data["id"], {}).update(
+            {field: task_data[field] for field in ("title", "description") if field in task_data}
+        )
+
+    updated_task_ids = []
+    for chunk in chunked(list(changes), current_app.config["BULK_CHUNK_SIZE"]):
+        # one IN query per chunk finds which ids exist, then an executemany UPDATE by primary key
+        existing_ids = set(db.session.scalars(db.select(Task.id).where(Task.id.in_(chunk))))
+        rows = [{"id": task_id, **changes[task_id]} for task_id in chunk if task_id in existing_ids]
+        if rows:
+            db.session.execute(db.update(Task), rows)
+        updated_task_ids.extend(row["id"] for row in rows)
+
+    db.session.commit()
+
+    response = {"task_ids": updated_task_ids}
+
+    updated = set(updated_task_ids)
+    missing_task_ids = [task_id for task_id in changes if task_id not in updated]
+    if missing_task_ids:
+        response["missing_task_ids"] = missing_task_ids
+
+    return response, 200
+
+# will delete many tasks at once, with one DELETE ... WHERE id IN (...) per chunk of ids
+@tasks_bp.delete("/bulk")
+def delete_tasks_in_bulk():
+    task_ids = list(dict.fromkeys(get_task_ids(request.get_json(silent=True))))
+
+    deleted_task_ids = set()
+    for chunk in chunked(task_ids, current_app.config["BULK_CHUNK_SIZE"]):
+        # RETURNING also says which goals lost a task, for their counters
+        statement = db.delete(Task).where(Task.id.in_(chunk)).returning(Task.id, Task.goal_id, Task.completed_at)
+        for task_id, goal_id, completed_at in db.session.execute(statement):
+            deleted_task_ids.add(task_id)
+            adjust_goal_counters(db.session, goal_id, -1, -int(completed_at is not None))
+
+    db.session.commit()
+
+    response = {"task_ids": [task_id for task_id in task_ids if task_id in deleted_task_ids]}
+
+    missing_task_ids = [task_id for task_id in task_ids if task_id not in deleted_task_ids]
+    if missing_task_ids:
+        response["missing_task_ids"] = missing_task_ids
+
+    return response, 200
+
+# gets a list of all tasks, or 304 if the client's copy is still current
 @tasks_bp.get("")
 def get_all_tasks():
-    # selects all the records for tasks
-    query = db.select(Task)
+    return make_conditional_response(["tasks"], build_all_tasks_response)
+
+def build_all_tasks_response():
+    # selects just the columns the listing sends back for all the records for tasks,
+    # which skips building a Task object for every row
+    query = db.select(*columns(Task, TASK_FIELDS))
 
     # creates a variable sort_param if "sort" is in the url
+    # "asc"/"desc" list the tasks in ascending/descending alphabetical order by title,
+    # and ties (or no sort at all) are ordered by id
     sort_param = request.args.get("sort")
-
-    # if the sort_param is "asc" then it lists the tasks 
-    # in ascending alphabetical order by title
-    if sort_param == "asc":
-        query = query.order_by(Task.title)
-
-    # if the sort_param is "desc" then it lists the tasks 
-    # in descending alphabetical order by title
-    if sort_param == "desc":
-        query = query.order_by(Task.title.desc())
+    sort_columns = get_sort_columns(Task, sort_param)
 
     # creates a variable title_param if "title" is in the url
     title_param = request.args.get("title")
@@ -71,45 +165,74 @@ def get_all_tasks():
     # if description_param:
     #     query = query.where(Task.description.ilike(f"%{description_param}%"))
 
-    # orders the tasks by id
-    query = query.order_by(Task.id)
+    # sends every task as one json line at a time if the client asked for a stream
+    if wants_stream():
+        return make_stream_response(apply_sort(query, sort_columns), serialize_task_rows)
 
-    # actually retrieves all the tasks and puts them into tasks variable
-    tasks = db.session.scalars(query)
+    # actually retrieves the tasks, one page at a time if the client sent ?limit= or ?cursor=
+    tasks, next_cursor = paginate(query, sort_columns, sort_param)
 
     # puts together all the tasks into a list of dictionaries to send as response to user
-    # again changing "is_complete" to False if its None/not completed
-    tasks_response = []
-    for task in tasks:
-        tasks_response.append({
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "is_complete": task.completed_at if task.completed_at is not None else False
-        })
-
-    return tasks_response
+    tasks_response = serialize_task_rows(tasks)
 
-# get a specific task based on task_id
-@tasks_bp.get("/<task_id>")
-def get_one_task(task_id):
-    # handles data validation and error responses as needed
-    task = validate_model(Task, task_id)
+    return make_page_response(tasks_response, next_cursor)
+
+# full-text search over task titles and descriptions with ?q=, best matches first.
+# pages with ?limit= and ?offset=
+@tasks_bp.get("/search")
+def search_all_tasks():
+    return make_conditional_response(["tasks"], build_search_response)
 
-    # puts together the task into a dictionary to send as response to user
-    # again changing "is_complete" to False if its None/not completed
-    task_response = {
-        "id": task.id,
-        "title": task.title,
-        "description": task.description,
-        "is_complete": task.completed_at if task.completed_at is not None else False
+def build_search_response():
+    q = request.args.get("q", "").strip()
+
+    if not q:
+        return {"details": "Invalid data"}, 400
+
+    try:
+        limit = min(int(request.args.get("limit", 20)), current_app.config["PAGINATION_MAX_LIMIT"])
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        return {"details": "Invalid data"}, 400
+
+    if limit < 1 or offset < 0:
+        return {"details": "Invalid data"}, 400
+
+    # asks for one extra result to find out if there is a next page
+    results = search_tasks(q, limit + 1, offset)
+
+    response_body = {
+        "query": q,
+        "results": results[:limit],
+        "next_offset": offset + limit if len(results) > limit else None
     }
 
-    # if it has a goal_id it will add it to the dictionary above
-    if task.goal_id:
-        task_response["goal_id"] = task.goal_id
+    return response_body, 200
 
-    return {"task": task_response}
+# counts every task and its completions per day in the database, so a dashboard doesn't
+# have to download them all. ?since=YYYY-MM-DD limits the days of the histogram.
+@tasks_bp.get("/stats")
+def get_task_stats():
+    return make_conditional_response(["tasks"], build_task_stats_response)
+
+def build_task_stats_response():
+    since = get_since_param()
+
+    total, completed = count_tasks()
+    stats = completion_stats(total, completed, count_completions_per_day(since=since))
+
+    return {"stats": stats}, 200
+
+# get a specific task based on task_id
+@tasks_bp.get("/<task_id>")
+def get_one_task(task_id):
+    # serves the task from the response cache with its etag, or 304 if the client's copy is still current
+    return make_cached_model_response(Task, task_id, build_one_task_response)
+
+def build_one_task_response(task):
+    # puts together the task into a dictionary to send as response to user,
+    # with its goal_id if it has one
+    return {"task": task.to_dict()}
 
 # replaces the information of the task with 
 # corresponding task_id based on information submitted.
@@ -126,64 +249,41 @@ def update_task(task_id):
 
     db.session.commit()
     
-    response_body = {
-        "task": {
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "is_complete": task.completed if task.completed_at is not None else False
-        }
-    }
+    response_body = {"task": task.to_dict()}
     return response_body, 200
 
 # will mark a task as completed
 @tasks_bp.patch("/<task_id>/mark_complete")
 def mark_task_as_complete(task_id):
-    # handles data validation and error responses as needed
-    task = validate_model(Task, task_id)
+    # handles data validation and error responses as needed. the task is locked until the commit,
+    # so two concurrent calls can't both see the old completed_at and move the goal's counters twice
+    task = validate_model(Task, task_id, for_update=True)
 
     # changes the tasks "completed_at" value to the date and time it was marked completed
     task.completed_at = datetime.now(timezone.utc)
 
-    # puts together the message we want slack api to post when task marked as completed
-    slack_message = f"Someone just completed the task {task.title}"
-
-    # builds the pieces of the api call info from the .env variables
-    url = "https://slack.com/api/chat.postMessage"
-    slack_api_key = os.environ.get("SLACK_API_KEY")
-    channel = os.environ.get("CHANNEL")
-    
-    # builds the header for the api call
-    headers = {"Authorization": f"Bearer {slack_api_key}", "Content-Type": "application/json"}
-
-    # builds the data for the api call
-    data = {
-        "channel": channel,
-        "text": slack_message
-    }
-    # does a post on the slack api call putting together the pieces we had previously built
-    requests.post(url, json=data, headers=headers)
+    # stages the message we want slack to post as part of this transaction,
+    # it only goes out once the commit below succeeds and never holds up the response
+    notifier.publish(
+        f"Someone just completed the task {task.title}",
+        event_type="task.completed",
+        task_id=task.id
+    )
 
     # saves the change on the db
     db.session.commit()
 
     # builds a dict for the response that reflects "is_complete" as True
-    response_body = {
-        "task": {
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "is_complete": True
-        }
-    }
+    response_body = {"task": task.to_dict()}
 
     return response_body, 200
 
 # will mark a task as incomplete
 @tasks_bp.patch("/<task_id>/mark_incomplete")
 def mark_task_as_incomplete(task_id):
-    # handles data validation and error responses as needed
-    task = validate_model(Task, task_id)
+    # handles data validation and error responses as needed. the task is locked until the commit,
+    # so two concurrent calls can't both see the old completed_at and move the goal's counters twice
+    task = validate_model(Task, task_id, for_update=True)
 
     # changes task's completed_at to None since being marked as incomplete
     task.completed_at = None
@@ -192,16 +292,100 @@ def mark_task_as_incomplete(task_id):
     db.session.commit()
 
     # build dict response body that reflects complete as False
-    response_body = {
-        "task": {
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "is_complete": False
-        }
-    }
+    response_body = {"task": task.to_dict()}
     return response_body, 200
 
+# will mark many tasks as completed at once: the ids in "task_ids", or every task of "goal_id".
+# only the tasks that weren't complete yet are changed, with one UPDATE ... RETURNING per chunk,
+# and slack gets one message for all of them. "task_ids" in the response are the tasks it completed.
+@tasks_bp.patch("/mark_complete")
+def mark_tasks_as_complete():
+    completed_at = datetime.now(timezone.utc)
+    rows, missing_task_ids = set_completed_at_in_batch(Task.completed_at.is_(None), completed_at)
+
+    for _, _, goal_id in rows:
+        adjust_goal_counters(db.session, goal_id, completed=1)
+
+    if rows:
+        notifier.publish(
+            completion_message([title for _, title, _ in rows]),
+            event_type="tasks.completed",
+            task_ids=[task_id for task_id, _, _ in rows]
+        )
+
+    db.session.commit()
+
+    return make_batch_response(rows, missing_task_ids)
+
+# will mark many tasks as incomplete at once, the same way mark_tasks_as_complete completes them
+@tasks_bp.patch("/mark_incomplete")
+def mark_tasks_as_incomplete():
+    rows, missing_task_ids = set_completed_at_in_batch(Task.completed_at.is_not(None), None)
+
+    for _, _, goal_id in rows:
+        adjust_goal_counters(db.session, goal_id, completed=-1)
+
+    db.session.commit()
+
+    return make_batch_response(rows, missing_task_ids)
+
+# sets completed_at on the tasks the request picked that match `pending`, and returns
+# (id, title, goal_id) of each task it changed plus the requested ids that don't exist
+def set_completed_at_in_batch(pending, completed_at):
+    request_body = request.get_json(silent=True)
+
+    if isinstance(request_body, dict) and "goal_id" in request_body:
+        # like task ids, only a json integer is a goal id (true would be goal 1)
+        if "task_ids" in request_body or type(request_body["goal_id"]) is not int:
+            abort(make_response({"details": "Invalid data"}, 400))
+        goal = validate_model(Goal, request_body["goal_id"])
+        task_ids = []
+        batches = [[Task.goal_id == goal.id]]
+    else:
+        task_ids = list(dict.fromkeys(get_task_ids(request_body)))
+        batches = [[Task.id.in_(chunk)] for chunk in chunked(task_ids, current_app.config["BULK_CHUNK_SIZE"])]
+
+    rows = []
+    for criteria in batches:
+        statement = (
+            db.update(Task)
+            .where(*criteria, pending)
+            .values(completed_at=completed_at)
+            .returning(Task.id, Task.title, Task.goal_id)
+            .execution_options(changes_recorded=True)
+        )
+        rows.extend(db.session.execute(statement))
+
+    # says exactly which tasks and goals changed, so only their cached responses are dropped
+    record_bulk_changes(db.session, Task, [row[0] for row in rows], [row[2] for row in rows])
+
+    # ids that weren't changed either don't exist or already were in the state asked for
+    changed = {row[0] for row in rows}
+    unchanged_task_ids = [task_id for task_id in task_ids if task_id not in changed]
+    existing_task_ids = set()
+    for chunk in chunked(unchanged_task_ids, current_app.config["BULK_CHUNK_SIZE"]):
+        existing_task_ids.update(db.session.scalars(db.select(Task.id).where(Task.id.in_(chunk))))
+
+    return rows, [task_id for task_id in unchanged_task_ids if task_id not in existing_task_ids]
+
+# one slack message for a whole batch, naming the first few tasks
+def completion_message(titles, named=10):
+    if len(titles) == 1:
+        return f"Someone just completed the task {titles[0]}"
+
+    message = f"Someone just completed {len(titles)} tasks: {', '.join(titles[:named])}"
+    if len(titles) > named:
+        message += f" and {len(titles) - named} more"
+    return message
+
+def make_batch_response(rows, missing_task_ids):
+    response = {"task_ids": [task_id for task_id, _, _ in rows]}
+
+    if missing_task_ids:
+        response["missing_task_ids"] = missing_task_ids
+
+    return response, 200
+
 # will delete a task
 @tasks_bp.delete("/<task_id>")
 def delete_task(task_id):
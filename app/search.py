@@ -0,0 +1,251 @@
+from flask import current_app
+from sqlalchemy import DDL, event
+from collections import Counter, defaultdict
+from .changes import on_commit
+from .db import db
+from .models.task import Task
+import heapq
+import html
+import math
+import re
+import threading
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+# on postgres every task carries a generated tsvector of its title (weight A) and description
+# (weight B) with a GIN index on it. it's added with DDL here so db.create_all() builds it too,
+# and the migration adds the same thing to existing databases.
+SEARCH_VECTOR_DDL = (
+    "ALTER TABLE task ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+    ") STORED"
+)
+SEARCH_INDEX_DDL = "CREATE INDEX ix_task_search_vector ON task USING gin (search_vector)"
+
+event.listen(Task.__table__, "after_create", DDL(SEARCH_VECTOR_DDL).execute_if(dialect="postgresql"))
+event.listen(Task.__table__, "after_create", DDL(SEARCH_INDEX_DDL).execute_if(dialect="postgresql"))
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+SUFFIXES = ("ing", "ed", "es", "s")
+
+
+# lowercases and trims common english endings so "gardening" finds "garden",
+# a small stand-in for the stemming postgres' english dictionary does
+def normalize(word):
+    word = word.lower()
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    return [normalize(word) for word in TOKEN_PATTERN.findall(text or "")]
+
+
+# html-escapes `text` and wraps every word that matches one of the query terms in <mark></mark>.
+# highlights are meant to be rendered as html, so the task's own text must never come through as markup.
+# the text is escaped piece by piece, escaping it first would let a term match inside "&lt;".
+def highlight(text, terms):
+    text = text or ""
+    parts = []
+    last = 0
+
+    for match in TOKEN_PATTERN.finditer(text):
+        parts.append(html.escape(text[last:match.start()]))
+        word = html.escape(match.group(0))
+        parts.append(f"{HIGHLIGHT_START}{word}{HIGHLIGHT_STOP}" if normalize(match.group(0)) in terms else word)
+        last = match.end()
+
+    parts.append(html.escape(text[last:]))
+    return "".join(parts)
+
+
+# the sql version of html.escape, for text that ts_headline turns into html.
+# ts_headline's parser reads the entities as entities, so no <mark> lands inside one.
+HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+
+def escape_html(expression):
+    for character, entity in HTML_ESCAPES:
+        expression = db.func.replace(expression, character, entity)
+    return expression
+
+
+# an in-memory inverted index over task titles and descriptions, used when the database
+# has no full-text search (sqlite test runs). it maps each term to the tasks containing it and
+# ranks matches with tf-idf, counting title words double like the 'A' weight on postgres.
+class InvertedIndex:
+    TITLE_WEIGHT = 2.0
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.stale = True
+
+    def add(self, task_id, title, description, completed_at=None):
+        with self.lock:
+            self._remove(task_id)
+
+            weights = Counter()
+            for term in tokenize(title):
+                weights[term] += self.TITLE_WEIGHT
+            for term in tokenize(description):
+                weights[term] += 1
+
+            for term, weight in weights.items():
+                self.postings[term][task_id] = weight
+            self.documents[task_id] = (title, description, completed_at, set(weights))
+
+    def remove(self, task_id):
+        with self.lock:
+            self._remove(task_id)
+
+    def _remove(self, task_id):
+        document = self.documents.pop(task_id, None)
+        if not document:
+            return
+
+        for term in document[3]:
+            self.postings[term].pop(task_id, None)
+            if not self.postings[term]:
+                del self.postings[term]
+
+    # reloads every task from the database
+    def rebuild(self):
+        rows = db.session.execute(db.select(Task.id, Task.title, Task.description, Task.completed_at))
+        with self.lock:
+            self.postings = defaultdict(dict)
+            self.documents = {}
+            for row in rows:
+                self.add(*row)
+            self.stale = False
+
+    # returns the best `count` (task_id, score) pairs for the tasks that contain every query term
+    def search(self, terms, count):
+        with self.lock:
+            matches = [self.postings.get(term, {}) for term in terms]
+            if not matches or not all(matches):
+                return []
+
+            candidates = set.intersection(*(set(postings) for postings in matches))
+            total = len(self.documents)
+            scores = {}
+            for task_id in candidates:
+                score = 0.0
+                for postings in matches:
+                    idf = math.log(1 + total / len(postings))
+                    score += (1 + math.log(postings[task_id])) * idf
+                scores[task_id] = score
+
+        return heapq.nsmallest(count, scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def get_inverted_index(app=None):
+    app = app or current_app
+    return app.extensions.setdefault("task_search_index", InvertedIndex())
+
+
+def search_results(rows):
+    results = []
+    for task_id, title, description, completed_at, rank, title_highlight, description_highlight in rows:
+        results.append({
+            "id": task_id,
+            "title": title,
+            "description": description,
+            "is_complete": completed_at is not None,
+            "rank": round(float(rank), 6),
+            "highlights": {
+                "title": title_highlight,
+                "description": description_highlight
+            }
+        })
+    return results
+
+
+# ranks tasks with the generated tsvector column and its GIN index. the page of ids is picked
+# first and the (slow) headlines are only built for the rows on that page.
+def search_postgres(q, limit, offset):
+    ts_query = db.func.websearch_to_tsquery("english", q)
+    search_vector = db.literal_column("task.search_vector")
+    rank = db.func.ts_rank_cd(search_vector, ts_query)
+
+    page = (
+        db.select(Task.id, rank.label("rank"))
+        .where(search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), Task.id)
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+
+    options = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, HighlightAll=true"
+    query = (
+        db.select(
+            Task.id,
+            Task.title,
+            Task.description,
+            Task.completed_at,
+            page.c.rank,
+            db.func.ts_headline("english", escape_html(Task.title), ts_query, options),
+            db.func.ts_headline("english", escape_html(Task.description), ts_query, options)
+        )
+        .join(page, page.c.id == Task.id)
+        .order_by(page.c.rank.desc(), Task.id)
+    )
+
+    return search_results(db.session.execute(query))
+
+
+def search_inverted_index(q, limit, offset):
+    index = get_inverted_index()
+    if index.stale:
+        index.rebuild()
+
+    terms = list(dict.fromkeys(tokenize(q)))
+    page = index.search(terms, offset + limit)[offset:]
+
+    rows = []
+    for task_id, score in page:
+        title, description, completed_at, _ = index.documents[task_id]
+        rows.append((
+            task_id, title, description, completed_at, score,
+            highlight(title, terms), highlight(description, terms)
+        ))
+    return search_results(rows)
+
+
+# full-text search over task titles and descriptions, best matches first
+def search_tasks(q, limit, offset=0):
+    if db.engine.dialect.name == "postgresql":
+        return search_postgres(q, limit, offset)
+    return search_inverted_index(q, limit, offset)
+
+
+# keeps the in-memory index in step with the database. tasks written through the ORM are
+# applied one by one once their transaction commits. bulk statements that don't say which
+# rows they touched just mark the index for a rebuild.
+@on_commit
+def _apply_search_changes(changes):
+    index = current_app.extensions.get("task_search_index")
+    if index is None or index.stale:
+        return
+
+    if Task in changes.bulk:
+        index.stale = True
+        return
+
+    for (cls, task_id), values in changes.rows.items():
+        if cls is not Task:
+            continue
+
+        if values is None:
+            index.remove(task_id)
+        elif {"title", "description", "completed_at"} <= values.keys():
+            index.add(task_id, values["title"], values["description"], values["completed_at"])
+        else:
+            index.stale = True
+            return
@@ -0,0 +1,42 @@
+# turns tasks and goals into the dicts the api sends back, in one place for every route.
+# each serializer takes plain column values, so the same code serves ORM objects
+# (through Task.to_dict() and Goal.to_dict()) and the Row tuples of column-only selects,
+# which skip building ORM objects and the identity map altogether.
+
+# the columns to select for each shape, in the order the row serializers unpack them
+TASK_FIELDS = ("id", "title", "description", "completed_at")
+GOAL_TASK_FIELDS = ("id", "title", "description", "completed_at", "goal_id")
+GOAL_FIELDS = ("id", "title")
+
+
+# "goal_id" is only there for tasks that belong to a goal
+def task_to_dict(task_id, title, description, completed_at, goal_id=None):
+    task_dict = {
+        "id": task_id,
+        "title": title,
+        "description": description,
+        "is_complete": completed_at is not None
+    }
+    if goal_id is not None:
+        task_dict["goal_id"] = goal_id
+    return task_dict
+
+
+def goal_to_dict(goal_id, title):
+    return {"id": goal_id, "title": title}
+
+
+# batch versions for rows of select(Task.id, Task.title, ...) in TASK_FIELDS/GOAL_TASK_FIELDS
+# order (or GOAL_FIELDS for goals). rows are unpacked positionally, which is the cheapest way
+# to read a Row, and nothing is looked up by name per row.
+def serialize_task_rows(rows):
+    return [task_to_dict(*row) for row in rows]
+
+
+def serialize_goal_rows(rows):
+    return [goal_to_dict(*row) for row in rows]
+
+
+# the columns of `model` named by `fields`, for db.select(*columns(Task, TASK_FIELDS))
+def columns(model, fields):
+    return [getattr(model, field) for field in fields]
@@ -0,0 +1,31 @@
+from .db import db
+from .models.task import Task
+
+
+# how many of the tasks matching `criteria` there are and how many are complete, in one query
+def count_tasks(*criteria):
+    query = db.select(db.func.count(Task.id), db.func.count(Task.completed_at)).where(*criteria)
+    return tuple(db.session.execute(query).one())
+
+
+# (day, completions) for every day on or after `since` that a matching task was completed on,
+# oldest first. func.date works on both sqlite and postgres.
+def count_completions_per_day(*criteria, since=None):
+    day = db.func.date(Task.completed_at).label("day")
+    query = db.select(day, db.func.count(Task.id)).where(Task.completed_at.is_not(None), *criteria)
+
+    if since is not None:
+        query = query.where(Task.completed_at >= since)
+
+    return db.session.execute(query.group_by(day).order_by(day)).all()
+
+
+def completion_stats(total, completed, completions_per_day):
+    return {
+        "total": total,
+        "completed": completed,
+        "incomplete": total - completed,
+        "completion_rate": round(completed / total, 4) if total else 0.0,
+        # sqlite hands the day back as a string and postgres as a date, str() makes both YYYY-MM-DD
+        "completions_per_day": [{"date": str(day), "count": count} for day, count in completions_per_day]
+    }
@@ -0,0 +1,252 @@
+from .changes import get_changes
+from .counters import adjust_goal_counters
+from .db import db
+from .models.goal import Goal
+from .models.task import Task
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import islice
+import csv
+import io
+import json
+
+FORMATS = ("ndjson", "csv")
+
+# the columns of an export, and what an import reads
+FIELDS = ("id", "title", "description", "completed_at", "goal_id", "goal_title")
+
+EXPORT_QUERY = (
+    db.select(Task.id, Task.title, Task.description, Task.completed_at, Task.goal_id, Goal.title)
+    .outerjoin(Goal, Goal.id == Task.goal_id)
+    .order_by(Task.id)
+)
+
+# the csv that COPY reads and writes. FORCE_NOT_NULL keeps an empty description an empty string
+# instead of NULL, and the export query's columns come back in FIELDS order.
+COPY_IN = (
+    "COPY task (title, description, completed_at, goal_id, updated_at) "
+    "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (title, description))"
+)
+COPY_OUT = (
+    "COPY (SELECT task.id, task.title, task.description, task.completed_at, task.goal_id, goal.title "
+    "FROM task LEFT OUTER JOIN goal ON goal.id = task.goal_id ORDER BY task.id) "
+    "TO STDOUT WITH (FORMAT csv, HEADER)"
+)
+COPY_DRIVERS = ("psycopg2", "psycopg")
+
+
+# a row of an import file that can't be imported, with the line it's on
+class TaskImportError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def format_of(path):
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+# COPY needs postgres and a driver that can stream it
+def copy_supported():
+    dialect = db.session.get_bind(Task).dialect
+    return dialect.name == "postgresql" and dialect.driver in COPY_DRIVERS
+
+
+def _driver_connection():
+    return db.session.connection().connection.driver_connection
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+# writes every task, with its goal's id and title, to `out` in id order and returns how many it
+# wrote. rows are fetched `batch_size` at a time, so memory stays flat however many tasks there are.
+# a csv export on postgres is a single COPY ... TO STDOUT.
+def export_tasks(out, file_format, batch_size=10_000, use_copy=True):
+    if file_format == "csv" and use_copy and copy_supported():
+        return _copy_out(out)
+
+    rows = db.session.execute(EXPORT_QUERY.execution_options(yield_per=batch_size))
+    count = 0
+
+    if file_format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(FIELDS)
+        for row in rows:
+            writer.writerow([_isoformat(value) if value is not None else "" for value in row])
+            count += 1
+    else:
+        for row in rows:
+            out.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False, default=_isoformat))
+            out.write("\n")
+            count += 1
+
+    return count
+
+
+def _copy_out(out):
+    connection = _driver_connection()
+    with connection.cursor() as cursor:
+        if db.session.get_bind(Task).dialect.driver == "psycopg2":
+            cursor.copy_expert(COPY_OUT, out)
+        else:
+            with cursor.copy(COPY_OUT) as copy:
+                for data in copy:
+                    out.write(bytes(data).decode())
+        return cursor.rowcount
+
+
+# (line number, row) for every row of an ndjson or csv file, read one line at a time
+def read_rows(source, file_format):
+    if file_format == "csv":
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            raise TaskImportError(line_number, "isn't valid json")
+
+
+# maps the goals an import file names to goals in this database. a goal_id with a goal_title
+# links to the goal with that id if it has that title, otherwise a goal with the title is created
+# (once per goal of the file). a goal_id without a title has to be a goal that exists here.
+class GoalLinks:
+    def __init__(self, session):
+        self.session = session
+        self.goal_ids = {}
+        self.created = 0
+
+    def resolve(self, line, goal_id, goal_title):
+        if goal_id is None:
+            return None
+
+        key = (goal_id, goal_title)
+        if key not in self.goal_ids:
+            self.goal_ids[key] = self._find_or_create(line, goal_id, goal_title)
+        return self.goal_ids[key]
+
+    def _find_or_create(self, line, goal_id, goal_title):
+        existing_title = self.session.scalar(db.select(Goal.title).where(Goal.id == goal_id))
+
+        if goal_title is None:
+            if existing_title is None:
+                raise TaskImportError(line, f"goal {goal_id} doesn't exist")
+            return goal_id
+
+        if existing_title == goal_title:
+            return goal_id
+
+        self.created += 1
+        return self.session.scalar(db.insert(Goal).values(title=goal_title).returning(Goal.id))
+
+
+def _parse_datetime(line, value):
+    if value in (None, ""):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise TaskImportError(line, f"invalid completed_at {value!r}")
+
+    # stored the way the app stores them, as utc without a time zone
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_task(line, row, goal_links):
+    if not isinstance(row, dict):
+        raise TaskImportError(line, "isn't an object")
+
+    title = row.get("title")
+    description = row.get("description")
+    if not title or not isinstance(title, str) or not isinstance(description, str):
+        raise TaskImportError(line, "needs a title and a description")
+
+    # an integer in ndjson, digits in csv. int() would also take true and 1.7
+    goal_id = row.get("goal_id")
+    if goal_id in (None, ""):
+        goal_id = None
+    elif isinstance(goal_id, bool) or not isinstance(goal_id, (int, str)):
+        raise TaskImportError(line, f"invalid goal_id {goal_id!r}")
+    else:
+        try:
+            goal_id = int(goal_id)
+        except ValueError:
+            raise TaskImportError(line, f"invalid goal_id {goal_id!r}")
+
+    return {
+        "title": title,
+        "description": description,
+        "completed_at": _parse_datetime(line, row.get("completed_at")),
+        "goal_id": goal_links.resolve(line, goal_id, row.get("goal_title") or None)
+    }
+
+
+# adds every task of `source` as a new task, `chunk_size` rows per statement (COPY on postgres,
+# an executemany INSERT elsewhere), in one transaction the caller commits. task ids in the file
+# aren't kept, goal links are, see GoalLinks. only one chunk is held in memory at a time.
+# returns (tasks imported, goals created).
+def import_tasks(source, file_format, chunk_size=10_000, use_copy=True):
+    session = db.session
+    goal_links = GoalLinks(session)
+    write_chunk = _copy_in if use_copy and copy_supported() else _insert_chunk
+
+    rows = read_rows(source, file_format)
+    count = 0
+
+    while True:
+        chunk = [parse_task(line, row, goal_links) for line, row in islice(rows, chunk_size)]
+        if not chunk:
+            break
+
+        write_chunk(chunk)
+        count += len(chunk)
+
+        per_goal = Counter()
+        for task in chunk:
+            if task["goal_id"] is not None:
+                per_goal[task["goal_id"], task["completed_at"] is not None] += 1
+        for (goal_id, completed), tasks in per_goal.items():
+            adjust_goal_counters(session, goal_id, tasks, tasks if completed else 0)
+
+    # COPY goes around the session, so the new tasks are recorded by hand for the
+    # versions, the response cache and the search index
+    if count:
+        get_changes(session).bulk.add(Task)
+
+    return count, goal_links.created
+
+
+def _insert_chunk(chunk):
+    db.session.execute(db.insert(Task), chunk)
+
+
+def _copy_in(chunk):
+    updated_at = datetime.utcnow().isoformat()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for task in chunk:
+        writer.writerow([
+            task["title"],
+            task["description"],
+            _isoformat(task["completed_at"]) or "",
+            task["goal_id"] if task["goal_id"] is not None else "",
+            updated_at
+        ])
+    buffer.seek(0)
+
+    connection = _driver_connection()
+    with connection.cursor() as cursor:
+        if db.session.get_bind(Task).dialect.driver == "psycopg2":
+            cursor.copy_expert(COPY_IN, buffer)
+        else:
+            with cursor.copy(COPY_IN) as copy:
+                copy.write(buffer.getvalue())
@@ -0,0 +1,95 @@
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from datetime import datetime
+from .changes import CHANGES_KEY
+from .db import db
+from .models.resource_version import ResourceVersion
+from .models.task import Task
+from .models.goal import Goal
+
+# the listings every version name stands for:
+#   "tasks": GET /tasks and GET /tasks/search
+#   "goals": GET /goals
+#   "goal:<id>": GET /goals/<id>/tasks
+#   "goal:*": every GET /goals/<id>/tasks, bumped when a bulk statement didn't say which goals it touched
+ALL_GOALS = "goal:*"
+
+UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def goal_version_names(goal_id):
+    return [f"goal:{goal_id}", ALL_GOALS]
+
+
+# the names a transaction's changes bump, sorted so concurrent
+# transactions always lock the version rows in the same order
+def version_names(changes):
+    names = set()
+    if changes.touched(Task):
+        names.add("tasks")
+    if changes.touched(Goal):
+        names.add("goals")
+    if Task in changes.bulk or Goal in changes.bulk:
+        names.add(ALL_GOALS)
+    names.update(f"goal:{goal_id}" for goal_id in changes.goal_ids)
+    return sorted(names)
+
+
+def bump_versions(session, names):
+    table = ResourceVersion.__table__
+    now = datetime.utcnow()
+    upsert = UPSERTS.get(session.get_bind(ResourceVersion).dialect.name)
+
+    for name in names:
+        if upsert is not None:
+            statement = upsert(table).values(name=name, version=1, updated_at=now)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.name],
+                set_={"version": table.c.version + 1, "updated_at": now}
+            )
+            session.execute(statement)
+            continue
+
+        # databases without an upsert: update the row, and create it if there wasn't one
+        statement = (
+            table.update()
+            .where(table.c.name == name)
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if session.execute(statement).rowcount == 0:
+            session.execute(table.insert().values(name=name, version=1, updated_at=now))
+
+
+# reads the current (version, updated_at) of each name, names never bumped come back as (0, None)
+def get_versions(names):
+    return collect_versions(names, db.session.execute(versions_query(names)))
+
+
+# the query and the dict built from its rows, also run by the async app on its own session
+def versions_query(names):
+    return (
+        db.select(ResourceVersion.name, ResourceVersion.version, ResourceVersion.updated_at)
+        .where(ResourceVersion.name.in_(names))
+    )
+
+
+def collect_versions(names, rows):
+    versions = {name: (0, None) for name in names}
+    versions.update({name: (version, updated_at) for name, version, updated_at in rows})
+    return versions
+
+
+# the version rows are bumped inside the transaction that wrote the data, right before it commits,
+# so a listing's etag can never be newer than what the listing returns
+@event.listens_for(Session, "before_commit")
+def _bump_changed_versions(session):
+    session.flush()
+
+    changes = session.info.get(CHANGES_KEY)
+    if not changes:
+        return
+
+    names = version_names(changes)
+    if names:
+        bump_versions(session, names)
@@ -0,0 +1,152 @@
+# the same read endpoints on the same seeded database, served by sync flask under gunicorn
+# (gthread workers) and by the async ASGI app (app/asgi.py) under uvicorn, each hit with
+# --connections concurrent keep-alive connections for --duration seconds.
+# the load generator is a small asyncio http/1.1 client, so it can hold 500 connections
+# from one process. set BENCHMARK_DATABASE_URI to run against postgres.
+#
+#   python -m benchmarks.async_load --connections 500 --duration 15
+from .common import make_app, seed_goals, seed_tasks, summarize, print_table
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} didn't start")
+
+
+def server_commands(port, workers, threads):
+    bind = f"127.0.0.1:{port}"
+    return {
+        "gunicorn (sync)": [
+            sys.executable, "-m", "gunicorn", "--bind", bind, "--workers", str(workers),
+            "--worker-class", "gthread", "--threads", str(threads), "--log-level", "warning",
+            "app:create_app()"
+        ],
+        "uvicorn (async)": [
+            sys.executable, "-m", "uvicorn", "--factory", "app.asgi:create_asgi_app",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"
+        ]
+    }
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    keep_alive = True
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value)
+        elif name == b"connection" and value.strip().lower() == b"close":
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+# one connection sending requests back to back until the deadline, reconnecting if the server closes it
+async def connection_loop(port, urls, deadline, latencies, errors, rng):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            url = rng.choice(urls)
+            start = time.perf_counter()
+            writer.write(f"GET {url} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n".encode())
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+
+            if status != 200:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as error:
+            errors.append(type(error).__name__)
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+
+    if writer is not None:
+        writer.close()
+
+
+async def generate_load(port, urls, connections, duration):
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + duration
+    rngs = [random.Random(number) for number in range(connections)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection_loop(port, urls, deadline, latencies, errors, rng) for rng in rngs))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sync gunicorn vs async uvicorn under concurrent load")
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker")
+    parser.add_argument("--goals", type=int, default=100)
+    parser.add_argument("--tasks-per-goal", type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_goals(args.goals)
+        seed_tasks(args.goals * args.tasks_per_goal, goal_ids=list(range(1, args.goals + 1)))
+        database_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+
+    task_count = args.goals * args.tasks_per_goal
+    urls = (
+        ["/tasks?limit=50"]
+        + [f"/tasks/{task_id}" for task_id in range(1, task_count + 1, max(1, task_count // 200))]
+        + [f"/goals/{goal_id}/tasks" for goal_id in range(1, args.goals + 1)]
+    )
+
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=database_uri)
+
+    rows = []
+    for name in ("gunicorn (sync)", "uvicorn (async)"):
+        port = free_port()
+        server = subprocess.Popen(server_commands(port, args.workers, args.threads)[name], env=env)
+        try:
+            wait_until_up(port)
+            latencies, errors, elapsed = asyncio.run(generate_load(port, urls, args.connections, args.duration))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        row = {"server": name, "errors": len(errors)}
+        row.update(summarize(latencies, elapsed=elapsed))
+        rows.append(row)
+
+    print_table(f"{args.connections} concurrent connections for {args.duration}s", rows)
+
+
+if __name__ == "__main__":
+    main()
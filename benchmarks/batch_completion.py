@@ -0,0 +1,58 @@
+# closes out a sprint: completes --tasks tasks of one goal with PATCH /tasks/<id>/mark_complete
+# one request at a time, then with one PATCH /tasks/mark_complete by ids and by goal_id, and
+# reports tasks/sec and the slack messages each way produced. slack messages go to the outbox
+# table, so the count is exact and nothing touches the network.
+#
+#   python -m benchmarks.batch_completion --tasks 5000
+from app.db import db
+from app.models.goal import Goal
+from app.models.outbox import OutboxEvent
+from .common import make_app, seed_goals, seed_tasks, print_table, timed
+import argparse
+
+
+def per_task(client, count):
+    for task_id in range(1, count + 1):
+        assert client.patch(f"/tasks/{task_id}/mark_complete").status_code == 200
+
+
+def batch_by_ids(client, count):
+    assert client.patch("/tasks/mark_complete", json={"task_ids": list(range(1, count + 1))}).status_code == 200
+
+
+def batch_by_goal(client, count):
+    assert client.patch("/tasks/mark_complete", json={"goal_id": 1}).status_code == 200
+
+
+def run(name, complete, count, chunk_size):
+    app = make_app(SLACK_NOTIFICATIONS_ENABLED=True, SLACK_DELIVERY="outbox", BULK_CHUNK_SIZE=chunk_size)
+    with app.app_context():
+        seed_goals(1)
+        seed_tasks(count, goal_ids=[1])
+
+    elapsed, _ = timed(complete, app.test_client(), count)
+
+    with app.app_context():
+        messages = db.session.scalar(db.select(db.func.count(OutboxEvent.id)))
+        completed = db.session.get(Goal, 1).completed_count
+
+    assert completed == count
+    return {"requests": name, "tasks": count, "seconds": elapsed, "tasks_per_s": count / elapsed, "slack_messages": messages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="completing tasks one request at a time vs in one batch")
+    parser.add_argument("--tasks", type=int, default=5_000)
+    parser.add_argument("--chunk-size", type=int, default=5_000, help="BULK_CHUNK_SIZE for the app")
+    args = parser.parse_args()
+
+    rows = [
+        run("PATCH /tasks/<id>/mark_complete each", per_task, args.tasks, args.chunk_size),
+        run("PATCH /tasks/mark_complete by ids", batch_by_ids, args.tasks, args.chunk_size),
+        run("PATCH /tasks/mark_complete by goal", batch_by_goal, args.tasks, args.chunk_size)
+    ]
+    print_table(f"completing {args.tasks} tasks", rows)
+
+
+if __name__ == "__main__":
+    main()
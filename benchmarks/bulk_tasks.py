@@ -0,0 +1,53 @@
+# loads tasks through POST /tasks one request at a time and through POST /tasks/bulk,
+# and reports tasks/sec for each. the per-row path is sampled on a smaller count
+# since it's the slow one, and the rates are compared.
+#
+#   python -m benchmarks.bulk_tasks --tasks 100000 --per-row-tasks 5000
+from .common import make_app, print_table, timed
+import argparse
+import json
+
+
+def load_per_row(client, count):
+    for number in range(count):
+        response = client.post("/tasks", json={"title": f"Task {number}", "description": "Imported"})
+        assert response.status_code == 201
+
+
+def load_bulk(client, count, batch, ndjson):
+    for start in range(0, count, batch):
+        items = [{"title": f"Task {number}", "description": "Imported"} for number in range(start, min(start + batch, count))]
+        if ndjson:
+            body = "\n".join(json.dumps(item) for item in items)
+            response = client.post("/tasks/bulk", data=body, content_type="application/x-ndjson")
+        else:
+            response = client.post("/tasks/bulk", json=items)
+        assert response.status_code == 201
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per-row vs bulk task creation")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--per-row-tasks", type=int, default=5_000)
+    parser.add_argument("--batch", type=int, default=10_000, help="tasks per bulk request")
+    parser.add_argument("--chunk-size", type=int, default=5_000, help="BULK_CHUNK_SIZE for the app")
+    args = parser.parse_args()
+
+    rows = []
+
+    client = make_app(BULK_CHUNK_SIZE=args.chunk_size).test_client()
+    elapsed, _ = timed(load_per_row, client, args.per_row_tasks)
+    per_row_rate = args.per_row_tasks / elapsed
+    rows.append({"endpoint": "POST /tasks", "tasks": args.per_row_tasks, "seconds": elapsed, "tasks_per_s": per_row_rate, "speedup": 1.0})
+
+    for label, ndjson in (("POST /tasks/bulk (json)", False), ("POST /tasks/bulk (ndjson)", True)):
+        client = make_app(BULK_CHUNK_SIZE=args.chunk_size).test_client()
+        elapsed, _ = timed(load_bulk, client, args.tasks, args.batch, ndjson)
+        rate = args.tasks / elapsed
+        rows.append({"endpoint": label, "tasks": args.tasks, "seconds": elapsed, "tasks_per_s": rate, "speedup": rate / per_row_rate})
+
+    print_table("loading tasks", rows)
+
+
+if __name__ == "__main__":
+    main()
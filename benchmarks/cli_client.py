@@ -0,0 +1,100 @@
+# the cli client (cli/task_list.py) against the app under gunicorn, on a database seeded
+# with --tasks tasks:
+#   "Delete all tasks" the way cli/main.py used to do it, one requests.delete per task with
+#   no session, then one DELETE per task from the thread pool over the pooled session, then
+#   DELETE /tasks/bulk. every way starts from a freshly seeded database.
+#   --lists listings the old way (a full GET every time) and with the client's cache,
+#   which revalidates with If-None-Match and gets a 304 back.
+# the one-request-per-task baseline takes minutes at 10k tasks, --skip-baseline leaves it out.
+# runs on a sqlite file, or on postgres with BENCHMARK_DATABASE_URI.
+#
+#   python -m benchmarks.cli_client --tasks 10000
+from .common import make_app, seed_tasks, print_table, summarize, timed
+from .suite import start_server
+import argparse
+import os
+import requests
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli"))
+import task_list
+
+
+def delete_without_session(ids):
+    for id in ids:
+        requests.delete(task_list.url+f"/tasks/{id}")
+
+
+def delete_with_thread_pool(ids):
+    task_list.delete_one_by_one(ids)
+
+
+def delete_in_bulk(ids):
+    task_list.delete_tasks(ids)
+
+
+def list_without_cache(count):
+    latencies = []
+    for _ in range(count):
+        elapsed, _ = timed(requests.get, task_list.url+"/tasks")
+        latencies.append(elapsed)
+    return latencies
+
+
+def list_with_cache(count):
+    task_list.invalidate_cache()
+    latencies = []
+    for _ in range(count):
+        elapsed, _ = timed(task_list.list_tasks)
+        latencies.append(elapsed)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cli client: delete all tasks and cached listings")
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--lists", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker")
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    app = make_app()
+    database_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    server, port = start_server(database_uri, args.workers, args.threads)
+    task_list.url = f"http://127.0.0.1:{port}"
+
+    deletes = [("thread pool, pooled session", delete_with_thread_pool), ("DELETE /tasks/bulk", delete_in_bulk)]
+    if not args.skip_baseline:
+        deletes.insert(0, ("requests.delete per task", delete_without_session))
+
+    try:
+        rows = []
+        for name, delete in deletes:
+            with app.app_context():
+                seed_tasks(args.tasks)
+            ids = [task["id"] for task in requests.get(task_list.url+"/tasks").json()]
+
+            elapsed, _ = timed(delete, ids)
+            remaining = len(requests.get(task_list.url+"/tasks").json())
+            rows.append({"delete all": name, "tasks": len(ids), "remaining": remaining, "seconds": elapsed})
+        print_table(f"delete all {args.tasks} tasks", rows)
+
+        with app.app_context():
+            seed_tasks(args.tasks)
+        rows = []
+        for name, list_tasks in [("GET /tasks every time", list_without_cache), ("cached, If-None-Match", list_with_cache)]:
+            start = time.perf_counter()
+            latencies = list_tasks(args.lists)
+            row = {"listing": name}
+            row.update(summarize(latencies, elapsed=time.perf_counter() - start))
+            rows.append(row)
+        print_table(f"{args.lists} listings of {args.tasks} tasks", rows)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
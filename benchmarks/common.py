@@ -0,0 +1,109 @@
+from app import create_app
+from app.counters import recount_goal_counters
+from app.db import db
+from app.models.task import Task
+from app.models.goal import Goal
+from datetime import datetime, timedelta
+import os
+import statistics
+import tempfile
+import time
+
+
+# builds an app backed by a throwaway sqlite file (or BENCHMARK_DATABASE_URI when set)
+# with the tables already created
+def make_app(**config):
+    database_uri = os.environ.get("BENCHMARK_DATABASE_URI")
+    if not database_uri:
+        handle, path = tempfile.mkstemp(prefix="task-list-bench-", suffix=".db")
+        os.close(handle)
+        database_uri = f"sqlite:///{path}"
+
+    app_config = {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": database_uri,
+        "SLACK_NOTIFICATIONS_ENABLED": False
+    }
+    app_config.update(config)
+    app = create_app(app_config)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    return app
+
+
+# inserts `count` tasks with a single executemany per chunk instead of one ORM object at a time.
+# linked_ratio of the tasks get one of goal_ids, handed out round robin, and completed_ratio
+# of them get a completed_at. the two are spread differently so they don't pick the same tasks.
+def seed_tasks(count, goal_ids=None, completed_ratio=0.0, linked_ratio=1.0, completed_days=1, chunk_size=10_000):
+    first_day = datetime(2024, 1, 1)
+
+    for start in range(0, count, chunk_size):
+        rows = []
+        for number in range(start, min(start + chunk_size, count)):
+            rows.append({
+                "title": f"Task {number:08d}",
+                "description": f"Description for task {number}",
+                "completed_at": first_day + timedelta(days=number % completed_days) if number % 100 < completed_ratio * 100 else None,
+                "goal_id": goal_ids[number % len(goal_ids)] if goal_ids and number * 37 % 100 < linked_ratio * 100 else None
+            })
+        db.session.execute(db.insert(Task), rows)
+
+    # bulk inserts don't go through the flush that keeps the goal counters in step
+    if goal_ids:
+        recount_goal_counters(db.session, goal_ids)
+    db.session.commit()
+
+
+def seed_goals(count, chunk_size=10_000):
+    for start in range(0, count, chunk_size):
+        rows = [{"title": f"Goal {number:06d}"} for number in range(start, min(start + chunk_size, count))]
+        db.session.execute(db.insert(Goal), rows)
+    db.session.commit()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# turns a list of per-call latencies (in seconds) into the numbers we report, in milliseconds
+def summarize(latencies, elapsed=None):
+    elapsed = elapsed if elapsed is not None else sum(latencies)
+    return {
+        "count": len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "req_per_s": len(latencies) / elapsed if elapsed else 0.0
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    if not rows:
+        return
+
+    columns = list(rows[0].keys())
+    widths = {column: max(len(column), *(len(format_cell(row[column])) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(format_cell(row[column]).ljust(widths[column]) for column in columns))
+
+
+def format_cell(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
@@ -0,0 +1,63 @@
+# simulates clients polling GET /tasks and GET /goals/<id>/tasks where 99% of polls find nothing new.
+# each poll is sent once without validators (always a full 200) and once with the etag from
+# the previous response, in which case unchanged listings come back as an empty 304.
+# one poll in every 100 is preceded by a write, so its listing has changed.
+#
+#   python -m benchmarks.conditional_get --tasks 5000 --polls 2000
+from .common import make_app, seed_tasks, seed_goals, summarize, print_table, timed
+import argparse
+import random
+
+
+def run(conditional, task_count, poll_count, change_rate):
+    app = make_app()
+    with app.app_context():
+        seed_goals(10)
+        seed_tasks(task_count, goal_ids=list(range(1, 11)))
+
+    client = app.test_client()
+    rng = random.Random(7)
+    urls = ["/tasks", "/goals/1/tasks"]
+    etags = {}
+
+    def poll():
+        latencies = []
+        counts = {"200": 0, "304": 0, "bytes": 0}
+        for number in range(poll_count):
+            url = urls[number % len(urls)]
+
+            if rng.random() < change_rate:
+                task_id = rng.randint(1, task_count)
+                client.patch(f"/tasks/{task_id}/mark_complete")
+
+            headers = {"If-None-Match": etags[url]} if conditional and url in etags else {}
+            elapsed, response = timed(client.get, url, headers=headers)
+            latencies.append(elapsed)
+
+            counts[str(response.status_code)] += 1
+            counts["bytes"] += len(response.get_data())
+            if response.status_code == 200:
+                etags[url] = response.headers["ETag"]
+        return latencies, counts
+
+    total, (latencies, counts) = timed(poll)
+
+    row = {"polling": "if-none-match" if conditional else "plain", "200s": counts["200"], "304s": counts["304"],
+           "kb_sent": round(counts["bytes"] / 1024)}
+    row.update(summarize(latencies, elapsed=total))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="conditional GET polling load")
+    parser.add_argument("--tasks", type=int, default=5_000)
+    parser.add_argument("--polls", type=int, default=2_000)
+    parser.add_argument("--change-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    rows = [run(conditional, args.tasks, args.polls, args.change_rate) for conditional in (False, True)]
+    print_table("polling GET /tasks and GET /goals/<id>/tasks", rows)
+
+
+if __name__ == "__main__":
+    main()
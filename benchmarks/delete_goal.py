@@ -0,0 +1,71 @@
+# deletes a goal with --tasks tasks three ways and reports time and peak python memory:
+#   the ORM loading every task to null its goal_id, which is what db.session.delete(goal) did
+#   before Goal.tasks had passive_deletes, then DELETE /goals/<id> (one UPDATE detaches the
+#   tasks) and DELETE /goals/<id>?cascade=tasks (one DELETE removes them).
+# every way gets a freshly seeded database, once timed and once under tracemalloc.
+# runs on a sqlite file, or on postgres with BENCHMARK_DATABASE_URI.
+#
+#   python -m benchmarks.delete_goal --tasks 100000
+from app.db import db
+from app.models.goal import Goal
+from app.models.task import Task
+from .common import make_app, seed_goals, seed_tasks, print_table, timed
+import argparse
+import tracemalloc
+
+
+def orm_per_task(app, client):
+    with app.app_context():
+        goal = db.session.get(Goal, 1)
+        for task in db.session.scalars(db.select(Task).where(Task.goal_id == goal.id)):
+            task.goal_id = None
+        db.session.delete(goal)
+        db.session.commit()
+
+
+def detach(app, client):
+    assert client.delete("/goals/1").status_code == 200
+
+
+def cascade(app, client):
+    assert client.delete("/goals/1?cascade=tasks").status_code == 200
+
+
+def seeded_app(task_count):
+    app = make_app()
+    with app.app_context():
+        seed_goals(2)
+        # every other task belongs to the goal being deleted, the rest to a goal that stays
+        seed_tasks(task_count * 2, goal_ids=[1, 2])
+    return app
+
+
+def remaining_tasks(app):
+    with app.app_context():
+        return db.session.scalar(db.select(db.func.count(Task.id)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="deleting a goal with many tasks")
+    parser.add_argument("--tasks", type=int, default=100_000, help="tasks of the deleted goal")
+    args = parser.parse_args()
+
+    rows = []
+    for name, delete in (("ORM per task (before)", orm_per_task), ("DELETE /goals/<id>", detach), ("DELETE /goals/<id>?cascade=tasks", cascade)):
+        app = seeded_app(args.tasks)
+        elapsed, _ = timed(delete, app, app.test_client())
+        remaining = remaining_tasks(app)
+
+        app = seeded_app(args.tasks)
+        tracemalloc.start()
+        delete(app, app.test_client())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rows.append({"delete": name, "seconds": elapsed, "peak_mb": peak / 1024 / 1024, "tasks_left": remaining})
+
+    print_table(f"deleting a goal with {args.tasks} tasks", rows)
+
+
+if __name__ == "__main__":
+    main()
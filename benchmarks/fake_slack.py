@@ -0,0 +1,82 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+
+# a tiny stand-in for slack's chat.postMessage that runs on localhost.
+# it records every payload it receives and can be told to be slow or to fail,
+# so tests and benchmarks never talk to the real slack api.
+class FakeSlackServer:
+    def __init__(self, delay=0, statuses=None):
+        self.delay = delay
+        # status codes to answer with, in order; once used up every call gets a 200
+        self.statuses = list(statuses or [])
+        self.requests = []
+        # how many tcp connections clients opened, to check keep-alive reuse
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/api/chat.postMessage"
+
+    @property
+    def messages(self):
+        with self.lock:
+            return [payload["text"] for payload in self.requests]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out as separate writes, keep nagle from delaying the body on keep-alive
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                if fake.delay:
+                    time.sleep(fake.delay)
+
+                with fake.lock:
+                    status = fake.statuses.pop(0) if fake.statuses else 200
+                    if status == 200:
+                        fake.requests.append(payload)
+
+                body = json.dumps({"ok": status == 200}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
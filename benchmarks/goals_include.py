@@ -0,0 +1,55 @@
+# a client that wants every goal with its tasks: 1 + N requests (GET /goals, then
+# GET /goals/<id>/tasks for each goal) against one GET /goals?include=tasks.
+#
+#   python -m benchmarks.goals_include --goals 1000 --tasks-per-goal 100
+from .common import make_app, seed_goals, seed_tasks, print_table, timed
+import argparse
+
+
+def one_plus_n(client):
+    goals = client.get("/goals").get_json()
+    for goal in goals:
+        goal["tasks"] = client.get(f"/goals/{goal['id']}/tasks").get_json()["tasks"]
+    return goals, 1 + len(goals)
+
+
+def include_tasks(client):
+    return client.get("/goals?include=tasks").get_json(), 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="goals with their tasks: 1 + N requests vs ?include=tasks")
+    parser.add_argument("--goals", type=int, default=1_000)
+    parser.add_argument("--tasks-per-goal", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_goals(args.goals)
+        seed_tasks(args.goals * args.tasks_per_goal, goal_ids=list(range(1, args.goals + 1)))
+
+    client = app.test_client()
+    rows = []
+    results = []
+    for name, fetch in (("1+N requests", one_plus_n), ("?include=tasks", include_tasks)):
+        times = []
+        for _ in range(args.repeat):
+            elapsed, (goals, requests) = timed(fetch, client)
+            times.append(elapsed)
+        results.append(goals)
+        rows.append({
+            "client": name,
+            "requests": requests,
+            "tasks": sum(len(goal["tasks"]) for goal in goals),
+            "best_ms": min(times) * 1000,
+            "mean_ms": sum(times) / len(times) * 1000
+        })
+
+    # both ways have to hand the client the same goals and tasks
+    assert results[0] == results[1]
+    print_table(f"{args.goals} goals x {args.tasks_per_goal} tasks", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# helps pick WEB_CONCURRENCY and GUNICORN_THREADS for a machine: starts gunicorn with
+# gunicorn.conf.py for each worker class, worker count and thread count in the grid, puts
+# the same concurrent load on each and reports throughput, tail latency and the memory of
+# the workers. the grid is built around --cores (defaults to this machine's).
+# the memory column reads /proc, so it's only filled in on linux.
+#
+#   python -m benchmarks.gunicorn_workers --cores 4 --connections 64 --duration 10
+from .async_load import free_port, generate_load, wait_until_up
+from .common import make_app, seed_goals, seed_tasks, summarize, print_table
+import argparse
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+import subprocess
+import sys
+
+
+def worker_rss_mb(master_pid):
+    total = 0
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            with open(f"/proc/{entry}/stat") as stat:
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+            if parent != master_pid:
+                continue
+            with open(f"/proc/{entry}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+    except OSError:
+        return None
+    return total / 1024
+
+
+def grid(cores):
+    configurations = []
+    for workers in sorted({cores, cores + 1, 2 * cores + 1}):
+        configurations.append(("sync", workers, 1))
+    for workers in sorted({max(1, cores // 2), cores, cores + 1}):
+        for threads in (2, 4, 8):
+            configurations.append(("gthread", workers, threads))
+    if importlib.util.find_spec("gevent") is not None:
+        configurations.append(("gevent", cores, 1))
+    return configurations
+
+
+def run(worker_class, workers, threads, urls, env, connections, duration):
+    port = free_port()
+    env = dict(
+        env,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_ACCESS_LOG="",
+        GUNICORN_LOG_LEVEL="warning",
+        # no recycling during the run, a restarting worker drops its keep-alive connections
+        GUNICORN_MAX_REQUESTS="0",
+        # a pool per worker as big as its threads
+        DB_POOL_SIZE=str(threads),
+        DB_MAX_OVERFLOW="0"
+    )
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"], env=env)
+    try:
+        wait_until_up(port)
+        latencies, errors, elapsed = asyncio.run(generate_load(port, urls, connections, duration))
+        memory = worker_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    stats = summarize(latencies, elapsed=elapsed)
+    return {
+        "class": worker_class,
+        "workers": workers,
+        "threads": threads,
+        "errors": len(errors),
+        "req_per_s": stats["req_per_s"],
+        "p50_ms": stats["p50_ms"],
+        "p99_ms": stats["p99_ms"],
+        "rss_mb": memory if memory is not None else "-"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gunicorn worker and thread counts")
+    parser.add_argument("--cores", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_goals(100)
+        seed_tasks(2_000, goal_ids=list(range(1, 101)))
+        database_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+
+    urls = ["/tasks?limit=50"] + [f"/tasks/{task_id}" for task_id in range(1, 2_001, 10)] + [
+        f"/goals/{goal_id}/tasks" for goal_id in range(1, 101)
+    ]
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=database_uri)
+
+    rows = [
+        run(worker_class, workers, threads, urls, env, args.connections, args.duration)
+        for worker_class, workers, threads in grid(args.cores)
+    ]
+    rows.sort(key=lambda row: -row["req_per_s"])
+    print_table(f"gunicorn on {args.cores} cores, {args.connections} connections, fastest first", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# times `flask tasks export` and `flask tasks import` (app/transfer.py) in both formats:
+# exports --tasks seeded tasks to a file, then imports that file into a fresh empty database.
+# every step runs once timed and once under tracemalloc, and is run for each --tasks size so
+# it shows that peak python memory stays flat as the row count grows.
+# runs on sqlite files (chunked executemany), or on postgres with BENCHMARK_DATABASE_URI
+# (COPY, or INSERTs with --no-copy).
+#
+#   python -m benchmarks.import_export --tasks 100000 1000000
+from app.db import db
+from app.transfer import export_tasks, import_tasks
+from .common import make_app, seed_goals, seed_tasks, print_table, timed
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+TARGET_ROWS = 10_000_000
+
+
+def run_export(app, path, file_format, batch_size, use_copy):
+    with app.app_context(), open(path, "w", encoding="utf-8", newline="") as out:
+        return export_tasks(out, file_format, batch_size, use_copy=use_copy)
+
+
+def run_import(app, path, file_format, chunk_size, use_copy):
+    with app.app_context(), open(path, encoding="utf-8", newline="") as source:
+        count, _ = import_tasks(source, file_format, chunk_size, use_copy=use_copy)
+        db.session.commit()
+        return count
+
+
+def measure(step, *args):
+    elapsed, count = timed(step, *args)
+
+    tracemalloc.start()
+    step(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return count, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bulk task export and import throughput")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--goals", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--no-copy", action="store_true", help="use INSERTs on postgres too")
+    args = parser.parse_args()
+
+    rows = []
+    directory = tempfile.mkdtemp(prefix="task-list-transfer-")
+    for task_count in args.tasks:
+        source_app = make_app()
+        with source_app.app_context():
+            seed_goals(args.goals)
+            seed_tasks(task_count, goal_ids=list(range(1, args.goals + 1)), completed_ratio=0.3, linked_ratio=0.8)
+
+        for file_format in ("ndjson", "csv"):
+            path = os.path.join(directory, f"tasks-{task_count}.{file_format}")
+            steps = [
+                ("export", run_export, source_app),
+                # the tracemalloc pass imports the file a second time, that's fine for timing the first
+                ("import", run_import, make_app())
+            ]
+            for name, step, app in steps:
+                count, elapsed, peak = measure(step, app, path, file_format, args.chunk_size, not args.no_copy)
+                rows.append({
+                    "tasks": task_count,
+                    "format": file_format,
+                    "step": name,
+                    "seconds": elapsed,
+                    "rows_per_s": count / elapsed,
+                    "peak_mb": peak / 1024 / 1024,
+                    "10M_est_min": TARGET_ROWS / (count / elapsed) / 60
+                })
+            os.remove(path)
+
+    print_table(f"export and import, chunks of {args.chunk_size}", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# shows the query plans and latencies of the hot listing queries without and with
+# the indexes on task and goal. the indexes are dropped, the queries run, then the
+# indexes are created again and the queries run a second time.
+# seeds 1M tasks by default, the size the plans were chosen for. pass a smaller --tasks for
+# a quick check, the planner may pick a seq scan on small tables either way.
+#
+#   python -m benchmarks.indexes --tasks 1000000
+#   BENCHMARK_DATABASE_URI=postgresql://... python -m benchmarks.indexes
+from app.db import db
+from app.models.task import Task
+from .common import make_app, seed_goals, seed_tasks, summarize, print_table, timed
+import argparse
+
+
+def hot_queries():
+    return {
+        "tasks by goal": db.select(Task).where(Task.goal_id == 7),
+        "sort asc, first page": db.select(Task).order_by(Task.title, Task.id).limit(100),
+        "sort desc, first page": db.select(Task).order_by(Task.title.desc(), Task.id).limit(100),
+        "incomplete tasks": db.select(Task).where(Task.completed_at.is_(None)).order_by(Task.id).limit(100),
+        "title search": db.select(Task).where(Task.title.ilike("%0042%")).limit(100),
+    }
+
+
+def explain(query):
+    sql = str(query.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    rows = db.session.execute(db.text(prefix + sql)).all()
+    return " | ".join(str(row[-1]) for row in rows)
+
+
+def run_queries(label, repeats):
+    rows = []
+    for name, query in hot_queries().items():
+        latencies = []
+        for _ in range(repeats):
+            elapsed, _ = timed(lambda: db.session.execute(query).all())
+            latencies.append(elapsed)
+        summary = summarize(latencies)
+        rows.append({"indexes": label, "query": name, "p50_ms": summary["p50_ms"], "p99_ms": summary["p99_ms"], "plan": explain(query)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="query plans before and after indexes")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--goals", type=int, default=1_000)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_goals(args.goals)
+        seed_tasks(args.tasks, goal_ids=list(range(1, args.goals + 1)), completed_ratio=0.9)
+
+        indexes = list(Task.__table__.indexes)
+        for index in indexes:
+            index.drop(db.engine)
+        db.session.execute(db.text("ANALYZE"))
+        rows = run_queries("without", args.repeats)
+
+        for index in indexes:
+            index.create(db.engine)
+        db.session.execute(db.text("ANALYZE"))
+        rows += run_queries("with", args.repeats)
+
+    print_table("hot listing queries", rows)
+
+
+if __name__ == "__main__":
+    main()
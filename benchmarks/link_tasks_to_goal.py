@@ -0,0 +1,55 @@
+# times POST /goals/<id>/tasks linking 1k/10k/100k existing tasks to a goal,
+# next to the old approach of looking up and updating every task one at a time.
+#
+#   python -m benchmarks.link_tasks_to_goal --sizes 1000 10000 100000
+from app.db import db
+from app.models.goal import Goal
+from app.models.task import Task
+from .common import make_app, seed_goals, seed_tasks, print_table, timed
+import argparse
+
+
+# what the endpoint used to do: one SELECT per id, then an ORM update of each object
+def link_one_by_one(goal_id, task_ids):
+    goal = db.session.get(Goal, goal_id)
+    linked = []
+    for task_id in task_ids:
+        task = db.session.get(Task, task_id)
+        if task:
+            task.goal = goal
+            linked.append(task.id)
+    db.session.commit()
+    return linked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="linking tasks to a goal")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--skip-old", action="store_true", help="only time the bulk endpoint")
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        app = make_app()
+        with app.app_context():
+            seed_goals(2)
+            seed_tasks(size)
+
+        task_ids = list(range(1, size + 1))
+        client = app.test_client()
+        elapsed, response = timed(client.post, "/goals/1/tasks", json={"task_ids": task_ids})
+        assert response.status_code == 200
+        assert len(response.get_json()["task_ids"]) == size
+        rows.append({"ids": size, "approach": "bulk UPDATE ... RETURNING", "seconds": elapsed, "ids_per_s": size / elapsed})
+
+        if not args.skip_old:
+            with app.app_context():
+                elapsed, linked = timed(link_one_by_one, 2, task_ids)
+                assert len(linked) == size
+            rows.append({"ids": size, "approach": "one SELECT per id", "seconds": elapsed, "ids_per_s": size / elapsed})
+
+    print_table("POST /goals/<id>/tasks", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# cpu time and peak python memory of building the GET /tasks body for a big listing,
+# with full Task objects (what the endpoint used to do), with load_only/raiseload,
+# and with the column-only select the endpoint uses now.
+# cpu is measured without tracing, memory in a second run under tracemalloc.
+#
+#   python -m benchmarks.listing_profile --tasks 500000
+from .common import make_app, seed_tasks, print_table
+from app.db import db
+from app.models.task import Task
+from app.serializers import TASK_FIELDS, columns, serialize_task_rows, task_to_dict
+from sqlalchemy.orm import load_only, raiseload
+import argparse
+import gc
+import time
+import tracemalloc
+
+
+def orm_listing():
+    tasks = db.session.scalars(db.select(Task).order_by(Task.id))
+    return [task_to_dict(task.id, task.title, task.description, task.completed_at) for task in tasks]
+
+
+def load_only_listing():
+    query = (
+        db.select(Task)
+        .options(load_only(Task.title, Task.description, Task.completed_at), raiseload("*"))
+        .order_by(Task.id)
+    )
+    tasks = db.session.scalars(query)
+    return [task_to_dict(task.id, task.title, task.description, task.completed_at) for task in tasks]
+
+
+def columns_listing():
+    return serialize_task_rows(db.session.execute(db.select(*columns(Task, TASK_FIELDS)).order_by(Task.id)))
+
+
+def measure(app, listing, traced):
+    with app.app_context():
+        gc.collect()
+        if traced:
+            tracemalloc.start()
+
+        start = time.process_time()
+        body = listing()
+        cpu = time.process_time() - start
+
+        peak = 0
+        if traced:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        count = len(body)
+        del body
+        db.session.remove()
+
+    return cpu, peak, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="task listing cpu and memory profile")
+    parser.add_argument("--tasks", type=int, default=500_000)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_tasks(args.tasks, completed_ratio=0.3)
+
+    rows = []
+    for name, listing in (("orm", orm_listing), ("load_only", load_only_listing), ("columns", columns_listing)):
+        cpu, _, count = measure(app, listing, traced=False)
+        _, peak, _ = measure(app, listing, traced=True)
+        rows.append({"listing": name, "rows": count, "cpu_s": cpu, "peak_mb": peak / 1024 / 1024})
+
+    print_table(f"building the body of a {args.tasks} task listing", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# measures PATCH /tasks/<id>/mark_complete latency while the (fake) slack api gets slower.
+# with notifications going through the background dispatcher, p99 should stay flat
+# no matter how long slack takes to answer.
+#
+#   python -m benchmarks.mark_complete_latency --requests 500 --delays 0 0.05 0.25
+from app.notifications import notifier
+from .fake_slack import FakeSlackServer
+from .common import make_app, seed_tasks, summarize, print_table, timed
+import argparse
+
+
+def run(request_count, slack_delay):
+    with FakeSlackServer(delay=slack_delay) as fake_slack:
+        app = make_app(
+            SLACK_NOTIFICATIONS_ENABLED=True,
+            SLACK_API_URL=fake_slack.url,
+            SLACK_QUEUE_SIZE=request_count
+        )
+        with app.app_context():
+            seed_tasks(request_count)
+
+        client = app.test_client()
+        latencies = []
+        for task_id in range(1, request_count + 1):
+            elapsed, response = timed(client.patch, f"/tasks/{task_id}/mark_complete")
+            assert response.status_code == 200
+            latencies.append(elapsed)
+
+        dispatcher = notifier.get_dispatcher(app)
+        drain_time, _ = timed(dispatcher.flush, 60)
+        dispatcher.shutdown()
+
+    result = {"slack_delay_ms": slack_delay * 1000}
+    result.update(summarize(latencies))
+    result["drain_s"] = drain_time
+    result["slack_posts"] = len(fake_slack.requests)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mark_complete latency vs slack latency")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--delays", type=float, nargs="+", default=[0, 0.05, 0.25])
+    args = parser.parse_args()
+
+    rows = [run(args.requests, delay) for delay in args.delays]
+    print_table("mark_complete latency vs slack latency", rows)
+
+
+if __name__ == "__main__":
+    main()
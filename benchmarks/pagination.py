@@ -0,0 +1,82 @@
+# seeds a large task table and compares fetching the first page and a deep page
+# with keyset pagination (the query GET /tasks?limit=&cursor= runs) against LIMIT/OFFSET.
+# both are timed as the bare listing query, selecting the columns the listing sends,
+# so the only difference is how the page is found.
+# keyset cost stays flat with depth, offset has to walk past every skipped row.
+#
+#   python -m benchmarks.pagination --tasks 1000000 --limit 100
+from app.db import db
+from app.models.task import Task
+from app.routes.route_utilities import apply_sort, get_sort_columns, keyset_condition
+from app.serializers import TASK_FIELDS, columns
+from .common import make_app, seed_tasks, summarize, print_table, timed
+import argparse
+
+
+def listing_query(sort_columns):
+    return apply_sort(db.select(*columns(Task, TASK_FIELDS)), sort_columns)
+
+
+def offset_page(sort_columns, offset, limit):
+    return db.session.execute(listing_query(sort_columns).offset(offset).limit(limit)).all()
+
+
+def keyset_page(sort_columns, after, limit):
+    query = listing_query(sort_columns)
+    if after is not None:
+        query = query.where(keyset_condition(sort_columns, after))
+    return db.session.execute(query.limit(limit)).all()
+
+
+def cursor_values(sort_columns, offset):
+    # the sort values a client's cursor holds after paging down to `offset`
+    if offset == 0:
+        return None
+    last = db.session.execute(listing_query(sort_columns).offset(offset - 1).limit(1)).one()
+    return [getattr(last, column.key) for column, _ in sort_columns]
+
+
+def run(app, sort_param, offset, limit, repeats):
+    with app.app_context():
+        sort_columns = get_sort_columns(Task, sort_param)
+        after = cursor_values(sort_columns, offset)
+
+        latencies = {"offset": [], "keyset": []}
+        for _ in range(repeats):
+            elapsed, offset_rows = timed(offset_page, sort_columns, offset, limit)
+            latencies["offset"].append(elapsed)
+            elapsed, keyset_rows = timed(keyset_page, sort_columns, after, limit)
+            latencies["keyset"].append(elapsed)
+            # same page either way
+            assert len(keyset_rows) == limit and keyset_rows == offset_rows
+
+    rows = []
+    for label in ("offset", "keyset"):
+        row = {"strategy": label, "sort": sort_param or "id", "depth": offset}
+        row.update(summarize(latencies[label]))
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="keyset vs offset pagination")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        elapsed, _ = timed(seed_tasks, args.tasks)
+        print(f"seeded {args.tasks} tasks in {elapsed:.1f}s")
+
+    rows = []
+    for sort_param in (None, "asc"):
+        for depth in (0, args.tasks // 2, args.tasks - args.limit):
+            rows.extend(run(app, sort_param, depth, args.limit, args.repeats))
+
+    print_table("first page and deep page latency", rows)
+
+
+if __name__ == "__main__":
+    main()
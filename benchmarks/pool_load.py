@@ -0,0 +1,69 @@
+# load test of the connection pool: more threads than pooled connections hammer
+# GET /tasks?limit=20 and GET /goals/<id>/tasks, and /_internal/pool afterwards shows
+# how long checkouts waited and whether any gave up. the default per-worker pool serves
+# every request, a pool squeezed down to one connection with a short timeout shows
+# what starvation looks like.
+# runs on a sqlite file, or on postgres with BENCHMARK_DATABASE_URI.
+#
+#   python -m benchmarks.pool_load --threads 32 --requests 200
+from .common import make_app, seed_goals, seed_tasks, summarize, print_table, timed
+from app.pool import POOL_SETTINGS
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+
+
+def run(name, threads, request_count, goals, **pool_config):
+    app = make_app(INTERNAL_ENDPOINTS_ENABLED=True, **pool_config)
+    with app.app_context():
+        seed_goals(goals)
+        seed_tasks(goals * 20, goal_ids=list(range(1, goals + 1)))
+
+    def worker(number):
+        client = app.test_client()
+        latencies = []
+        errors = 0
+        for count in range(request_count):
+            url = "/tasks?limit=20" if count % 2 else f"/goals/{(number + count) % goals + 1}/tasks"
+            try:
+                elapsed, response = timed(client.get, url)
+                latencies.append(elapsed)
+                errors += response.status_code != 200
+            except Exception:
+                errors += 1
+        return latencies, errors
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total, results = timed(lambda: list(executor.map(worker, range(threads))))
+
+    stats = app.test_client().get("/_internal/pool").get_json()
+
+    latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+    row = {
+        "pool": name,
+        "errors": sum(errors for _, errors in results),
+        "timeouts": stats["timeouts"],
+        "wait_mean_ms": stats["wait_mean_ms"],
+        "wait_max_ms": stats["wait_max_ms"]
+    }
+    row.update(summarize(latencies, elapsed=total))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="connection pool load test")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--goals", type=int, default=50)
+    args = parser.parse_args()
+
+    default_size = f"{POOL_SETTINGS['DB_POOL_SIZE']}+{POOL_SETTINGS['DB_MAX_OVERFLOW']}"
+    rows = [
+        run(f"default {default_size}", args.threads, args.requests, args.goals),
+        run("starved 1+0", args.threads, args.requests, args.goals,
+            DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0.05)
+    ]
+    print_table(f"{args.threads} threads x {args.requests} requests", rows)
+
+
+if __name__ == "__main__":
+    main()
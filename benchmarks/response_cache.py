@@ -0,0 +1,49 @@
+# polls GET /tasks/<id> the way a dashboard does and compares read throughput with the
+# response cache off and on. the requests are spread over `requests * 5%` distinct ids,
+# so every id misses once and is then served from the cache, a 95% hit rate.
+#
+#   python -m benchmarks.response_cache --requests 20000
+from .common import make_app, seed_tasks, summarize, print_table, timed
+import argparse
+import random
+
+
+def run(backend, request_count, distinct_ids):
+    app = make_app(RESPONSE_CACHE_BACKEND=backend, INTERNAL_ENDPOINTS_ENABLED=True)
+    with app.app_context():
+        seed_tasks(distinct_ids)
+
+    ids = [number % distinct_ids + 1 for number in range(request_count)]
+    random.Random(7).shuffle(ids)
+
+    client = app.test_client()
+
+    def poll():
+        latencies = []
+        for task_id in ids:
+            elapsed, response = timed(client.get, f"/tasks/{task_id}")
+            assert response.status_code == 200
+            latencies.append(elapsed)
+        return latencies
+
+    total, latencies = timed(poll)
+
+    stats = client.get("/_internal/cache").get_json()
+    row = {"cache": backend, "hit_rate": stats["hit_rate"]}
+    row.update(summarize(latencies, elapsed=total))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="response cache read throughput")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--hit-rate", type=float, default=0.95)
+    args = parser.parse_args()
+
+    distinct_ids = max(1, round(args.requests * (1 - args.hit_rate)))
+    rows = [run(backend, args.requests, distinct_ids) for backend in ("null", "lru")]
+    print_table("GET /tasks/<id> throughput", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# seeds tasks with random words and times GET /tasks/search?q= against the old
+# GET /tasks?title= substring filter. on sqlite the search uses the in-memory inverted index
+# (the first call builds it and is reported separately), on postgres the tsvector GIN index.
+# seeds 1M tasks by default, the size the search has to stay under 50 ms at.
+#
+#   python -m benchmarks.search --tasks 1000000
+#   BENCHMARK_DATABASE_URI=postgresql://... python -m benchmarks.search
+from app.db import db
+from app.models.task import Task
+from .common import make_app, summarize, print_table, timed
+import argparse
+import random
+
+WORDS = (
+    "garden water email invoice report meeting groceries laundry dentist budget taxes "
+    "plan review draft call friend family trip book flight hotel car repair paint fence "
+    "clean kitchen garage closet recycle donate walk run yoga swim bike read write code"
+).split()
+
+
+def seed_word_tasks(count, chunk_size=10_000):
+    generator = random.Random(42)
+    for start in range(0, count, chunk_size):
+        rows = []
+        for _ in range(start, min(start + chunk_size, count)):
+            rows.append({
+                "title": " ".join(generator.sample(WORDS, 3)),
+                "description": " ".join(generator.sample(WORDS, 8)),
+            })
+        db.session.execute(db.insert(Task), rows)
+    db.session.commit()
+
+
+def time_requests(client, url, repeats):
+    latencies = []
+    for _ in range(repeats):
+        elapsed, response = timed(client.get, url)
+        assert response.status_code == 200
+        latencies.append(elapsed)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="full-text search latency")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_word_tasks(args.tasks)
+
+    client = app.test_client()
+    rows = []
+
+    build_time, _ = timed(client.get, "/tasks/search?q=warmup")
+    rows.append({"request": "first search (builds index on sqlite)", "p50_ms": build_time * 1000, "p99_ms": build_time * 1000})
+
+    for label, url in (
+        ("search q=garden", "/tasks/search?q=garden&limit=20"),
+        ("search q=paint fence", "/tasks/search?q=paint%20fence&limit=20"),
+        ("title ilike, first 20", "/tasks?title=garden&limit=20"),
+    ):
+        summary = summarize(time_requests(client, url, args.repeats))
+        rows.append({"request": label, "p50_ms": summary["p50_ms"], "p99_ms": summary["p99_ms"]})
+
+    print_table(f"search over {args.tasks} tasks", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# compares the ways of turning a big task listing into a json body:
+#   orm+json:     load Task objects, Task.to_dict(), encode with the standard library provider
+#   rows+json:    select only the columns, serialize_task_rows(), standard library provider
+#   rows+orjson:  the same rows, encoded by the orjson provider
+# load, build and encode are timed separately, best of --repeat runs.
+#
+#   python -m benchmarks.serialization --tasks 100000
+from .common import make_app, seed_tasks, print_table, timed
+from app.db import db
+from app.json_provider import OrjsonProvider, orjson
+from app.models.task import Task
+from app.serializers import TASK_FIELDS, columns, serialize_task_rows
+from flask.json.provider import DefaultJSONProvider
+import argparse
+
+
+def load_orm():
+    return list(db.session.scalars(db.select(Task).order_by(Task.id)))
+
+
+def load_rows():
+    return list(db.session.execute(db.select(*columns(Task, TASK_FIELDS)).order_by(Task.id)))
+
+
+def build_orm(tasks):
+    return [task.to_dict() for task in tasks]
+
+
+def run(app, name, load, build, provider, repeat):
+    best = None
+    for _ in range(repeat):
+        with app.app_context():
+            # every run starts from an empty identity map, like a fresh request
+            db.session.expunge_all()
+            load_time, rows = timed(load)
+            build_time, body = timed(build, rows)
+            encode_time, encoded = timed(provider.dumps, body)
+            db.session.remove()
+
+        total = load_time + build_time + encode_time
+        if best is None or total < best["total_ms"]:
+            best = {
+                "listing": name,
+                "load_ms": load_time * 1000,
+                "build_ms": build_time * 1000,
+                "encode_ms": encode_time * 1000,
+                "total_ms": total,
+                "kb": round(len(encoded) / 1024)
+            }
+
+    best["total_ms"] *= 1000
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="task listing serialization")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_tasks(args.tasks, completed_ratio=0.3)
+
+    default = DefaultJSONProvider(app)
+    rows = [
+        run(app, "orm+json", load_orm, build_orm, default, args.repeat),
+        run(app, "rows+json", load_rows, serialize_task_rows, default, args.repeat)
+    ]
+    if orjson is not None:
+        rows.append(run(app, "rows+orjson", load_rows, serialize_task_rows, OrjsonProvider(app), args.repeat))
+
+    print_table(f"listing {args.tasks} tasks", rows)
+
+
+if __name__ == "__main__":
+    main()
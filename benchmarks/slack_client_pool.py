@@ -0,0 +1,66 @@
+# compares calls/sec against a local stub of slack's api for
+#   - a bare requests.post per call (a new connection every time, like the old route did)
+#   - the pooled, keep-alive SlackClient the app now uses
+# at a few levels of concurrency. the stub is plain http on localhost, so this only shows
+# the tcp setup we save; against the real slack the saved tls handshake makes the gap bigger.
+#
+#   python -m benchmarks.slack_client_pool --calls 2000 --threads 1 4 8
+from app.notifications import SlackClient
+from concurrent.futures import ThreadPoolExecutor
+from .fake_slack import FakeSlackServer
+from .common import summarize, print_table, timed
+import argparse
+import requests
+
+
+def unpooled_post(url, text):
+    return requests.post(
+        url,
+        json={"channel": "bench", "text": text},
+        headers={"Authorization": "Bearer bench"},
+        timeout=(3.05, 10)
+    )
+
+
+def run(label, post, calls, threads):
+    def one_call(number):
+        elapsed, response = timed(post, f"message {number}")
+        assert response.status_code == 200
+        return elapsed
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total, latencies = timed(lambda: list(pool.map(one_call, range(calls))))
+
+    result = {"client": label, "threads": threads}
+    result.update(summarize(latencies, elapsed=total))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="slack client pooling benchmark")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    rows = []
+    with FakeSlackServer() as fake_slack:
+        for threads in args.threads:
+            client = SlackClient({
+                "SLACK_API_URL": fake_slack.url,
+                "SLACK_API_KEY": "bench",
+                "SLACK_CHANNEL": "bench",
+                "SLACK_TIMEOUT": (3.05, 10),
+                "SLACK_POOL_SIZE": threads
+            })
+            rows.append(run("requests.post", lambda text: unpooled_post(fake_slack.url, text), args.calls, threads))
+            rows.append(run("pooled session", client.post_message, args.calls, threads))
+            client.close()
+
+        connections = fake_slack.connections
+
+    print_table("slack calls/sec with and without a connection pool", rows)
+    print(f"\ntcp connections opened in total: {connections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# what a completion dashboard costs: the numbers counted client-side from GET /tasks and
+# GET /goals/<id>/tasks (every row over the wire), against GET /tasks/stats and
+# GET /goals/<id>/stats counted in sql, with the goal totals read from the goal's
+# counters (STATS_USE_COUNTERS) or counted from its tasks.
+# no etags are sent, so every request is computed from scratch.
+# runs on a sqlite file, or on postgres with BENCHMARK_DATABASE_URI.
+#
+#   python -m benchmarks.stats --tasks 1000000 --goals 1000
+from .common import make_app, seed_goals, seed_tasks, summarize, print_table, timed
+import argparse
+
+
+def count_client_side(tasks):
+    completed = sum(task["is_complete"] for task in tasks)
+    return len(tasks), completed
+
+
+def all_tasks_client_side(client, goal_id):
+    return count_client_side(client.get("/tasks").get_json())
+
+
+def goal_tasks_client_side(client, goal_id):
+    return count_client_side(client.get(f"/goals/{goal_id}/tasks").get_json()["tasks"])
+
+
+def stats_response(url):
+    def fetch(client, goal_id):
+        stats = client.get(url.format(goal_id=goal_id)).get_json()["stats"]
+        return stats["total"], stats["completed"]
+    return fetch
+
+
+def run(app, name, fetch, goals, repeat, use_counters=True):
+    app.config["STATS_USE_COUNTERS"] = use_counters
+    client = app.test_client()
+
+    latencies = []
+    answers = set()
+    for number in range(repeat):
+        elapsed, answer = timed(fetch, client, number * 7919 % goals + 1)
+        latencies.append(elapsed)
+        if number == 0:
+            answers.add(answer)
+
+    row = {"request": name}
+    row.update(summarize(latencies))
+    return row, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="completion stats counted client-side, in sql, and from goal counters")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--goals", type=int, default=1_000)
+    parser.add_argument("--completed-ratio", type=float, default=0.3)
+    parser.add_argument("--days", type=int, default=365, help="days the completions are spread over")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--listing-repeat", type=int, default=3, help="repeats of the full GET /tasks, which is slow")
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_goals(args.goals)
+        seed_tasks(
+            args.tasks,
+            goal_ids=list(range(1, args.goals + 1)),
+            completed_ratio=args.completed_ratio,
+            completed_days=args.days
+        )
+
+    cases = [
+        ("GET /tasks, counted by the client", all_tasks_client_side, args.listing_repeat, True),
+        ("GET /tasks/stats", stats_response("/tasks/stats"), args.repeat, True),
+        ("GET /goals/<id>/tasks, counted by the client", goal_tasks_client_side, args.repeat, True),
+        ("GET /goals/<id>/stats, counted from tasks", stats_response("/goals/{goal_id}/stats"), args.repeat, False),
+        ("GET /goals/<id>/stats, from counters", stats_response("/goals/{goal_id}/stats"), args.repeat, True)
+    ]
+
+    rows = []
+    for name, fetch, repeat, use_counters in cases:
+        row, _ = run(app, name, fetch, args.goals, repeat, use_counters)
+        rows.append(row)
+
+    # the counters and the counts have to agree for the goal the three goal requests start with
+    goal_answers = [run(app, name, fetch, args.goals, 1, use_counters)[1] for name, fetch, _, use_counters in cases[2:]]
+    assert goal_answers[0] == goal_answers[1] == goal_answers[2], goal_answers
+
+    print_table(f"{args.tasks} tasks in {args.goals} goals, completions over {args.days} days", rows)
+
+
+if __name__ == "__main__":
+    main()
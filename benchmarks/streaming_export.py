@@ -0,0 +1,57 @@
+# exports every task through GET /tasks as a json list and as a ?stream=1 ndjson stream,
+# and reports the peak python memory (tracemalloc) and time for each. the list response
+# grows with the table, the stream should stay roughly flat. by default it runs at 100k
+# and at 1M tasks: flat means about the same peak at both sizes. the list export at 1M needs a
+# few GB of memory, pass smaller --tasks on a small machine.
+#
+#   python -m benchmarks.streaming_export --tasks 1000000
+from .common import make_app, seed_tasks, print_table, timed
+import argparse
+import tracemalloc
+
+
+def export(client, url):
+    response = client.get(url, buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    return size
+
+
+def measure(client, label, url):
+    tracemalloc.start()
+    elapsed, size = timed(export, client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mode": label,
+        "seconds": elapsed,
+        "body_mb": size / 2**20,
+        "peak_python_mb": peak / 2**20
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="list vs streamed export memory")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.tasks:
+        app = make_app()
+        with app.app_context():
+            seed_tasks(count)
+
+        client = app.test_client()
+        for label, url in (("json list", "/tasks"), ("ndjson stream", "/tasks?stream=1")):
+            row = {"tasks": count}
+            row.update(measure(client, label, url))
+            rows.append(row)
+
+    print_table("exporting every task", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+# the benchmark suite for the whole api. it seeds a dataset with bulk inserts, sends every
+# endpoint of tasks_bp and goals_bp the same number of requests and reports p50/p95/p99 and
+# req/s for each one, against two targets:
+#   client: the flask test client, one request at a time, which is the app's own cost without http
+#   server: gunicorn (gunicorn.conf.py, gthread workers) on a local port, hit by --concurrency
+#           keep-alive connections, which is what a real client sees
+# every target gets a freshly seeded database, since the write endpoints change the data.
+# the results are saved as json under benchmarks/results/ with the commit they were measured
+# on, and --compare prints the change against an earlier file.
+# runs on a sqlite file without any network (slack messages go to the outbox table);
+# set BENCHMARK_DATABASE_URI to run it on a local postgres.
+#
+#   python -m benchmarks.suite --tasks 10000 --goals 100 --linked-ratio 0.8 --completed-ratio 0.3
+#   python -m benchmarks.suite --targets client --only get_task create_task
+#   python -m benchmarks.suite --compare benchmarks/results/<earlier>.json
+#   python -m benchmarks.suite --compare <older>.json <newer>.json
+from .async_load import free_port, wait_until_up
+from .common import make_app, seed_goals, seed_tasks, summarize, print_table
+from app import create_app
+from app.db import db
+from app.models.goal import Goal
+from app.models.task import Task
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+TARGETS = ("client", "server")
+BLUEPRINTS = ("tasks_bp", "goals_bp")
+
+# how many tasks or ids the bulk scenarios send per request
+BULK_SIZE = 10
+
+
+# one endpoint and how to call it. `url`, `body` and `headers` are called with the number of
+# the request and whatever `prepare(count, send)` returned, so every request can pick its own
+# row. prepare runs untimed before the scenario, to insert the rows a delete will remove or to
+# fetch an etag; `send` makes a request against the target being measured.
+class Scenario:
+    def __init__(self, name, endpoint, method, url, status=200, body=None, headers=None, prepare=None):
+        self.name = name
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.status = status
+        self.body = body
+        self.headers = headers
+        self.prepare = prepare
+
+    def build_requests(self, count, prepared):
+        requests = []
+        for number in range(count):
+            body = self.body(number, prepared) if self.body else None
+            headers = self.headers(number, prepared) if self.headers else None
+            requests.append((self.method, self.url(number, prepared), body, headers))
+        return requests
+
+
+# the ids of the seeded rows. reads walk through them with a prime stride so consecutive
+# requests hit rows far apart, and the single-resource cache sees a realistic mix of hits and misses.
+class Dataset:
+    def __init__(self, tasks, goals, linked_ratio, completed_ratio):
+        self.tasks = tasks
+        self.goals = goals
+        self.linked_ratio = linked_ratio
+        self.completed_ratio = completed_ratio
+
+    def task_id(self, number):
+        return number * 7919 % self.tasks + 1
+
+    def goal_id(self, number):
+        return number * 7919 % self.goals + 1
+
+    def task_ids(self, number):
+        return [self.task_id(number * BULK_SIZE + offset) for offset in range(BULK_SIZE)]
+
+    def seed(self):
+        seed_goals(self.goals)
+        seed_tasks(
+            self.tasks,
+            goal_ids=list(range(1, self.goals + 1)),
+            completed_ratio=self.completed_ratio,
+            linked_ratio=self.linked_ratio
+        )
+
+    def to_dict(self):
+        return {
+            "tasks": self.tasks,
+            "goals": self.goals,
+            "linked_ratio": self.linked_ratio,
+            "completed_ratio": self.completed_ratio
+        }
+
+
+# inserts rows that only a delete scenario uses, so deleting them leaves the dataset alone
+def insert_rows(cls, rows):
+    ids = list(db.session.scalars(db.insert(cls).returning(cls.id, sort_by_parameter_order=True), rows))
+    db.session.commit()
+    return ids
+
+
+def extra_tasks(count):
+    return insert_rows(Task, [{"title": f"Extra {number}", "description": "to delete"} for number in range(count)])
+
+
+def extra_goals(count):
+    return insert_rows(Goal, [{"title": f"Extra {number}"} for number in range(count)])
+
+
+def current_etag(url):
+    def prepare(count, send):
+        _, headers = send("GET", url)
+        return headers["ETag"]
+    return prepare
+
+
+# every endpoint of tasks_bp and goals_bp, reads first, then writes, then deletes.
+# endpoints with more than one interesting path (paged, streamed, 304) get a scenario each.
+def build_scenarios(dataset):
+    task_id = dataset.task_id
+    goal_id = dataset.goal_id
+    task_ids = dataset.task_ids
+
+    return [
+        Scenario("list_tasks", "tasks_bp.get_all_tasks", "GET", lambda n, _: "/tasks"),
+        Scenario("list_tasks_page", "tasks_bp.get_all_tasks", "GET", lambda n, _: "/tasks?limit=50&sort=asc"),
+        Scenario("list_tasks_stream", "tasks_bp.get_all_tasks", "GET", lambda n, _: "/tasks?stream=1"),
+        Scenario(
+            "list_tasks_not_modified", "tasks_bp.get_all_tasks", "GET", lambda n, _: "/tasks?limit=50",
+            status=304,
+            headers=lambda n, etag: {"If-None-Match": etag},
+            prepare=current_etag("/tasks?limit=50")
+        ),
+        Scenario("search_tasks", "tasks_bp.search_all_tasks", "GET", lambda n, _: f"/tasks/search?q=task%20{n % 100}"),
+        Scenario("task_stats", "tasks_bp.get_task_stats", "GET", lambda n, _: "/tasks/stats"),
+        Scenario("get_task", "tasks_bp.get_one_task", "GET", lambda n, _: f"/tasks/{task_id(n)}"),
+        Scenario("list_goals", "goals_bp.get_all_goals", "GET", lambda n, _: "/goals?limit=50"),
+        Scenario(
+            "list_goals_with_tasks", "goals_bp.get_all_goals", "GET",
+            lambda n, _: "/goals?include=tasks&limit=20&tasks_limit=10"
+        ),
+        Scenario("get_goal", "goals_bp.get_one_goal", "GET", lambda n, _: f"/goals/{goal_id(n)}"),
+        Scenario(
+            "get_goal_with_tasks", "goals_bp.get_one_goal", "GET",
+            lambda n, _: f"/goals/{goal_id(n)}?include=tasks&limit=20"
+        ),
+        Scenario("goal_tasks", "goals_bp.get_tasks_by_goal", "GET", lambda n, _: f"/goals/{goal_id(n)}/tasks"),
+        Scenario("goal_stats", "goals_bp.get_goal_stats", "GET", lambda n, _: f"/goals/{goal_id(n)}/stats"),
+        Scenario(
+            "create_task", "tasks_bp.create_task", "POST", lambda n, _: "/tasks",
+            status=201,
+            body=lambda n, _: {"title": f"New task {n}", "description": "created by the benchmark"}
+        ),
+        Scenario(
+            "create_tasks_bulk", "tasks_bp.create_tasks_in_bulk", "POST", lambda n, _: "/tasks/bulk",
+            status=201,
+            body=lambda n, _: [
+                {"title": f"New task {n}.{offset}", "description": "created by the benchmark"}
+                for offset in range(BULK_SIZE)
+            ]
+        ),
+        Scenario(
+            "update_task", "tasks_bp.update_task", "PUT", lambda n, _: f"/tasks/{task_id(n)}",
+            body=lambda n, _: {"title": f"Updated task {n}", "description": "updated by the benchmark"}
+        ),
+        Scenario(
+            "update_tasks_bulk", "tasks_bp.update_tasks_in_bulk", "PATCH", lambda n, _: "/tasks/bulk",
+            body=lambda n, _: [{"id": task, "title": f"Updated task {n}"} for task in task_ids(n)]
+        ),
+        Scenario("mark_complete", "tasks_bp.mark_task_as_complete", "PATCH", lambda n, _: f"/tasks/{task_id(n)}/mark_complete"),
+        Scenario("mark_incomplete", "tasks_bp.mark_task_as_incomplete", "PATCH", lambda n, _: f"/tasks/{task_id(n)}/mark_incomplete"),
+        Scenario(
+            "mark_complete_batch", "tasks_bp.mark_tasks_as_complete", "PATCH", lambda n, _: "/tasks/mark_complete",
+            body=lambda n, _: {"task_ids": task_ids(n)}
+        ),
+        Scenario(
+            "mark_incomplete_batch", "tasks_bp.mark_tasks_as_incomplete", "PATCH", lambda n, _: "/tasks/mark_incomplete",
+            body=lambda n, _: {"task_ids": task_ids(n)}
+        ),
+        Scenario(
+            "create_goal", "goals_bp.create_goal", "POST", lambda n, _: "/goals",
+            status=201,
+            body=lambda n, _: {"title": f"New goal {n}"}
+        ),
+        Scenario(
+            "update_goal", "goals_bp.update_goal", "PUT", lambda n, _: f"/goals/{goal_id(n)}",
+            body=lambda n, _: {"title": f"Updated goal {n}"}
+        ),
+        Scenario(
+            "link_tasks_to_goal", "goals_bp.create_task_with_goal", "POST", lambda n, _: f"/goals/{goal_id(n)}/tasks",
+            body=lambda n, _: {"task_ids": task_ids(n)}
+        ),
+        Scenario(
+            "delete_task", "tasks_bp.delete_task", "DELETE", lambda n, ids: f"/tasks/{ids[n]}",
+            prepare=lambda count, send: extra_tasks(count)
+        ),
+        Scenario(
+            "delete_tasks_bulk", "tasks_bp.delete_tasks_in_bulk", "DELETE", lambda n, _: "/tasks/bulk",
+            body=lambda n, ids: {"task_ids": ids[n * BULK_SIZE:(n + 1) * BULK_SIZE]},
+            prepare=lambda count, send: extra_tasks(count * BULK_SIZE)
+        ),
+        Scenario(
+            "delete_goal", "goals_bp.delete_goal", "DELETE", lambda n, ids: f"/goals/{ids[n]}",
+            prepare=lambda count, send: extra_goals(count)
+        )
+    ]
+
+
+# the (endpoint, method) pairs of tasks_bp and goals_bp that no scenario calls,
+# so a new endpoint can't quietly go unmeasured
+def uncovered_endpoints(app, scenarios):
+    covered = {(scenario.endpoint, scenario.method) for scenario in scenarios}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.split(".", 1)[0] not in BLUEPRINTS:
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if (rule.endpoint, method) not in covered:
+                missing.append((rule.endpoint, method))
+    return missing
+
+
+# sends requests through the flask test client of `app`
+def client_sender(app):
+    client = app.test_client()
+
+    def send(method, url, body=None, headers=None):
+        response = client.open(url, method=method, json=body, headers=headers)
+        # reads the whole body, so streamed responses are measured to their last line
+        response.get_data()
+        return response.status_code, response.headers
+
+    return send
+
+
+# sends requests over one keep-alive http connection to the server on `port`
+def http_sender(port):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def send(method, url, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+
+        try:
+            connection.request(method, url, body=payload, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            raise
+        return response.status, response.headers
+
+    return send
+
+
+# runs one scenario: `warmup` untimed requests, then `count` timed ones split over one
+# sender per connection. returns the latency summary plus the number of failed requests.
+def run_scenario(app, scenario, count, warmup, make_sender, concurrency):
+    prepared = None
+    if scenario.prepare:
+        with app.app_context():
+            prepared = scenario.prepare(warmup + count, make_sender())
+
+    requests = scenario.build_requests(warmup + count, prepared)
+    warmup_requests, timed_requests = requests[:warmup], requests[warmup:]
+
+    send = make_sender()
+    for method, url, body, headers in warmup_requests:
+        send(method, url, body, headers)
+
+    def worker(share):
+        send = make_sender()
+        latencies = []
+        errors = 0
+        for method, url, body, headers in share:
+            start = time.perf_counter()
+            try:
+                status, _ = send(method, url, body, headers)
+            except (OSError, http.client.HTTPException):
+                status = None
+            latencies.append(time.perf_counter() - start)
+            errors += status != scenario.status
+        return latencies, errors
+
+    shares = [timed_requests[number::concurrency] for number in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, shares))
+    elapsed = time.perf_counter() - start
+
+    stats = summarize([latency for latencies, _ in results for latency in latencies], elapsed=elapsed)
+    stats["errors"] = sum(errors for _, errors in results)
+    return stats
+
+
+def start_server(database_uri, workers, threads):
+    port = free_port()
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        SLACK_DELIVERY="outbox",
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKER_CLASS="gthread",
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_ACCESS_LOG="",
+        GUNICORN_LOG_LEVEL="warning",
+        # no recycling during the run, a restarting worker drops its keep-alive connections
+        GUNICORN_MAX_REQUESTS="0"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"], env=env, cwd=root
+    )
+    try:
+        wait_until_up(port)
+    except RuntimeError:
+        server.terminate()
+        raise
+    return server, port
+
+
+# seeds a fresh database and runs the scenarios against one target
+def run_target(target, dataset, scenarios, args):
+    # slack messages go to the outbox table on both targets, so nothing touches the network
+    app = make_app(SLACK_NOTIFICATIONS_ENABLED=True, SLACK_DELIVERY="outbox")
+    with app.app_context():
+        dataset.seed()
+        database_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+        dialect = db.engine.dialect.name
+
+    server = None
+    if target == "client":
+        concurrency = 1
+        make_sender = lambda: client_sender(app)
+    else:
+        concurrency = args.concurrency
+        server, port = start_server(database_uri, args.workers, args.threads)
+        make_sender = lambda: http_sender(port)
+
+    results = {}
+    try:
+        for scenario in scenarios:
+            results[scenario.name] = run_scenario(app, scenario, args.requests, args.warmup, make_sender, concurrency)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    return dialect, results
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+
+def save_results(report, results_dir):
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    name = f"{stamp}-{(report['commit'] or 'unknown')[:12]}.json"
+    path = os.path.join(results_dir, name)
+    with open(path, "w") as results_file:
+        json.dump(report, results_file, indent=2, sort_keys=True)
+    return path
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+# one row per (target, scenario) present in both reports. a scenario regresses when its
+# p95 grew, or its req/s dropped, by more than `threshold` percent.
+def compare_results(old, new, threshold):
+    rows = []
+    for target, scenarios in new["results"].items():
+        for name, stats in scenarios.items():
+            before = old["results"].get(target, {}).get(name)
+            if before is None:
+                continue
+
+            p95_change = change(before["p95_ms"], stats["p95_ms"])
+            throughput_change = change(before["req_per_s"], stats["req_per_s"])
+            rows.append({
+                "target": target,
+                "scenario": name,
+                "p95_before": before["p95_ms"],
+                "p95_after": stats["p95_ms"],
+                "p95_change_%": p95_change,
+                "req_s_change_%": throughput_change,
+                "regressed": p95_change > threshold or -throughput_change > threshold
+            })
+    return rows
+
+
+def describe(report):
+    commit = (report.get("commit") or "unknown")[:12]
+    return f"{commit}{' (dirty)' if report.get('dirty') else ''}"
+
+
+def print_comparison(old, new, threshold):
+    rows = compare_results(old, new, threshold)
+    print_table(f"{describe(old)} -> {describe(new)}, regression threshold {threshold}%", rows)
+    return [row for row in rows if row["regressed"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="throughput and latency of every task and goal endpoint")
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--goals", type=int, default=100)
+    parser.add_argument("--linked-ratio", type=float, default=0.8, help="share of tasks that belong to a goal")
+    parser.add_argument("--completed-ratio", type=float, default=0.3, help="share of tasks that are complete")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each scenario")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--only", nargs="+", metavar="SCENARIO", help="run just these scenarios")
+    parser.add_argument("--concurrency", type=int, default=8, help="connections to the server target")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers for the server target")
+    parser.add_argument("--threads", type=int, default=4, help="threads per gunicorn worker")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS",
+                        help="an earlier results file to compare this run with, or two files to compare without running")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 if anything regressed")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one or two results files")
+
+    if args.compare and len(args.compare) == 2:
+        regressions = print_comparison(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold)
+        sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+    dataset = Dataset(args.tasks, args.goals, args.linked_ratio, args.completed_ratio)
+    scenarios = build_scenarios(dataset)
+
+    missing = uncovered_endpoints(create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"}), scenarios)
+    if missing:
+        print("not covered by any scenario: " + ", ".join(f"{method} {endpoint}" for endpoint, method in missing))
+
+    if args.only:
+        unknown = set(args.only) - {scenario.name for scenario in scenarios}
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in scenarios if scenario.name in args.only]
+
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "dataset": dataset.to_dict(),
+        "settings": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "threads": args.threads
+        },
+        "results": {}
+    }
+
+    for target in args.targets:
+        report["database"], report["results"][target] = run_target(target, dataset, scenarios, args)
+
+        rows = [{"scenario": name, **stats} for name, stats in report["results"][target].items()]
+        title = f"{target}: {args.tasks} tasks, {args.goals} goals on {report['database']}, {args.requests} requests each"
+        if target == "server":
+            title += f", {args.concurrency} connections"
+        print_table(title, rows)
+
+    path = save_results(report, args.results_dir)
+    print(f"\nsaved {path}")
+
+    if args.compare:
+        regressions = print_comparison(load_results(args.compare[0]), report, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,7 +33,7 @@ def get_task_from_user(msg = "Input the id of the task you would like to work wi
     task = None
     tasks = task_list.list_tasks()
     if not tasks:
-        task_list.print_stars("This option is not possible because there are no tasks.")
+        print_surround_stars("This option is not possible because there are no tasks.")
         return task
     count = 0
     help_count = 3 #number of tries before offering assistance
@@ -118,9 +118,8 @@ def change_task_complete_status(status):
         print_task(response)
 
 def delete_all_tasks():
-    for task in task_list.list_tasks():
-        task_list.delete_task(task["id"])
-        print_surround_stars("Deleted all tasks.")
+    deleted = task_list.delete_all_tasks()
+    print_surround_stars(f"Deleted all {len(deleted)} tasks.")
 
 def run_cli():
     
@@ -1,11 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin
 import requests
 
 url = "http://localhost:5000"
 
+# (connect, read) seconds, so a server that went away doesn't hang the cli
+TIMEOUT = (3.05, 30)
+
+# ids sent per DELETE /tasks/bulk, and threads used when a server has no bulk endpoint
+BULK_CHUNK_SIZE = 1000
+MAX_WORKERS = 16
+
+# one session for every call, so requests reuse pooled keep-alive connections
+# instead of opening a new one each time
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+
+# the last task listing and its etag, and each task fetched on its own with its etag,
+# keyed by id. a mutation through this client clears them, and list_tasks and get_task
+# revalidate them with If-None-Match, so changes made elsewhere still show up
+cache = {"tasks": None, "etag": None, "task": {}}
+
+def invalidate_cache():
+    cache["tasks"] = None
+    cache["etag"] = None
+    cache["task"] = {}
+
+def request(method, path, **kwargs):
+    return session.request(method, url+path, timeout=TIMEOUT, **kwargs)
+
 def parse_response(response):
     if response.status_code >= 400:
         return None
-    
+
     return response.json()["task"]
 
 def create_task(title, description, completed_at=None):
@@ -14,19 +43,47 @@ def create_task(title, description, completed_at=None):
         "description": description,
         "completed_at": completed_at
     }
-    response = requests.post(url+"/tasks",json=query_params)
+    response = request("POST", "/tasks", json=query_params)
+    invalidate_cache()
     return parse_response(response)
 
 def list_tasks():
-    response = requests.get(url+"/tasks")
-    return response.json()
+    headers = {"If-None-Match": cache["etag"]} if cache["tasks"] is not None else {}
+    response = request("GET", "/tasks", headers=headers)
+    if response.status_code == 304:
+        return cache["tasks"]
+
+    tasks = response.json()
+    etag = response.headers.get("ETag")
+    # follows the pages if the server paginates listings by default. the first page's etag
+    # doesn't cover the others, so a paged listing is fetched again next time.
+    # the server's Link urls are relative to the page they came with
+    while "next" in response.links:
+        response = session.get(urljoin(response.url, response.links["next"]["url"]), timeout=TIMEOUT)
+        tasks.extend(response.json())
+        etag = None
+
+    cache["tasks"] = tasks
+    cache["etag"] = etag
+    return tasks
 
 def get_task(id):
-    response = requests.get(url+f"/tasks/{id}")
+    # a task fetched before is revalidated, the server answers 304 if it hasn't changed
+    cached = cache["task"].get(str(id))
+    headers = {"If-None-Match": cached["etag"]} if cached is not None else {}
+    response = request("GET", f"/tasks/{id}", headers=headers)
+    if response.status_code == 304:
+        return cached["task"]
+
     if response.status_code != 200:
+        cache["task"].pop(str(id), None)
         return None
-        
-    return parse_response(response)
+
+    task = parse_response(response)
+    etag = response.headers.get("ETag")
+    if etag:
+        cache["task"][str(id)] = {"task": task, "etag": etag}
+    return task
 
 def update_task(id,title,description):
 
@@ -35,25 +92,50 @@ def update_task(id,title,description):
         "description": description
     }
 
-    response = requests.put(
-        url+f"/tasks/{id}",
-        json=query_params
-        )
+    response = request("PUT", f"/tasks/{id}", json=query_params)
+    invalidate_cache()
 
     return parse_response(response)
 
 def delete_task(id):
-    response = requests.delete(url+f"/tasks/{id}")
+    response = request("DELETE", f"/tasks/{id}")
+    invalidate_cache()
     return response.json()
 
+# deletes many tasks with DELETE /tasks/bulk, BULK_CHUNK_SIZE ids at a time, and
+# returns the ids that were deleted
+def delete_tasks(ids):
+    ids = list(ids)
+    deleted = []
+    try:
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            response = request("DELETE", "/tasks/bulk", json={"task_ids": ids[start:start + BULK_CHUNK_SIZE]})
+            # older servers route /tasks/bulk to /tasks/<id> and reject "bulk" as an id
+            if response.status_code in (400, 404, 405):
+                deleted.extend(delete_one_by_one(ids[start:]))
+                break
+            deleted.extend(response.json()["task_ids"])
+    finally:
+        invalidate_cache()
+
+    return deleted
+
+# one DELETE per task, MAX_WORKERS at a time, for servers without the bulk endpoint
+def delete_one_by_one(ids):
+    with ThreadPoolExecutor(MAX_WORKERS) as executor:
+        statuses = list(executor.map(lambda id: request("DELETE", f"/tasks/{id}").status_code, ids))
+    invalidate_cache()
+    return [id for id, status in zip(ids, statuses) if status == 200]
+
+def delete_all_tasks():
+    return delete_tasks(task["id"] for task in list_tasks())
+
 def mark_complete(id):
-    response = requests.patch(url+f"/tasks/{id}/mark_complete")
+    response = request("PATCH", f"/tasks/{id}/mark_complete")
+    invalidate_cache()
     return parse_response(response)
 
 def mark_incomplete(id):
-    response = requests.patch(url+f"/tasks/{id}/mark_incomplete")
+    response = request("PATCH", f"/tasks/{id}/mark_incomplete")
+    invalidate_cache()
     return parse_response(response)
-
-
-
-    
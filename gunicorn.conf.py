@@ -0,0 +1,85 @@
+# gunicorn settings for running the api in production, every one of them overridable
+# from the environment:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# pick worker and thread counts for a machine with `python -m benchmarks.gunicorn_workers`.
+import multiprocessing
+import os
+
+WORKER_CLASSES = ("sync", "gthread", "gevent")
+
+cores = multiprocessing.cpu_count()
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# gthread: a few processes with a pool of threads each, the threads wait on postgres and slack.
+# gevent: one process per core with thousands of greenlets, needs gevent (and psycogreen for postgres).
+# sync: one request per process at a time.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class not in WORKER_CLASSES:
+    raise ValueError(f"unknown GUNICORN_WORKER_CLASS {worker_class!r}")
+
+
+def default_workers(worker_class, cores):
+    if worker_class == "gevent":
+        return cores
+    if worker_class == "gthread":
+        return cores + 1
+    return 2 * cores + 1
+
+
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers(worker_class, cores)))
+threads = int(os.environ.get("GUNICORN_THREADS", 4 if worker_class == "gthread" else 1))
+# greenlets per gevent worker
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+
+# keep each worker's DB_POOL_SIZE + DB_MAX_OVERFLOW (app/pool.py) at about `threads`,
+# so workers * threads stays under what postgres (or pgbouncer) allows.
+
+# imports the app once in the master before forking. gevent patches the standard library
+# when a worker starts, after a preloaded app would already have imported it unpatched,
+# so preloading is off for gevent unless asked for.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "false" if worker_class == "gevent" else "true").lower() in ("1", "true", "yes", "on")
+
+# recycles a worker after this many requests (give or take the jitter, so they don't all restart
+# together), which caps how much a slow leak or fragmented heap can grow
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# an empty GUNICORN_ACCESS_LOG turns the access log off
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-") or None
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+# a forked worker starts with copies of the master's engines, pooled connections included.
+# dispose(close=False) gives the worker fresh, empty pools without closing the sockets
+# the master (or a sibling) may still be using. slack clients and dispatchers already
+# rebuild themselves when they see a new pid.
+def post_fork(server, worker):
+    if preload_app:
+        import wsgi
+        from app.db import db
+
+        with wsgi.app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+    if worker_class == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning("psycogreen isn't installed, postgres queries will block gevent workers")
+        else:
+            patch_psycopg()
+
+
+def when_ready(server):
+    server.log.info(
+        "serving with %s %s workers x %s threads, preload_app=%s, max_requests=%s",
+        workers, worker_class, threads, preload_app, max_requests
+    )
@@ -0,0 +1,39 @@
+"""add outbox table
+
+Revision ID: 75aab95afd5d
+Revises: 3d20f405f7eb
+Create Date: 2026-10-18 09:12:04.118392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '75aab95afd5d'
+down_revision = '3d20f405f7eb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('event_type', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('delivered_at', sa.DateTime(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_pending', 'outbox', ['id'], unique=False,
+                    postgresql_where=sa.text('delivered_at IS NULL'),
+                    sqlite_where=sa.text('delivered_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_outbox_pending', table_name='outbox',
+                  postgresql_where=sa.text('delivered_at IS NULL'),
+                  sqlite_where=sa.text('delivered_at IS NULL'))
+    op.drop_table('outbox')
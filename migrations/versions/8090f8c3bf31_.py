@@ -0,0 +1,39 @@
+"""add full-text search vector to task
+
+Revision ID: 8090f8c3bf31
+Revises: 99b6b3671340
+Create Date: 2026-10-18 13:02:51.772904
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8090f8c3bf31'
+down_revision = '99b6b3671340'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # generated tsvector over title and description with a GIN index, postgres only.
+    # other databases use the in-memory index in app/search.py instead.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(
+        "ALTER TABLE task ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+    op.create_index('ix_task_search_vector', 'task', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_task_search_vector', table_name='task')
+    op.drop_column('task', 'search_vector')
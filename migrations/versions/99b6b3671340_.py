@@ -0,0 +1,48 @@
+"""add indexes for task and goal listings
+
+Revision ID: 99b6b3671340
+Revises: 75aab95afd5d
+Create Date: 2026-10-18 11:40:27.503166
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '99b6b3671340'
+down_revision = '75aab95afd5d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_task_goal_id', 'task', ['goal_id'], unique=False)
+    op.create_index('ix_task_title_id', 'task', ['title', 'id'], unique=False)
+    op.create_index('ix_task_title_desc_id', 'task', [sa.text('title DESC'), 'id'], unique=False)
+    op.create_index('ix_task_incomplete', 'task', ['id'], unique=False,
+                    postgresql_where=sa.text('completed_at IS NULL'),
+                    sqlite_where=sa.text('completed_at IS NULL'))
+    op.create_index('ix_goal_title_id', 'goal', ['title', 'id'], unique=False)
+    op.create_index('ix_goal_title_desc_id', 'goal', [sa.text('title DESC'), 'id'], unique=False)
+
+    # trigram index so title ILIKE '%...%' can use an index, postgres only
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_task_title_trgm', 'task', ['title'], unique=False,
+                        postgresql_using='gin',
+                        postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_task_title_trgm', table_name='task')
+
+    op.drop_index('ix_goal_title_desc_id', table_name='goal')
+    op.drop_index('ix_goal_title_id', table_name='goal')
+    op.drop_index('ix_task_incomplete', table_name='task',
+                  postgresql_where=sa.text('completed_at IS NULL'),
+                  sqlite_where=sa.text('completed_at IS NULL'))
+    op.drop_index('ix_task_title_desc_id', table_name='task')
+    op.drop_index('ix_task_title_id', table_name='task')
+    op.drop_index('ix_task_goal_id', table_name='task')
@@ -0,0 +1,26 @@
+"""add claimed_until to outbox, so drainers claim events without holding row locks
+
+Revision ID: a7c2d9e4f1b6
+Revises: e8b3f5a1c6d4
+Create Date: 2026-10-18 23:41:17.204519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2d9e4f1b6'
+down_revision = 'e8b3f5a1c6d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('outbox', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('outbox', schema=None) as batch_op:
+        batch_op.drop_column('claimed_until')
@@ -0,0 +1,43 @@
+"""add goal task counters and completion indexes
+
+Revision ID: c4e1a7d2b9f3
+Revises: 5b0789b71053
+Create Date: 2026-10-18 21:05:42.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e1a7d2b9f3'
+down_revision = '5b0789b71053'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('task_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('completed_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # existing goals start out with the counts of the tasks they already have
+    op.execute(
+        "UPDATE goal SET "
+        "task_count = (SELECT count(task.id) FROM task WHERE task.goal_id = goal.id), "
+        "completed_count = (SELECT count(task.completed_at) FROM task WHERE task.goal_id = goal.id)"
+    )
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_completed_at', ['completed_at'], unique=False)
+        batch_op.create_index('ix_task_goal_id_completed_at', ['goal_id', 'completed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_goal_id_completed_at')
+        batch_op.drop_index('ix_task_completed_at')
+
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.drop_column('completed_count')
+        batch_op.drop_column('task_count')
@@ -0,0 +1,30 @@
+"""detach tasks from a deleted goal with ON DELETE SET NULL
+
+Revision ID: e8b3f5a1c6d4
+Revises: c4e1a7d2b9f3
+Create Date: 2026-10-18 22:14:03.507716
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b3f5a1c6d4'
+down_revision = 'c4e1a7d2b9f3'
+branch_labels = None
+depends_on = None
+
+# the name postgres gave the foreign key, which was created without one
+CONSTRAINT_NAME = 'task_goal_id_fkey'
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_constraint(CONSTRAINT_NAME, type_='foreignkey')
+        batch_op.create_foreign_key(CONSTRAINT_NAME, 'goal', ['goal_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_constraint(CONSTRAINT_NAME, type_='foreignkey')
+        batch_op.create_foreign_key(CONSTRAINT_NAME, 'goal', ['goal_id'], ['id'])
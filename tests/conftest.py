@@ -1,12 +1,14 @@
 import pytest
 from app import create_app
 from app.db import db
+from app.notifications import notifier
 from flask.signals import request_finished
 from dotenv import load_dotenv
 import os
 from app.models.task import Task
 from app.models.goal import Goal
 from datetime import datetime
+from benchmarks.fake_slack import FakeSlackServer
 
 load_dotenv()
 
@@ -15,7 +17,13 @@ def app():
     # create the app with a test configuration
     test_config = {
         "TESTING": True,
-        "SQLALCHEMY_DATABASE_URI": os.environ.get('SQLALCHEMY_TEST_DATABASE_URI')
+        "SQLALCHEMY_DATABASE_URI": os.environ.get('SQLALCHEMY_TEST_DATABASE_URI'),
+        # tests that want slack messages turn this back on with the slack_client fixture
+        "SLACK_NOTIFICATIONS_ENABLED": False,
+        # read endpoints must not load relationships one row at a time
+        "RAISE_ON_LAZY_LOAD": True,
+        # tests read the pool, cache and request stats from /_internal
+        "INTERNAL_ENDPOINTS_ENABLED": True
     }
     app = create_app(test_config)
 
@@ -37,6 +45,30 @@ def client(app):
     return app.test_client()
 
 
+# This fixture starts a fake slack api on localhost
+@pytest.fixture
+def fake_slack():
+    with FakeSlackServer() as server:
+        yield server
+
+
+# This fixture gives a client whose app sends slack
+# notifications to the fake slack api
+@pytest.fixture
+def slack_client(app, fake_slack):
+    app.config.update({
+        "SLACK_NOTIFICATIONS_ENABLED": True,
+        "SLACK_API_URL": fake_slack.url,
+        "SLACK_BATCH_WINDOW": 0,
+        "SLACK_RETRY_BACKOFF": 0
+    })
+    notifier.init_app(app)
+
+    yield app.test_client()
+
+    notifier.get_dispatcher(app).shutdown()
+
+
 # This fixture gets called in every test that
 # references "one_task"
 # This fixture creates a task and saves it in the database
@@ -0,0 +1,315 @@
+from app.asgi import async_database_uri, create_asgi_app
+from app.db import db
+from app.models.goal import Goal
+from app.models.outbox import OutboxEvent
+from app.models.resource_version import ResourceVersion
+from app.models.task import Task
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+import json
+import pytest
+
+
+@pytest.fixture
+def database_uri(tmp_path):
+    database_uri = f"sqlite:///{tmp_path / 'tasks.db'}"
+    engine = create_engine(database_uri)
+    db.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add(Goal(title="Build a habit of going outside daily"))
+        session.add_all([
+            Task(title="Go on my daily walk 🏞", description="Notice something new every day", goal_id=1),
+            Task(title="Water the garden 🌷", description="")
+        ])
+        session.commit()
+
+    yield database_uri
+    engine.dispose()
+
+
+@pytest.fixture
+def async_client(database_uri):
+    app = create_asgi_app({"SQLALCHEMY_DATABASE_URI": database_uri, "SLACK_NOTIFICATIONS_ENABLED": False})
+    with TestClient(app) as client:
+        yield client
+
+
+def read_rows(database_uri, query):
+    engine = create_engine(database_uri)
+    with Session(engine) as session:
+        rows = session.scalars(query).all()
+    engine.dispose()
+    return rows
+
+
+def test_async_database_uri():
+    # Act / Assert
+    assert async_database_uri("postgresql://localhost/tasks").drivername == "postgresql+asyncpg"
+    assert async_database_uri("sqlite:///tasks.db").drivername == "sqlite+aiosqlite"
+
+
+def test_get_tasks(async_client):
+    # Act
+    response = async_client.get("/tasks?sort=desc")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 2, "title": "Water the garden 🌷", "description": "", "is_complete": False},
+        {"id": 1, "title": "Go on my daily walk 🏞", "description": "Notice something new every day", "is_complete": False}
+    ]
+
+
+def test_get_tasks_pages(async_client):
+    # Act
+    first = async_client.get("/tasks?limit=1")
+    second = async_client.get(f"/tasks?limit=1&cursor={first.headers['X-Next-Cursor']}")
+
+    # Assert
+    assert [task["id"] for task in first.json()] == [1]
+    assert [task["id"] for task in second.json()] == [2]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_get_tasks_invalid_cursor(async_client):
+    # Act
+    response = async_client.get("/tasks?limit=1&cursor=nope")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json() == {"message": "invalid cursor"}
+
+
+def test_create_task(async_client, database_uri):
+    # Act
+    response = async_client.post("/tasks", json={"title": "A Brand New Task", "description": "Test Description"})
+
+    # Assert
+    assert response.status_code == 201
+    assert response.json() == {
+        "task": {"id": 3, "title": "A Brand New Task", "description": "Test Description", "is_complete": False}
+    }
+    # the write bumped the listing's version like a write through the flask app does
+    versions = read_rows(database_uri, select(ResourceVersion.version).where(ResourceVersion.name == "tasks"))
+    assert versions == [2]
+
+
+def test_create_task_invalid(async_client):
+    # Act
+    response = async_client.post("/tasks", json={"title": "A Brand New Task"})
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json() == {"details": "Invalid data"}
+
+
+def test_get_one_task_with_goal(async_client):
+    # Act
+    response = async_client.get("/tasks/1")
+
+    # Assert
+    assert response.json()["task"]["goal_id"] == 1
+
+
+@pytest.mark.parametrize("url, status_code, body", [
+    ("/tasks/cat", 400, {"message": "invalid Task id"}),
+    ("/tasks/99", 404, {"message": "Task not found"}),
+    ("/goals/99/tasks", 404, {"message": "Goal not found"})
+])
+def test_errors(async_client, url, status_code, body):
+    # Act
+    response = async_client.get(url)
+
+    # Assert
+    assert response.status_code == status_code
+    assert response.json() == body
+
+
+def test_mark_complete_sends_slack_message(database_uri, fake_slack):
+    # Arrange
+    app = create_asgi_app({
+        "SQLALCHEMY_DATABASE_URI": database_uri,
+        "SLACK_API_URL": fake_slack.url,
+        "SLACK_API_KEY": "test-key",
+        "SLACK_CHANNEL": "task-notifications",
+        "SLACK_RETRY_BACKOFF": 0
+    })
+
+    # Act
+    with TestClient(app) as client:
+        response = client.patch("/tasks/2/mark_complete")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["task"]["is_complete"] == True
+    assert fake_slack.messages == ["Someone just completed the task Water the garden 🌷"]
+
+
+def test_mark_complete_outbox_delivery(database_uri, fake_slack):
+    # Arrange
+    app = create_asgi_app({"SQLALCHEMY_DATABASE_URI": database_uri, "SLACK_DELIVERY": "outbox"})
+
+    # Act
+    with TestClient(app) as client:
+        client.patch("/tasks/2/mark_complete")
+
+    # Assert
+    assert fake_slack.messages == []
+    events = read_rows(database_uri, select(OutboxEvent))
+    assert [event.payload["task_id"] for event in events] == [2]
+
+
+def test_get_tasks_by_goal(async_client):
+    # Act
+    response = async_client.get("/goals/1/tasks")
+
+    # Assert
+    assert response.json() == {
+        "id": 1,
+        "title": "Build a habit of going outside daily",
+        "tasks": [{
+            "id": 1,
+            "goal_id": 1,
+            "title": "Go on my daily walk 🏞",
+            "description": "Notice something new every day",
+            "is_complete": False
+        }]
+    }
+
+
+def test_get_goals(async_client):
+    # Act
+    response = async_client.get("/goals")
+
+    # Assert
+    assert response.json() == [{"id": 1, "title": "Build a habit of going outside daily"}]
+
+
+def test_update_task_falls_through_to_flask(async_client, database_uri):
+    # Act
+    response = async_client.put("/tasks/2", json={"title": "Updated Task Title", "description": "Updated"})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["task"]["title"] == "Updated Task Title"
+    assert read_rows(database_uri, select(Task.title).where(Task.id == 2)) == ["Updated Task Title"]
+
+
+def test_goal_crud_falls_through_to_flask(async_client, database_uri):
+    # Act
+    created = async_client.post("/goals", json={"title": "Self-care"})
+    linked = async_client.post("/goals/2/tasks", json={"task_ids": [2]})
+    updated = async_client.put("/goals/2", json={"title": "Be debt-free"})
+    deleted = async_client.delete("/goals/1")
+    removed = async_client.delete("/tasks/1")
+
+    # Assert
+    assert created.status_code == 201
+    assert linked.json() == {"id": 2, "task_ids": [2]}
+    assert updated.json()["goal"]["title"] == "Be debt-free"
+    assert deleted.status_code == 200
+    assert removed.status_code == 200
+    # and the async routes see what flask wrote
+    assert async_client.get("/goals/2/tasks").json()["tasks"][0]["id"] == 2
+    assert read_rows(database_uri, select(Goal.id)) == [2]
+
+
+def test_flask_only_endpoints_are_served(async_client):
+    # Act
+    response = async_client.get("/tasks/search?q=garden")
+
+    # Assert
+    assert response.status_code == 200
+    assert [result["id"] for result in response.json()["results"]] == [2]
+
+
+def test_get_tasks_sends_flask_etag(async_client):
+    # Arrange
+    response = async_client.get("/tasks?sort=desc")
+
+    # Act
+    not_modified = async_client.get("/tasks?sort=desc", headers={"If-None-Match": response.headers["ETag"]})
+
+    # Assert
+    assert response.headers["Last-Modified"]
+    assert response.headers["Vary"] == "Accept"
+    # the conditional request went to flask, which took the async app's etag as its own
+    assert not_modified.status_code == 304
+
+
+def test_get_one_task_sends_flask_etag(async_client):
+    # Arrange
+    response = async_client.get("/tasks/1")
+
+    # Act
+    not_modified = async_client.get("/tasks/1", headers={"If-None-Match": response.headers["ETag"]})
+    not_modified_since = async_client.get("/tasks/1", headers={"If-Modified-Since": response.headers["Last-Modified"]})
+
+    # Assert
+    assert not_modified.status_code == 304
+    assert not_modified_since.status_code == 304
+
+
+def test_get_goal_include_tasks_goes_to_flask(async_client):
+    # Act
+    response = async_client.get("/goals/1?include=tasks")
+
+    # Assert
+    assert [task["id"] for task in response.json()["goal"]["tasks"]] == [1]
+
+
+@pytest.mark.parametrize("url, headers", [
+    ("/tasks?stream=1", {}),
+    ("/tasks", {"Accept": "application/x-ndjson"})
+])
+def test_streamed_tasks_go_to_flask(async_client, url, headers):
+    # Act
+    response = async_client.get(url, headers=headers)
+
+    # Assert
+    assert response.headers["Content-Type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1, 2]
+
+
+def test_reads_go_to_flask_with_replicas(database_uri):
+    # Arrange
+    app = create_asgi_app({
+        "SQLALCHEMY_DATABASE_URI": database_uri,
+        "REPLICA_URIS": [database_uri],
+        "SLACK_NOTIFICATIONS_ENABLED": False
+    })
+
+    # Act
+    with TestClient(app) as client:
+        response = client.get("/tasks/1")
+
+    # Assert
+    assert response.json()["task"]["id"] == 1
+    assert app.state.flask_app.extensions["replica_router"]["health"]["replica_0"]["reads"] == 1
+
+
+def test_async_writes_clear_the_response_cache(async_client):
+    # Arrange
+    flask_client = async_client.app.state.flask_app.test_client()
+    flask_client.get("/tasks/2")
+
+    # Act
+    async_client.patch("/tasks/2/mark_complete")
+    response = flask_client.get("/tasks/2")
+
+    # Assert
+    assert response.get_json()["task"]["is_complete"] == True
+
+
+def test_async_writes_update_the_search_index(async_client):
+    # Arrange
+    async_client.get("/tasks/search?q=dog")
+
+    # Act
+    async_client.post("/tasks", json={"title": "Walk the dog", "description": "Around the block"})
+    response = async_client.get("/tasks/search?q=dog")
+
+    # Assert
+    assert [result["id"] for result in response.json()["results"]] == [3]
@@ -0,0 +1,131 @@
+from app.db import db
+from app.models.goal import Goal
+from app.models.outbox import OutboxEvent
+from app.models.task import Task
+from datetime import datetime
+import pytest
+
+
+@pytest.fixture
+def goal_with_tasks(app):
+    db.session.add_all([Goal(title="Ship the sprint"), Goal(title="Self-care")])
+    db.session.add_all([
+        Task(title="Write the tests", description="", goal_id=1),
+        Task(title="Fix the bug", description="", goal_id=1),
+        Task(title="Review the pr", description="", goal_id=1, completed_at=datetime(2024, 1, 1)),
+        Task(title="Take a bath", description="", goal_id=2),
+        Task(title="Answer forgotten email 📧", description="")
+    ])
+    db.session.commit()
+
+
+@pytest.fixture
+def outbox_app(app):
+    # slack messages land in the outbox table, where the test can read them
+    app.config.update({"SLACK_NOTIFICATIONS_ENABLED": True, "SLACK_DELIVERY": "outbox"})
+    return app
+
+
+def completed_ids():
+    db.session.expire_all()
+    return set(db.session.scalars(db.select(Task.id).where(Task.completed_at.is_not(None))))
+
+
+def test_mark_complete_by_ids(client, goal_with_tasks):
+    # Act
+    response = client.patch("/tasks/mark_complete", json={"task_ids": [1, 3, 5, 99]})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json() == {"task_ids": [1, 5], "missing_task_ids": [99]}
+    assert completed_ids() == {1, 3, 5}
+
+
+def test_mark_complete_by_goal(client, goal_with_tasks):
+    # Act
+    response = client.patch("/tasks/mark_complete", json={"goal_id": 1})
+
+    # Assert
+    assert response.status_code == 200
+    assert sorted(response.get_json()["task_ids"]) == [1, 2]
+    assert completed_ids() == {1, 2, 3}
+    assert db.session.get(Goal, 1).completed_count == 3
+
+
+def test_mark_complete_sends_one_message_for_the_batch(outbox_app, client, goal_with_tasks):
+    # Act
+    client.patch("/tasks/mark_complete", json={"task_ids": [1, 2, 4]})
+
+    # Assert
+    events = db.session.scalars(db.select(OutboxEvent)).all()
+    assert len(events) == 1
+    assert events[0].event_type == "tasks.completed"
+    assert events[0].payload["task_ids"] == [1, 2, 4]
+    assert events[0].payload["text"] == "Someone just completed 3 tasks: Write the tests, Fix the bug, Take a bath"
+
+
+def test_mark_complete_sends_nothing_when_nothing_changed(outbox_app, client, goal_with_tasks):
+    # Act
+    response = client.patch("/tasks/mark_complete", json={"task_ids": [3]})
+
+    # Assert
+    assert response.get_json() == {"task_ids": []}
+    assert db.session.scalars(db.select(OutboxEvent)).all() == []
+
+
+def test_mark_incomplete_by_ids(client, goal_with_tasks):
+    # Arrange
+    client.patch("/tasks/mark_complete", json={"task_ids": [1, 2]})
+
+    # Act
+    response = client.patch("/tasks/mark_incomplete", json={"task_ids": [1, 3, 4]})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json() == {"task_ids": [1, 3]}
+    assert completed_ids() == {2}
+    assert db.session.get(Goal, 1).completed_count == 1
+
+
+def test_mark_complete_drops_only_the_changed_cached_tasks(client, goal_with_tasks):
+    # Arrange
+    client.get("/tasks/1")
+    client.get("/tasks/4")
+
+    # Act
+    client.patch("/tasks/mark_complete", json={"task_ids": [1]})
+
+    # Assert
+    assert client.get("/tasks/1").get_json()["task"]["is_complete"] is True
+    assert client.get("/tasks/4").get_json()["task"]["is_complete"] is False
+    assert client.get("/goals/1/stats").get_json()["stats"]["completed"] == 2
+
+
+@pytest.mark.parametrize("body", [
+    None,
+    {},
+    {"task_ids": []},
+    {"task_ids": ["one"]},
+    {"task_ids": [1.7, 2]},
+    {"task_ids": [True]},
+    {"task_ids": [1], "goal_id": 1},
+    {"goal_id": True},
+    {"goal_id": 1.0}
+])
+def test_mark_complete_invalid_body(client, goal_with_tasks, body):
+    # Act
+    response = client.patch("/tasks/mark_complete", json=body)
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"details": "Invalid data"}
+    assert completed_ids() == {3}
+
+
+def test_mark_complete_unknown_goal(client, goal_with_tasks):
+    # Act
+    response = client.patch("/tasks/mark_complete", json={"goal_id": 7})
+
+    # Assert
+    assert response.status_code == 404
+    assert response.get_json() == {"message": "Goal not found"}
@@ -0,0 +1,41 @@
+from benchmarks.suite import Dataset, build_scenarios, compare_results, run_target, uncovered_endpoints
+from types import SimpleNamespace
+
+
+def test_scenarios_cover_every_task_and_goal_endpoint(app):
+    scenarios = build_scenarios(Dataset(10, 2, 0.5, 0.5))
+
+    assert uncovered_endpoints(app, scenarios) == []
+
+
+def test_every_scenario_gets_its_expected_status_from_the_test_client():
+    dataset = Dataset(40, 4, 0.5, 0.5)
+    args = SimpleNamespace(requests=3, warmup=1)
+
+    dialect, results = run_target("client", dataset, build_scenarios(dataset), args)
+
+    assert dialect
+    assert {name: stats["errors"] for name, stats in results.items() if stats["errors"]} == {}
+    assert all(stats["count"] == 3 for stats in results.values())
+
+
+def test_compare_results_flags_slower_p95_and_lower_throughput():
+    old = {"results": {"client": {
+        "get_task": {"p95_ms": 1.0, "req_per_s": 1000.0},
+        "list_tasks": {"p95_ms": 10.0, "req_per_s": 100.0},
+        "create_task": {"p95_ms": 2.0, "req_per_s": 500.0}
+    }}}
+    new = {"results": {"client": {
+        "get_task": {"p95_ms": 1.05, "req_per_s": 990.0},
+        "list_tasks": {"p95_ms": 15.0, "req_per_s": 100.0},
+        "create_task": {"p95_ms": 2.0, "req_per_s": 400.0},
+        "delete_task": {"p95_ms": 2.0, "req_per_s": 400.0}
+    }}}
+
+    rows = compare_results(old, new, threshold=10)
+
+    assert {row["scenario"]: row["regressed"] for row in rows} == {
+        "get_task": False,
+        "list_tasks": True,
+        "create_task": True
+    }
@@ -0,0 +1,109 @@
+from app.models.task import Task
+import pytest
+
+
+def test_create_tasks_in_bulk(client):
+    # Act
+    response = client.post("/tasks/bulk", json=[
+        {"title": "First", "description": "One"},
+        {"title": "Second", "description": "Two"}
+    ])
+    response_body = response.get_json()
+
+    # Assert
+    assert response.status_code == 201
+    assert response_body == {"task_ids": [1, 2]}
+    assert [(task.title, task.description) for task in Task.query.order_by(Task.id)] == [
+        ("First", "One"),
+        ("Second", "Two")
+    ]
+
+
+def test_create_tasks_in_bulk_from_ndjson(app, client):
+    # Arrange
+    app.config["BULK_CHUNK_SIZE"] = 2
+    body = "\n".join(f'{{"title": "Task {number}", "description": "Bulk"}}' for number in range(5))
+
+    # Act
+    response = client.post("/tasks/bulk", data=body, content_type="application/x-ndjson")
+
+    # Assert
+    assert response.status_code == 201
+    assert response.get_json() == {"task_ids": [1, 2, 3, 4, 5]}
+    assert Task.query.count() == 5
+
+
+def test_create_tasks_in_bulk_rejects_invalid_tasks(client):
+    # Act
+    response = client.post("/tasks/bulk", json=[
+        {"title": "Fine", "description": "Fine"},
+        {"title": "No description"},
+        {"description": "No title"}
+    ])
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"details": "Invalid data", "invalid_indexes": [1, 2]}
+    assert Task.query.count() == 0
+
+
+@pytest.mark.parametrize("body", [{}, [], "not json"])
+def test_create_tasks_in_bulk_needs_a_list(client, body):
+    # Act
+    response = client.post("/tasks/bulk", json=body)
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"details": "Invalid data"}
+
+
+def test_update_tasks_in_bulk(client, three_tasks):
+    # Act
+    response = client.patch("/tasks/bulk", json=[
+        {"id": 1, "title": "Updated title"},
+        {"id": 3, "title": "Both", "description": "Changed"},
+        {"id": 42, "title": "Missing"}
+    ])
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json() == {"task_ids": [1, 3], "missing_task_ids": [42]}
+    assert [(task.title, task.description) for task in Task.query.order_by(Task.id)] == [
+        ("Updated title", ""),
+        ("Answer forgotten email 📧", ""),
+        ("Both", "Changed")
+    ]
+
+
+def test_update_tasks_in_bulk_rejects_invalid_items(client, three_tasks):
+    # Act
+    response = client.patch("/tasks/bulk", json=[
+        {"id": 1, "title": ""},
+        {"title": "No id"},
+        {"id": 2},
+        {"id": True, "title": "Updated Task Title"}
+    ])
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"details": "Invalid data", "invalid_indexes": [0, 1, 2, 3]}
+
+
+def test_delete_tasks_in_bulk(client, three_tasks):
+    # Act
+    response = client.delete("/tasks/bulk", json={"task_ids": [3, 1, 7]})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json() == {"task_ids": [3, 1], "missing_task_ids": [7]}
+    assert [task.id for task in Task.query.all()] == [2]
+
+
+@pytest.mark.parametrize("task_ids", ["all", [True]])
+def test_delete_tasks_in_bulk_needs_ids(client, three_tasks, task_ids):
+    # Act
+    response = client.delete("/tasks/bulk", json={"task_ids": task_ids})
+
+    # Assert
+    assert response.status_code == 400
+    assert Task.query.count() == 3
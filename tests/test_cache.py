@@ -0,0 +1,171 @@
+from app import create_app
+from app.cache import LRUCache
+from app.db import db
+from app.models.task import Task
+from .fake_cache import FakeRedis
+import pytest
+
+
+def get_cache_stats(client):
+    return client.get("/_internal/cache").get_json()
+
+
+def test_get_task_twice_hits_cache(client, one_task):
+    # Act
+    first = client.get("/tasks/1")
+    second = client.get("/tasks/1")
+
+    # Assert
+    assert first.get_json() == second.get_json()
+    stats = get_cache_stats(client)
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_update_task_invalidates_cache(client, one_task):
+    # Arrange
+    client.get("/tasks/1")
+
+    # Act
+    client.put("/tasks/1", json={"title": "Updated Task Title", "description": "Updated Test Description"})
+    response = client.get("/tasks/1")
+
+    # Assert
+    assert response.get_json()["task"]["title"] == "Updated Task Title"
+    assert get_cache_stats(client)["invalidations"] == 1
+
+
+def test_mark_incomplete_invalidates_cache(client, completed_task):
+    # Arrange
+    client.get("/tasks/1")
+
+    # Act
+    client.patch("/tasks/1/mark_incomplete")
+    response = client.get("/tasks/1")
+
+    # Assert
+    assert response.get_json()["task"]["is_complete"] == False
+
+
+def test_delete_task_invalidates_cache(client, one_task):
+    # Arrange
+    client.get("/tasks/1")
+
+    # Act
+    client.delete("/tasks/1")
+    response = client.get("/tasks/1")
+
+    # Assert
+    assert response.status_code == 404
+
+
+def test_bulk_update_invalidates_cache(client, three_tasks):
+    # Arrange
+    client.get("/tasks/2")
+
+    # Act
+    client.patch("/tasks/bulk", json=[{"id": 2, "title": "Bulk title"}])
+    response = client.get("/tasks/2")
+
+    # Assert
+    assert response.get_json()["task"]["title"] == "Bulk title"
+
+
+def test_link_tasks_to_goal_invalidates_cache(client, one_goal, one_task):
+    # Arrange
+    client.get("/tasks/1")
+
+    # Act
+    client.post("/goals/1/tasks", json={"task_ids": [1]})
+    response = client.get("/tasks/1")
+
+    # Assert
+    assert response.get_json()["task"]["goal_id"] == 1
+
+
+def test_update_goal_invalidates_cache(client, one_goal):
+    # Arrange
+    client.get("/goals/1")
+
+    # Act
+    client.put("/goals/1", json={"title": "Updated Goal Title"})
+    response = client.get("/goals/1")
+
+    # Assert
+    assert response.get_json() == {"goal": {"id": 1, "title": "Updated Goal Title"}}
+
+
+def test_missing_task_is_not_cached(client):
+    # Act
+    client.get("/tasks/1")
+    client.post("/tasks", json={"title": "A Brand New Task", "description": "Test Description"})
+    response = client.get("/tasks/1")
+
+    # Assert
+    assert response.status_code == 200
+
+
+def test_lru_cache_evicts_least_recently_used():
+    # Arrange
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("Task:1", "one")
+    cache.set("Task:2", "two")
+    cache.get("Task:1")
+
+    # Act
+    cache.set("Task:3", "three")
+
+    # Assert
+    assert cache.get("Task:2") is None
+    assert cache.get("Task:1") == "one"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries():
+    # Arrange
+    cache = LRUCache(maxsize=2, ttl=0)
+    cache.set("Task:1", "one")
+
+    # Act
+    value = cache.get("Task:1")
+
+    # Assert
+    assert value is None
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.fixture
+def shared_cache_client():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "SLACK_NOTIFICATIONS_ENABLED": False,
+        "INTERNAL_ENDPOINTS_ENABLED": True,
+        "RESPONSE_CACHE_BACKEND": "shared",
+        "RESPONSE_CACHE_CLIENT": FakeRedis()
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Task(title="Shared", description="Cached in the fake redis"))
+        db.session.commit()
+        yield app.test_client()
+        db.drop_all()
+
+
+def test_shared_cache_hits_and_invalidates(shared_cache_client):
+    # Act
+    shared_cache_client.get("/tasks/1")
+    cached = shared_cache_client.get("/tasks/1")
+    shared_cache_client.patch("/tasks/bulk", json=[{"id": 1, "title": "Changed"}])
+    changed = shared_cache_client.get("/tasks/1")
+
+    # Assert
+    assert cached.get_json()["task"]["title"] == "Shared"
+    assert changed.get_json()["task"]["title"] == "Changed"
+    assert get_cache_stats(shared_cache_client)["hits"] == 1
+
+
+def test_unknown_cache_backend():
+    with pytest.raises(ValueError):
+        create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "RESPONSE_CACHE_BACKEND": "memcached"})
@@ -0,0 +1,64 @@
+from app.db import db
+from app.models.goal import Goal
+from app.models.task import Task
+from werkzeug.serving import make_server
+import os
+import pytest
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli"))
+import task_list
+
+
+# serves the test app on localhost and points the cli client at it, with an empty cache
+@pytest.fixture
+def cli_server(app, monkeypatch):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(task_list, "url", f"http://127.0.0.1:{server.server_port}")
+    task_list.invalidate_cache()
+
+    yield server
+
+    task_list.invalidate_cache()
+    server.shutdown()
+    server.server_close()
+
+
+def test_list_tasks_follows_every_page(app, cli_server):
+    # Arrange
+    app.config["PAGINATION_DEFAULT_LIMIT"] = 2
+    db.session.add_all([Task(title=f"Task {number}", description="") for number in range(5)])
+    db.session.commit()
+
+    # Act
+    tasks = task_list.list_tasks()
+
+    # Assert
+    assert [task["title"] for task in tasks] == [f"Task {number}" for number in range(5)]
+
+
+def test_get_task_revalidates_cached_task(app, cli_server):
+    # Arrange
+    goal = Goal(title="Build a habit of going outside daily")
+    db.session.add(goal)
+    db.session.add(Task(title="Go on my daily walk 🏞", description="", goal=goal))
+    db.session.commit()
+    task_list.list_tasks()
+
+    # Act
+    first = task_list.get_task(1)
+    # changed by someone else, so this client's caches don't know about it
+    db.session.get(Task, 1).title = "Updated Task Title"
+    db.session.commit()
+    second = task_list.get_task(1)
+    third = task_list.get_task(1)
+
+    # Assert
+    assert first["goal_id"] == 1
+    assert first["title"] == "Go on my daily walk 🏞"
+    assert second["title"] == "Updated Task Title"
+    assert third == second
@@ -0,0 +1,175 @@
+from sqlalchemy import event
+from app.db import db
+
+
+def count_queries(app):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def test_get_tasks_has_etag_and_last_modified(client, three_tasks):
+    # Act
+    response = client.get("/tasks")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+    assert "Accept" in response.headers["Vary"]
+
+
+def test_get_tasks_not_modified(client, three_tasks):
+    # Arrange
+    etag = client.get("/tasks").headers["ETag"]
+
+    # Act
+    response = client.get("/tasks", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_not_modified_skips_listing_query(app, client, three_tasks):
+    # Arrange
+    etag = client.get("/tasks").headers["ETag"]
+    statements = count_queries(app)
+
+    # Act
+    response = client.get("/tasks", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 304
+    assert len(statements) == 1
+    assert "resource_version" in statements[0]
+
+
+def test_create_task_changes_etag(client, three_tasks):
+    # Arrange
+    etag = client.get("/tasks").headers["ETag"]
+    client.post("/tasks", json={"title": "New Task", "description": "Test Description"})
+
+    # Act
+    response = client.get("/tasks", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.get_json()) == 4
+    assert response.headers["ETag"] != etag
+
+
+def test_bulk_delete_changes_etag(client, three_tasks):
+    # Arrange
+    etag = client.get("/tasks").headers["ETag"]
+    client.delete("/tasks/bulk", json={"task_ids": [1]})
+
+    # Act
+    response = client.get("/tasks", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.get_json()) == 2
+
+
+def test_etag_depends_on_query_and_stream(client, three_tasks):
+    # Act
+    etags = {
+        client.get("/tasks").headers["ETag"],
+        client.get("/tasks?sort=asc").headers["ETag"],
+        client.get("/tasks?stream=1").headers["ETag"]
+    }
+
+    # Assert
+    assert len(etags) == 3
+
+
+def test_goal_tasks_not_modified_until_goal_changes(client, one_task_belongs_to_one_goal, three_tasks):
+    # Arrange
+    etag = client.get("/goals/1/tasks").headers["ETag"]
+
+    # Act
+    unchanged = client.get("/goals/1/tasks", headers={"If-None-Match": etag})
+    client.patch("/tasks/1/mark_complete")
+    changed = client.get("/goals/1/tasks", headers={"If-None-Match": etag})
+
+    # Assert
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert changed.get_json()["tasks"][0]["is_complete"] == True
+
+
+def test_goal_tasks_change_when_tasks_linked(client, one_goal, three_tasks):
+    # Arrange
+    etag = client.get("/goals/1/tasks").headers["ETag"]
+    client.post("/goals/1/tasks", json={"task_ids": [1, 2]})
+
+    # Act
+    response = client.get("/goals/1/tasks", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.get_json()["tasks"]) == 2
+
+
+def test_get_goals_not_modified(client, three_goals):
+    # Arrange
+    etag = client.get("/goals").headers["ETag"]
+
+    # Act
+    response = client.get("/goals", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 304
+
+
+def test_get_one_task_not_modified(client, one_task):
+    # Arrange
+    first = client.get("/tasks/1")
+
+    # Act
+    response = client.get("/tasks/1", headers={"If-None-Match": first.headers["ETag"]})
+
+    # Assert
+    assert first.headers["Last-Modified"]
+    assert response.status_code == 304
+
+
+def test_get_one_task_if_modified_since(client, one_task):
+    # Arrange
+    last_modified = client.get("/tasks/1").headers["Last-Modified"]
+
+    # Act
+    response = client.get("/tasks/1", headers={"If-Modified-Since": last_modified})
+
+    # Assert
+    assert response.status_code == 304
+
+
+def test_update_task_changes_single_etag(client, one_task):
+    # Arrange
+    etag = client.get("/tasks/1").headers["ETag"]
+    client.put("/tasks/1", json={"title": "Updated Task Title", "description": "Updated Test Description"})
+
+    # Act
+    response = client.get("/tasks/1", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json()["task"]["title"] == "Updated Task Title"
+
+
+def test_missing_task_has_no_etag(client):
+    # Act
+    response = client.get("/tasks/1")
+
+    # Assert
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
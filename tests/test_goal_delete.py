@@ -0,0 +1,73 @@
+from app.db import db
+from app.models.goal import Goal
+from app.models.task import Task
+from sqlalchemy import event
+import pytest
+
+
+@pytest.fixture
+def goals_with_tasks(app):
+    db.session.add_all([Goal(title="Embrace the gardening life"), Goal(title="Self-care")])
+    db.session.add_all([
+        Task(title="Water the garden 🌷", description="", goal_id=1),
+        Task(title="Plant tomatoes", description="", goal_id=1),
+        Task(title="Take a bath", description="", goal_id=2),
+        Task(title="Answer forgotten email 📧", description="")
+    ])
+    db.session.commit()
+
+
+def task_goal_ids():
+    db.session.expire_all()
+    return dict(db.session.execute(db.select(Task.id, Task.goal_id).order_by(Task.id)).all())
+
+
+def test_delete_goal_detaches_its_tasks(client, goals_with_tasks):
+    # Arrange
+    cached = client.get("/tasks/1").get_json()
+
+    # Act
+    response = client.delete("/goals/1")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json() == {"details": 'Goal 1 "Embrace the gardening life" successfully deleted'}
+    assert task_goal_ids() == {1: None, 2: None, 3: 2, 4: None}
+    assert cached["task"]["goal_id"] == 1
+    assert "goal_id" not in client.get("/tasks/1").get_json()["task"]
+    assert client.get("/goals/1").status_code == 404
+
+
+def test_delete_goal_cascade_deletes_its_tasks(client, goals_with_tasks):
+    # Act
+    response = client.delete("/goals/1?cascade=tasks")
+
+    # Assert
+    assert response.status_code == 200
+    assert task_goal_ids() == {3: 2, 4: None}
+    assert client.get("/tasks/1").status_code == 404
+    assert [task["id"] for task in client.get("/tasks").get_json()] == [3, 4]
+
+
+def test_delete_goal_invalid_cascade(client, goals_with_tasks):
+    # Act
+    response = client.delete("/goals/1?cascade=everything")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"message": "invalid cascade"}
+    assert db.session.get(Goal, 1) is not None
+    assert task_goal_ids()[1] == 1
+
+
+def test_delete_goal_does_not_load_its_tasks(app, client, goals_with_tasks):
+    # Arrange
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    # Act
+    client.delete("/goals/1")
+
+    # Assert
+    assert not [statement for statement in statements if statement.startswith("SELECT") and "FROM task" in statement]
+    assert len([statement for statement in statements if statement.startswith("UPDATE task")]) == 1
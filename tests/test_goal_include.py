@@ -0,0 +1,135 @@
+from app.db import db
+from app.models.goal import Goal
+from app.models.task import Task
+from sqlalchemy import event
+import base64
+import json
+import pytest
+
+
+@pytest.fixture
+def two_goals_with_tasks(app):
+    db.session.add_all([Goal(title="Embrace the gardening life"), Goal(title="Self-care")])
+    db.session.add_all([
+        Task(title="Water the garden 🌷", description="", goal_id=1),
+        Task(title="Plant tomatoes", description="", goal_id=1),
+        Task(title="Weed the beds", description="", goal_id=1),
+        Task(title="Take a bath", description="", goal_id=2),
+        Task(title="Answer forgotten email 📧", description="")
+    ])
+    db.session.commit()
+
+
+def count_statements(app):
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_get_goals_include_tasks(client, two_goals_with_tasks):
+    # Act
+    response = client.get("/goals?include=tasks")
+    response_body = response.get_json()
+
+    # Assert
+    assert response.status_code == 200
+    assert [goal["id"] for goal in response_body] == [1, 2]
+    assert [task["id"] for task in response_body[0]["tasks"]] == [1, 2, 3]
+    assert response_body[1]["tasks"] == [{
+        "id": 4,
+        "goal_id": 2,
+        "title": "Take a bath",
+        "description": "",
+        "is_complete": False
+    }]
+
+
+def test_get_goals_include_tasks_in_two_queries(app, client, two_goals_with_tasks):
+    # Arrange
+    statements = count_statements(app)
+
+    # Act
+    client.get("/goals?include=tasks")
+
+    # Assert
+    listing_statements = [statement for statement in statements if "resource_version" not in statement]
+    assert len(listing_statements) == 2
+
+
+def test_get_goals_include_tasks_limit(client, two_goals_with_tasks):
+    # Act
+    response = client.get("/goals?include=tasks&tasks_limit=2")
+    response_body = response.get_json()
+
+    # Assert
+    assert [task["id"] for task in response_body[0]["tasks"]] == [1, 2]
+    assert [task["id"] for task in response_body[1]["tasks"]] == [4]
+    assert "tasks_next" not in response_body[1]
+
+    next_page = client.get(response_body[0]["tasks_next"]).get_json()
+    assert [task["id"] for task in next_page["goal"]["tasks"]] == [3]
+
+
+def test_get_goals_include_tasks_tampered_next_link(client, two_goals_with_tasks):
+    # Arrange
+    tasks_next = client.get("/goals?include=tasks&tasks_limit=2").get_json()[0]["tasks_next"]
+    raw = json.dumps({"sort": "", "after": [{"id": 2}]}, separators=(",", ":"))
+    cursor = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    # Act
+    response = client.get(tasks_next[:tasks_next.index("cursor=")] + f"cursor={cursor}")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"message": "invalid cursor"}
+
+
+def test_get_goals_include_tasks_paginates_goals(client, two_goals_with_tasks):
+    # Act
+    response = client.get("/goals?include=tasks&limit=1")
+
+    # Assert
+    assert len(response.get_json()) == 1
+    assert response.headers["X-Next-Cursor"]
+
+
+def test_get_one_goal_include_tasks_pages(client, two_goals_with_tasks):
+    # Act
+    first = client.get("/goals/1?include=tasks&limit=2")
+    link = first.headers["Link"]
+    second = client.get(link[1:link.index(">")])
+
+    # Assert
+    assert first.get_json()["goal"]["title"] == "Embrace the gardening life"
+    assert [task["id"] for task in first.get_json()["goal"]["tasks"]] == [1, 2]
+    assert [task["id"] for task in second.get_json()["goal"]["tasks"]] == [3]
+
+
+def test_get_one_goal_include_tasks_not_found(client):
+    # Act
+    response = client.get("/goals/1?include=tasks")
+
+    # Assert
+    assert response.status_code == 404
+    assert response.get_json() == {"message": "Goal not found"}
+
+
+@pytest.mark.parametrize("url", ["/goals?include=owner", "/goals?include=tasks&tasks_limit=0"])
+def test_get_goals_invalid_include(client, url):
+    # Act
+    response = client.get(url)
+
+    # Assert
+    assert response.status_code == 400
+
+
+def test_get_tasks_by_goal_in_one_query(app, client, two_goals_with_tasks):
+    # Arrange
+    statements = count_statements(app)
+
+    # Act
+    response = client.get("/goals/2/tasks")
+
+    # Assert
+    assert response.get_json()["tasks"][0]["id"] == 4
+    assert len([statement for statement in statements if "resource_version" not in statement]) == 1
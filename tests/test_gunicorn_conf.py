@@ -0,0 +1,73 @@
+from pathlib import Path
+import runpy
+import sys
+import pytest
+
+CONFIG_PATH = str(Path(__file__).resolve().parent.parent / "gunicorn.conf.py")
+
+
+class FakeLog:
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, message, *args):
+        self.warnings.append(message % args)
+
+
+class FakeServer:
+    def __init__(self):
+        self.log = FakeLog()
+
+
+def load_config(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONFIG_PATH)
+
+
+def test_gthread_defaults(monkeypatch):
+    # Act
+    config = load_config(monkeypatch, GUNICORN_WORKER_CLASS="gthread")
+
+    # Assert
+    assert config["workers"] == config["cores"] + 1
+    assert config["threads"] == 4
+    assert config["preload_app"] == True
+    assert config["max_requests"] == 1000
+
+
+def test_gevent_turns_preload_off(monkeypatch):
+    # Act
+    config = load_config(monkeypatch, GUNICORN_WORKER_CLASS="gevent", WEB_CONCURRENCY="3")
+
+    # Assert
+    assert config["workers"] == 3
+    assert config["preload_app"] == False
+
+
+def test_unknown_worker_class(monkeypatch):
+    # Act / Assert
+    with pytest.raises(ValueError):
+        load_config(monkeypatch, GUNICORN_WORKER_CLASS="eventlet")
+
+
+def test_post_fork_gives_worker_empty_pools(monkeypatch, tmp_path):
+    # Arrange
+    monkeypatch.setenv("SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'tasks.db'}")
+    monkeypatch.delitem(sys.modules, "wsgi", raising=False)
+    config = load_config(monkeypatch, GUNICORN_WORKER_CLASS="gthread")
+
+    import wsgi
+    from app.db import db
+    with wsgi.app.app_context():
+        engine = db.engine
+        with engine.connect():
+            pass
+    assert engine.pool.checkedin() == 1
+
+    # Act
+    config["post_fork"](FakeServer(), None)
+
+    # Assert
+    assert engine.pool.checkedin() == 0
+    monkeypatch.delitem(sys.modules, "wsgi")
@@ -0,0 +1,167 @@
+from app.db import db
+from app.models.goal import Goal
+from app.models.task import Task
+from datetime import datetime
+import json
+import pytest
+
+
+@pytest.fixture
+def goals_with_tasks(app):
+    db.session.add_all([Goal(title="Embrace the gardening life"), Goal(title="Self-care")])
+    db.session.add_all([
+        Task(title="Water the garden 🌷", description="", goal_id=1, completed_at=datetime(2024, 3, 1, 9, 30)),
+        Task(title="Plant tomatoes", description="Cherry ones", goal_id=1),
+        Task(title="Take a bath", description="", goal_id=2),
+        Task(title="Answer forgotten email 📧", description="")
+    ])
+    db.session.commit()
+
+
+def invoke(app, *args, **kwargs):
+    return app.test_cli_runner(mix_stderr=False).invoke(args=["tasks", *args], **kwargs)
+
+
+def task_rows():
+    db.session.expire_all()
+    query = (
+        db.select(Task.title, Task.description, Task.completed_at, Goal.title)
+        .outerjoin(Goal, Goal.id == Task.goal_id)
+        .order_by(Task.id)
+    )
+    return [tuple(row) for row in db.session.execute(query)]
+
+
+def delete_everything():
+    db.session.execute(db.delete(Task))
+    db.session.execute(db.delete(Goal))
+    db.session.commit()
+
+
+def test_export_ndjson_writes_a_line_per_task(app, goals_with_tasks, tmp_path):
+    # Act
+    result = invoke(app, "export", str(tmp_path / "tasks.ndjson"))
+
+    # Assert
+    assert result.exit_code == 0
+    assert "Exported 4 tasks" in result.output
+    lines = (tmp_path / "tasks.ndjson").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1, "title": "Water the garden 🌷", "description": "", "completed_at": "2024-03-01T09:30:00",
+         "goal_id": 1, "goal_title": "Embrace the gardening life"},
+        {"id": 2, "title": "Plant tomatoes", "description": "Cherry ones", "completed_at": None,
+         "goal_id": 1, "goal_title": "Embrace the gardening life"},
+        {"id": 3, "title": "Take a bath", "description": "", "completed_at": None,
+         "goal_id": 2, "goal_title": "Self-care"},
+        {"id": 4, "title": "Answer forgotten email 📧", "description": "", "completed_at": None,
+         "goal_id": None, "goal_title": None}
+    ]
+
+
+def test_export_format_follows_the_extension(app, goals_with_tasks, tmp_path):
+    # Act
+    result = invoke(app, "export", str(tmp_path / "tasks.csv"), "--batch-size", "2")
+
+    # Assert
+    assert result.exit_code == 0
+    lines = (tmp_path / "tasks.csv").read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "id,title,description,completed_at,goal_id,goal_title"
+    assert lines[1] == "1,Water the garden 🌷,,2024-03-01T09:30:00,1,Embrace the gardening life"
+    assert lines[4] == "4,Answer forgotten email 📧,,,,"
+
+
+def test_export_to_stdout_reports_on_stderr(app, goals_with_tasks):
+    # Act
+    result = invoke(app, "export", "-", "--format", "ndjson")
+
+    # Assert
+    assert result.exit_code == 0
+    assert len(result.stdout.splitlines()) == 4
+    assert "Exported 4 tasks" in result.stderr
+
+
+@pytest.mark.parametrize("file_name", ["tasks.ndjson", "tasks.csv"])
+def test_round_trip_into_an_empty_database_recreates_goals(app, goals_with_tasks, tmp_path, file_name):
+    # Arrange
+    path = str(tmp_path / file_name)
+    invoke(app, "export", path)
+    exported = task_rows()
+    delete_everything()
+
+    # Act
+    result = invoke(app, "import", path, "--chunk-size", "3")
+
+    # Assert
+    assert result.exit_code == 0
+    assert "Imported 4 tasks (2 new goals)" in result.output
+    assert task_rows() == exported
+    counters = db.session.execute(db.select(Goal.title, Goal.task_count, Goal.completed_count).order_by(Goal.id)).all()
+    assert [tuple(row) for row in counters] == [("Embrace the gardening life", 2, 1), ("Self-care", 1, 0)]
+
+
+def test_import_links_to_goals_that_already_exist(app, goals_with_tasks, tmp_path):
+    # Arrange
+    path = str(tmp_path / "tasks.ndjson")
+    invoke(app, "export", path)
+
+    # Act
+    result = invoke(app, "import", path)
+
+    # Assert
+    assert result.exit_code == 0
+    assert "Imported 4 tasks (0 new goals)" in result.output
+    assert Goal.query.count() == 2
+    assert Task.query.filter_by(goal_id=1).count() == 4
+    assert db.session.get(Goal, 1).task_count == 4
+
+
+def test_import_drops_cached_task_responses(app, client, goals_with_tasks, tmp_path):
+    # Arrange
+    path = tmp_path / "tasks.ndjson"
+    path.write_text(json.dumps({"title": "Prune the roses", "description": "", "goal_id": 1}) + "\n")
+    assert len(client.get("/goals/1/tasks").get_json()["tasks"]) == 2
+
+    # Act
+    result = invoke(app, "import", str(path))
+
+    # Assert
+    assert result.exit_code == 0
+    assert len(client.get("/goals/1/tasks").get_json()["tasks"]) == 3
+
+
+def test_import_from_stdin(app, goals_with_tasks):
+    # Arrange
+    rows = "title,description,completed_at,goal_id\nPrune the roses,,2024-03-02T08:00:00+02:00,2\n"
+
+    # Act
+    result = invoke(app, "import", "-", "--format", "csv", input=rows)
+
+    # Assert
+    assert result.exit_code == 0
+    assert task_rows()[-1] == ("Prune the roses", "", datetime(2024, 3, 2, 6, 0), "Self-care")
+
+
+@pytest.mark.parametrize("line, message", [
+    ('{"title": "", "description": ""}', "line 3: needs a title and a description"),
+    ('{"title": "Prune the roses"}', "line 3: needs a title and a description"),
+    ('{"title": "Prune the roses", "description": "", "completed_at": "soon"}', "line 3: invalid completed_at 'soon'"),
+    ('{"title": "Prune the roses", "description": "", "goal_id": 9}', "line 3: goal 9 doesn't exist"),
+    ('{"title": "Prune the roses", "description": "", "goal_id": true}', "line 3: invalid goal_id True"),
+    ('{"title": "Prune the roses", "description": "", "goal_id": 1.7}', "line 3: invalid goal_id 1.7"),
+    ('{"title": "Prune the roses", "description": ""', "line 3: isn't valid json"),
+    ('["Prune the roses"]', "line 3: isn't an object")
+])
+def test_invalid_row_rolls_back_the_whole_import(app, goals_with_tasks, tmp_path, line, message):
+    # Arrange
+    path = tmp_path / "tasks.ndjson"
+    valid = json.dumps({"title": "Prune the roses", "description": "", "goal_id": 1})
+    path.write_text(f"{valid}\n{valid}\n{line}\n")
+
+    # Act
+    result = invoke(app, "import", str(path), "--chunk-size", "1")
+
+    # Assert
+    assert result.exit_code == 1
+    assert f"Nothing imported, {message}" in result.stderr
+    assert Task.query.count() == 4
+    assert db.session.get(Goal, 1).task_count == 2
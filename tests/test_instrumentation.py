@@ -0,0 +1,119 @@
+from app import create_app
+from app.db import db
+from app.instrumentation import statement_shape
+from app.models.task import Task
+import logging
+import pytest
+
+
+@pytest.fixture
+def instrumented_app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "SLACK_NOTIFICATIONS_ENABLED": False,
+        "INTERNAL_ENDPOINTS_ENABLED": True,
+        "INSTRUMENTATION_ENABLED": True,
+        "N_PLUS_ONE_THRESHOLD": 5,
+        "PROFILE_HEADER_ENABLED": True,
+        "PROFILE_DIR": str(tmp_path / "profiles")
+    })
+
+    # reads the tasks one query at a time, the way an N+1 does
+    @app.get("/one_by_one")
+    def one_by_one():
+        titles = [db.session.scalar(db.select(Task.title).where(Task.id == task_id)) for task_id in range(1, 7)]
+        return {"titles": titles}
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Task), [{"title": f"Task {number}", "description": ""} for number in range(6)])
+        db.session.commit()
+
+    yield app
+
+
+def test_server_timing_reports_queries_and_time(instrumented_app):
+    # Act
+    response = instrumented_app.test_client().get("/tasks")
+
+    # Assert
+    assert response.status_code == 200
+    server_timing = response.headers["Server-Timing"]
+    assert server_timing.startswith("db;dur=")
+    assert "queries" in server_timing
+    assert "app;dur=" in server_timing
+    assert "total;dur=" in server_timing
+
+
+def test_request_stats_count_queries_per_endpoint(instrumented_app):
+    # Arrange
+    client = instrumented_app.test_client()
+
+    # Act
+    client.get("/tasks/1")
+    client.get("/tasks/2")
+    stats = client.get("/_internal/requests").get_json()
+
+    # Assert
+    assert stats["enabled"] is True
+    assert stats["endpoints"]["tasks_bp.get_one_task"]["requests"] == 2
+    assert stats["endpoints"]["tasks_bp.get_one_task"]["queries_max"] >= 1
+
+
+def test_repeated_statement_is_flagged_as_n_plus_one(instrumented_app, caplog):
+    # Arrange
+    client = instrumented_app.test_client()
+
+    # Act
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        client.get("/one_by_one")
+        client.get("/tasks")
+
+    # Assert
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("possible N+1 in one_by_one: ran 6 times" in message for message in messages)
+    assert not any("N+1 in tasks_bp" in message for message in messages)
+    stats = client.get("/_internal/requests").get_json()
+    assert stats["endpoints"]["one_by_one"]["n_plus_one"] == 1
+
+
+def test_slow_queries_are_logged(instrumented_app, caplog):
+    # Arrange
+    instrumented_app.config["SLOW_QUERY_MS"] = 0
+
+    # Act
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        instrumented_app.test_client().get("/tasks")
+
+    # Assert
+    assert any(record.getMessage().startswith("slow query") for record in caplog.records)
+
+
+def test_profile_header_saves_a_profile(instrumented_app, tmp_path):
+    # Arrange
+    client = instrumented_app.test_client()
+
+    # Act
+    profiled = client.get("/tasks", headers={"X-Profile": "1"})
+    unprofiled = client.get("/tasks")
+
+    # Assert
+    assert profiled.headers["X-Profile"].endswith(".prof")
+    assert (tmp_path / "profiles" / profiled.headers["X-Profile"]).exists()
+    assert "X-Profile" not in unprofiled.headers
+
+
+def test_instrumentation_is_off_by_default(client):
+    # Act
+    response = client.get("/tasks")
+
+    # Assert
+    assert "Server-Timing" not in response.headers
+    assert client.get("/_internal/requests").get_json() == {"enabled": False, "endpoints": {}}
+
+
+def test_statement_shape_ignores_the_length_of_in_lists():
+    # Assert
+    assert statement_shape("SELECT id FROM task WHERE id IN (?, ?, ?)") == statement_shape("SELECT id FROM task WHERE id IN (?)")
+    assert statement_shape("SELECT id FROM task WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "SELECT id FROM task WHERE id IN (?)"
@@ -0,0 +1,41 @@
+from app.lazy_loads import LazyLoadError
+from app.models.goal import Goal
+from app.models.task import Task
+from app.db import db
+import pytest
+
+
+def test_lazy_load_in_get_request_raises(app, one_task_belongs_to_one_goal):
+    # Act / Assert
+    with app.test_request_context("/tasks"):
+        task = db.session.get(Task, 1)
+        with pytest.raises(LazyLoadError):
+            task.goal
+
+
+def test_lazy_load_allowed_when_turned_off(app, one_task_belongs_to_one_goal):
+    # Arrange
+    app.config["RAISE_ON_LAZY_LOAD"] = False
+
+    # Act
+    with app.test_request_context("/tasks"):
+        goal = db.session.get(Task, 1).goal
+
+    # Assert
+    assert goal.id == 1
+
+
+def test_lazy_load_allowed_outside_requests(app, one_task_belongs_to_one_goal):
+    # Act
+    tasks = db.session.get(Goal, 1).tasks
+
+    # Assert
+    assert [task.id for task in tasks] == [1]
+
+
+def test_delete_goal_with_tasks(client, one_task_belongs_to_one_goal):
+    # Act
+    response = client.delete("/goals/1")
+
+    # Assert
+    assert response.status_code == 200
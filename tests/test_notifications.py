@@ -0,0 +1,141 @@
+from app.notifications import SlackClient, SlackDispatcher, notifier
+from benchmarks.fake_slack import FakeSlackServer
+import time
+import pytest
+
+
+def make_dispatcher(url, **overrides):
+    config = {
+        "SLACK_API_URL": url,
+        "SLACK_API_KEY": "test-key",
+        "SLACK_CHANNEL": "task-notifications",
+        "SLACK_TIMEOUT": (1, 1),
+        "SLACK_POOL_SIZE": 1,
+        "SLACK_QUEUE_SIZE": 10,
+        "SLACK_BATCH_SIZE": 20,
+        "SLACK_BATCH_WINDOW": 0,
+        "SLACK_MAX_RETRIES": 3,
+        "SLACK_RETRY_BACKOFF": 0,
+        "SLACK_OVERFLOW_POLICY": "drop_oldest",
+        # no worker threads, so the tests control when the queue is drained
+        "SLACK_WORKERS": 0,
+    }
+    config.update(overrides)
+    return SlackDispatcher(config)
+
+
+def test_mark_complete_sends_slack_message(app, slack_client, fake_slack, one_task):
+    # Act
+    response = slack_client.patch("/tasks/1/mark_complete")
+    notifier.get_dispatcher(app).flush(timeout=5)
+
+    # Assert
+    assert response.status_code == 200
+    assert fake_slack.messages == ["Someone just completed the task Go on my daily walk 🏞"]
+    assert fake_slack.requests[0]["channel"] == app.config["SLACK_CHANNEL"]
+
+
+def test_mark_complete_does_not_wait_for_slack(app, slack_client, fake_slack, one_task):
+    # Arrange
+    fake_slack.delay = 1
+
+    # Act
+    start = time.perf_counter()
+    response = slack_client.patch("/tasks/1/mark_complete")
+    elapsed = time.perf_counter() - start
+
+    # Assert
+    assert response.status_code == 200
+    assert elapsed < fake_slack.delay
+    assert notifier.get_dispatcher(app).flush(timeout=5)
+    assert len(fake_slack.messages) == 1
+
+
+def test_mark_complete_without_notifications_does_not_queue(app, client, one_task):
+    # Act
+    response = client.patch("/tasks/1/mark_complete")
+
+    # Assert
+    assert response.status_code == 200
+    assert notifier.get_dispatcher(app).stats()["queued"] == 0
+
+
+def test_slack_client_reuses_connection(app):
+    with FakeSlackServer() as fake_slack:
+        # Arrange
+        app.config["SLACK_API_URL"] = fake_slack.url
+        client = SlackClient(app.config)
+
+        # Act
+        responses = [client.post_message(f"message {number}") for number in range(5)]
+        client.close()
+
+    # Assert
+    assert all(response.status_code == 200 for response in responses)
+    assert len(fake_slack.messages) == 5
+    assert fake_slack.connections == 1
+
+
+def test_app_exposes_shared_slack_client(app):
+    # Assert
+    assert notifier.get_client(app) is app.extensions["slack_client"]
+    assert notifier.get_dispatcher(app).client is notifier.get_client(app)
+
+
+def test_dispatcher_batches_queued_messages():
+    with FakeSlackServer() as fake_slack:
+        # Arrange
+        dispatcher = make_dispatcher(fake_slack.url)
+        for number in range(3):
+            dispatcher.submit(f"message {number}")
+
+        # Act
+        delivered = dispatcher.deliver(dispatcher._next_batch())
+
+    # Assert
+    assert delivered
+    assert fake_slack.messages == ["message 0\nmessage 1\nmessage 2"]
+
+
+def test_dispatcher_retries_server_errors():
+    with FakeSlackServer(statuses=[500, 503]) as fake_slack:
+        # Arrange
+        dispatcher = make_dispatcher(fake_slack.url)
+
+        # Act
+        delivered = dispatcher.deliver(["hello"])
+
+    # Assert
+    assert delivered
+    assert fake_slack.messages == ["hello"]
+    assert dispatcher.stats()["retries"] == 2
+
+
+def test_dispatcher_gives_up_after_max_retries():
+    with FakeSlackServer(statuses=[500, 500, 500]) as fake_slack:
+        # Arrange
+        dispatcher = make_dispatcher(fake_slack.url, SLACK_MAX_RETRIES=2)
+
+        # Act
+        delivered = dispatcher.deliver(["hello"])
+
+    # Assert
+    assert not delivered
+    assert fake_slack.messages == []
+
+
+@pytest.mark.parametrize("policy, expected", [
+    ("drop_oldest", ["message 1", "message 2"]),
+    ("drop_newest", ["message 0", "message 1"]),
+])
+def test_dispatcher_overflow_policy(policy, expected):
+    # Arrange
+    dispatcher = make_dispatcher("http://127.0.0.1:9", SLACK_QUEUE_SIZE=2, SLACK_OVERFLOW_POLICY=policy)
+
+    # Act
+    for number in range(3):
+        dispatcher.submit(f"message {number}")
+
+    # Assert
+    assert dispatcher._next_batch() == expected
+    assert dispatcher.stats()["dropped"] == 1
@@ -0,0 +1,122 @@
+from app.db import db
+from app.models.outbox import OutboxEvent
+from app.notifications import notifier
+from datetime import datetime, timedelta
+import pytest
+
+
+@pytest.fixture
+def outbox_client(app, slack_client):
+    app.config["SLACK_DELIVERY"] = "outbox"
+    return slack_client
+
+
+def test_mark_complete_writes_outbox_event(app, outbox_client, fake_slack, one_task):
+    # Act
+    response = outbox_client.patch("/tasks/1/mark_complete")
+
+    # Assert
+    assert response.status_code == 200
+    events = OutboxEvent.query.all()
+    assert len(events) == 1
+    assert events[0].event_type == "task.completed"
+    assert events[0].payload == {
+        "task_id": 1,
+        "text": "Someone just completed the task Go on my daily walk 🏞"
+    }
+    assert events[0].delivered_at is None
+    assert fake_slack.messages == []
+
+
+def test_drain_outbox_delivers_pending_events(app, outbox_client, fake_slack, three_tasks):
+    # Arrange
+    for task_id in (1, 2, 3):
+        outbox_client.patch(f"/tasks/{task_id}/mark_complete")
+
+    # Act
+    result = app.test_cli_runner().invoke(args=["outbox", "drain", "--batch-size", "2"])
+
+    # Assert
+    assert result.exit_code == 0
+    assert "Drained 3 outbox events" in result.output
+    assert len(fake_slack.requests) == 2
+    assert OutboxEvent.query.filter(OutboxEvent.delivered_at.is_(None)).count() == 0
+
+
+def test_drain_outbox_records_failed_attempts(app, outbox_client, fake_slack, one_task):
+    # Arrange
+    app.config["SLACK_MAX_RETRIES"] = 0
+    notifier.init_app(app)
+    fake_slack.statuses = [500, 500]
+    outbox_client.patch("/tasks/1/mark_complete")
+
+    # Act
+    result = app.test_cli_runner().invoke(args=["outbox", "drain", "--max-attempts", "2"])
+
+    # Assert
+    assert result.exit_code == 0
+    event = db.session.get(OutboxEvent, 1)
+    assert event.delivered_at is None
+    assert event.attempts == 2
+    assert event.last_error
+
+
+def test_rolled_back_transaction_sends_nothing(app, slack_client, fake_slack, one_task):
+    # Arrange
+    notifier.publish("never sent", event_type="task.completed")
+
+    # Act
+    db.session.rollback()
+    notifier.get_dispatcher(app).flush(timeout=5)
+
+    # Assert
+    assert notifier.get_dispatcher(app).stats()["queued"] == 0
+    assert fake_slack.messages == []
+
+
+def test_drain_outbox_sends_outside_the_claiming_transaction(app, outbox_client, fake_slack, one_task, monkeypatch):
+    # Arrange
+    outbox_client.patch("/tasks/1/mark_complete")
+    dispatcher = notifier.get_dispatcher(app)
+    deliver = dispatcher.deliver
+    seen = {}
+
+    def checking_deliver(texts):
+        # the claim was committed before slack is called, so no row lock is held meanwhile
+        seen["in_transaction"] = db.session().in_transaction()
+        seen["claimed_until"] = db.session.get(OutboxEvent, 1).claimed_until
+        db.session.rollback()
+        return deliver(texts)
+
+    monkeypatch.setattr(dispatcher, "deliver", checking_deliver)
+
+    # Act
+    result = app.test_cli_runner().invoke(args=["outbox", "drain"])
+
+    # Assert
+    assert result.exit_code == 0
+    assert seen["in_transaction"] == False
+    assert seen["claimed_until"] is not None
+    event = db.session.get(OutboxEvent, 1)
+    assert event.delivered_at is not None
+    assert event.claimed_until is None
+    assert event.attempts == 1
+
+
+def test_drain_outbox_skips_claimed_events_until_the_lease_runs_out(app, outbox_client, fake_slack, three_tasks):
+    # Arrange
+    for task_id in (1, 2):
+        outbox_client.patch(f"/tasks/{task_id}/mark_complete")
+    # another drainer holds event 1, and died holding event 2
+    db.session.get(OutboxEvent, 1).claimed_until = datetime.utcnow() + timedelta(minutes=5)
+    db.session.get(OutboxEvent, 2).claimed_until = datetime.utcnow() - timedelta(minutes=5)
+    db.session.commit()
+
+    # Act
+    result = app.test_cli_runner().invoke(args=["outbox", "drain"])
+
+    # Assert
+    assert result.exit_code == 0
+    assert "Drained 1 outbox events" in result.output
+    assert db.session.get(OutboxEvent, 1).delivered_at is None
+    assert db.session.get(OutboxEvent, 2).delivered_at is not None
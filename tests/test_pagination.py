@@ -0,0 +1,133 @@
+import base64
+import json
+import pytest
+
+
+def get_all_pages(client, url):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append(response.get_json())
+        link = response.headers.get("Link")
+        url = link[1:link.index(">")] if link else None
+    return pages
+
+
+def test_get_tasks_first_page(client, three_tasks):
+    # Act
+    response = client.get("/tasks?limit=2")
+    response_body = response.get_json()
+
+    # Assert
+    assert response.status_code == 200
+    assert [task["id"] for task in response_body] == [1, 2]
+    assert response.headers["X-Next-Cursor"]
+    assert 'rel="next"' in response.headers["Link"]
+
+
+def test_get_tasks_follows_cursor_to_last_page(client, three_tasks):
+    # Act
+    pages = get_all_pages(client, "/tasks?limit=2")
+
+    # Assert
+    assert [[task["id"] for task in page] for page in pages] == [[1, 2], [3]]
+
+
+def test_get_tasks_sorted_desc_pages(client, three_tasks):
+    # Act
+    pages = get_all_pages(client, "/tasks?sort=desc&limit=1")
+
+    # Assert
+    assert [page[0]["title"] for page in pages] == [
+        "Water the garden 🌷",
+        "Pay my outstanding tickets 😭",
+        "Answer forgotten email 📧"
+    ]
+
+
+def test_get_tasks_last_page_has_no_link(client, three_tasks):
+    # Act
+    response = client.get("/tasks?limit=3")
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.get_json()) == 3
+    assert "Link" not in response.headers
+
+
+def test_get_tasks_without_limit_is_unpaginated(client, three_tasks):
+    # Act
+    response = client.get("/tasks")
+
+    # Assert
+    assert len(response.get_json()) == 3
+    assert "Link" not in response.headers
+
+
+def test_get_tasks_default_limit_from_config(app, client, three_tasks):
+    # Arrange
+    app.config["PAGINATION_DEFAULT_LIMIT"] = 2
+
+    # Act
+    response = client.get("/tasks")
+
+    # Assert
+    assert len(response.get_json()) == 2
+    assert "X-Next-Cursor" in response.headers
+
+
+@pytest.mark.parametrize("query_string", ["limit=0", "limit=abc"])
+def test_get_tasks_invalid_limit(client, three_tasks, query_string):
+    # Act
+    response = client.get(f"/tasks?{query_string}")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"message": "invalid limit"}
+
+
+# a cursor the way encode_cursor makes them, but with whatever is in it
+def make_cursor(data):
+    raw = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("url", [
+    "/tasks?limit=2&cursor=not-a-cursor",
+    f"/tasks?limit=2&cursor={make_cursor({'sort': '', 'after': [{'x': 1}]})}",
+    f"/tasks?limit=2&cursor={make_cursor({'sort': '', 'after': [True]})}",
+    f"/tasks?limit=2&cursor={make_cursor({'sort': '', 'after': ['1']})}",
+    f"/tasks?sort=asc&limit=2&cursor={make_cursor({'sort': 'asc', 'after': [[1], 2]})}",
+    f"/tasks?sort=asc&limit=2&cursor={make_cursor({'sort': 'asc', 'after': ['Water the garden 🌷', 2.5]})}"
+])
+def test_get_tasks_invalid_cursor(client, three_tasks, url):
+    # Act
+    response = client.get(url)
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"message": "invalid cursor"}
+
+
+def test_get_tasks_cursor_from_other_sort(client, three_tasks):
+    # Arrange
+    cursor = client.get("/tasks?limit=1").headers["X-Next-Cursor"]
+
+    # Act
+    response = client.get(f"/tasks?sort=asc&limit=1&cursor={cursor}")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"message": "invalid cursor"}
+
+
+def test_get_goals_sorted_asc_pages(client, three_goals):
+    # Act
+    pages = get_all_pages(client, "/goals?sort=asc&limit=2")
+
+    # Assert
+    assert pages == [
+        [{"id": 3, "title": "Be debt-free"}, {"id": 1, "title": "Embrace the gardening life"}],
+        [{"id": 2, "title": "Self-care"}]
+    ]
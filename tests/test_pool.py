@@ -0,0 +1,96 @@
+from app import create_app
+from app.db import db
+from app.pool import InstrumentedQueuePool, build_engine_options, POOL_SETTINGS
+from sqlalchemy.pool import NullPool
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+
+def test_postgres_engine_options():
+    # Act
+    options = build_engine_options("postgresql://localhost/tasks", dict(POOL_SETTINGS))
+
+    # Assert
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 5
+    assert options["max_overflow"] == 5
+    assert options["pool_pre_ping"] == True
+    assert options["connect_args"] == {"options": "-c statement_timeout=30000"}
+
+
+def test_pgbouncer_engine_options():
+    # Arrange
+    config = dict(POOL_SETTINGS, DB_PGBOUNCER=True)
+
+    # Act
+    options = build_engine_options("postgresql+psycopg://localhost/tasks", config)
+
+    # Assert
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"] == {"prepare_threshold": None}
+
+
+def test_in_memory_sqlite_keeps_its_pool():
+    # Act / Assert
+    assert build_engine_options("sqlite://", dict(POOL_SETTINGS)) == {}
+
+
+def test_pool_settings_from_env(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    monkeypatch.setenv("DB_PGBOUNCER", "false")
+
+    # Act
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "postgresql://localhost/tasks"})
+
+    # Assert
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"] == 12
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'tasks.db'}",
+        "SLACK_NOTIFICATIONS_ENABLED": False,
+        "INTERNAL_ENDPOINTS_ENABLED": True,
+        "DB_POOL_SIZE": 2,
+        "DB_MAX_OVERFLOW": 1
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_pool_stats_under_concurrent_requests(file_app):
+    # Arrange
+    client = file_app.test_client()
+    client.post("/tasks", json={"title": "A Brand New Task", "description": "Test Description"})
+
+    # Act
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        statuses = list(executor.map(lambda _: file_app.test_client().get("/tasks").status_code, range(40)))
+    stats = client.get("/_internal/pool").get_json()
+
+    # Assert
+    assert statuses == [200] * 40
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert stats["size"] == 2
+    assert stats["checked_out"] == 0
+    assert stats["timeouts"] == 0
+    assert stats["checkouts"] >= 40
+
+
+@pytest.mark.parametrize("path", ["/_internal/pool", "/_internal/cache", "/_internal/replicas", "/_internal/requests"])
+def test_internal_endpoints_off_by_default(monkeypatch, path):
+    # Arrange
+    monkeypatch.delenv("INTERNAL_ENDPOINTS_ENABLED", raising=False)
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite://", "SLACK_NOTIFICATIONS_ENABLED": False})
+
+    # Act
+    response = app.test_client().get(path)
+
+    # Assert
+    assert response.status_code == 404
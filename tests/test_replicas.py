@@ -0,0 +1,158 @@
+from app import create_app
+from app.cache import response_cache
+from app.db import db
+from app.models.resource_version import ResourceVersion
+from app.models.task import Task
+from app.replicas import STICKY_COOKIE
+from datetime import datetime, timedelta
+import pytest
+
+
+def make_replica_app(tmp_path, replica_count):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+        "REPLICA_URIS": [f"sqlite:///{tmp_path / f'replica_{number}.db'}" for number in range(replica_count)],
+        "SLACK_NOTIFICATIONS_ENABLED": False,
+        "INTERNAL_ENDPOINTS_ENABLED": True,
+        "REPLICA_CHECK_INTERVAL": 0
+    })
+
+    # the same task on every database, with a different title so a response tells where it was read
+    with app.app_context():
+        for key in [None] + [f"replica_{number}" for number in range(replica_count)]:
+            engine = db.engines[key]
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(db.insert(Task).values(id=1, title=f"read from {key or 'primary'}", description=""))
+                connection.execute(db.insert(ResourceVersion).values(name="tasks", version=1, updated_at=datetime.utcnow()))
+
+    return app
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    app = make_replica_app(tmp_path, 1)
+
+    yield app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def two_replica_app(tmp_path):
+    app = make_replica_app(tmp_path, 2)
+
+    yield app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def get_title(client):
+    return client.get("/tasks").get_json()[0]["title"]
+
+
+def test_get_reads_from_replica(replica_app):
+    # Arrange
+    client = replica_app.test_client()
+
+    # Act
+    title = get_title(client)
+
+    # Assert
+    assert title == "read from replica_0"
+    stats = client.get("/_internal/replicas").get_json()
+    assert stats["replicas"][0]["reads"] >= 1
+
+
+def test_client_reads_own_writes_from_primary(replica_app):
+    # Arrange
+    client = replica_app.test_client()
+
+    # Act
+    response = client.post("/tasks", json={"title": "A Brand New Task", "description": "Test Description"})
+    tasks = client.get("/tasks").get_json()
+
+    # Assert
+    assert response.status_code == 201
+    assert client.get_cookie(STICKY_COOKIE) is not None
+    assert [task["title"] for task in tasks] == ["read from primary", "A Brand New Task"]
+
+
+def test_other_clients_still_read_replica(replica_app):
+    # Arrange
+    replica_app.test_client().post("/tasks", json={"title": "A Brand New Task", "description": "Test Description"})
+
+    # Act
+    title = get_title(replica_app.test_client())
+
+    # Assert
+    assert title == "read from replica_0"
+
+
+def test_lagging_replica_falls_back_to_primary(replica_app):
+    # Arrange
+    with replica_app.app_context():
+        with db.engines["replica_0"].begin() as connection:
+            connection.execute(db.update(ResourceVersion).values(updated_at=datetime.utcnow() - timedelta(minutes=1)))
+
+    # Act
+    client = replica_app.test_client()
+    title = get_title(client)
+
+    # Assert
+    assert title == "read from primary"
+    assert client.get("/_internal/replicas").get_json()["replicas"][0]["healthy"] == False
+
+
+def test_cache_is_not_filled_from_lagging_replica(replica_app):
+    # Arrange
+    writer = replica_app.test_client()
+    writer.put("/tasks/1", json={"title": "Updated Task Title", "description": "Updated"})
+
+    # Act
+    # another client, without the sticky cookie, reads the row from before the write off the replica
+    other_title = replica_app.test_client().get("/tasks/1").get_json()["task"]["title"]
+    writer_title = writer.get("/tasks/1").get_json()["task"]["title"]
+    later_title = replica_app.test_client().get("/tasks/1").get_json()["task"]["title"]
+
+    # Assert
+    assert other_title == "read from replica_0"
+    assert writer_title == "Updated Task Title"
+    assert later_title == "read from replica_0"
+    with replica_app.app_context():
+        assert response_cache.get_store().stats()["size"] == 0
+
+
+def test_request_reads_one_replica(two_replica_app):
+    # Arrange
+    client = two_replica_app.test_client()
+
+    # Act
+    # the version query behind the etag and the listing itself are two reads of one request
+    for _ in range(4):
+        response = client.get("/tasks")
+        assert response.status_code == 200
+
+    # Assert
+    stats = client.get("/_internal/replicas").get_json()
+    assert [replica["reads"] for replica in stats["replicas"]] == [2, 2]
+
+
+def test_writes_go_to_primary(replica_app):
+    # Act
+    replica_app.test_client().put("/tasks/1", json={"title": "Updated Task Title", "description": "Updated"})
+
+    # Assert
+    with replica_app.app_context():
+        assert db.session.get(Task, 1).title == "Updated Task Title"
+
+
+def test_unknown_replica_selection():
+    # Act / Assert
+    with pytest.raises(ValueError):
+        create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "REPLICA_SELECTION": "random"})
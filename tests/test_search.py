@@ -0,0 +1,111 @@
+from app.db import db
+from app.models.task import Task
+from app.search import escape_html
+from sqlalchemy.dialects import postgresql
+import pytest
+
+
+@pytest.fixture
+def searchable_tasks(app):
+    db.session.add_all([
+        Task(title="Water the garden 🌷", description="Tomatoes and the herb garden"),
+        Task(title="Answer forgotten email 📧", description="Reply about the garden party"),
+        Task(title="Pay my outstanding tickets 😭", description="Parking tickets from downtown"),
+    ])
+    db.session.commit()
+
+
+def test_search_tasks_ranks_title_matches_first(client, searchable_tasks):
+    # Act
+    response = client.get("/tasks/search?q=garden")
+    response_body = response.get_json()
+
+    # Assert
+    assert response.status_code == 200
+    assert response_body["query"] == "garden"
+    assert [result["id"] for result in response_body["results"]] == [1, 2]
+    assert response_body["results"][0]["highlights"] == {
+        "title": "Water the <mark>garden</mark> 🌷",
+        "description": "Tomatoes and the herb <mark>garden</mark>"
+    }
+    assert response_body["next_offset"] is None
+
+
+def test_search_tasks_matches_every_term(client, searchable_tasks):
+    # Act
+    response = client.get("/tasks/search?q=parking tickets")
+    response_body = response.get_json()
+
+    # Assert
+    assert [result["id"] for result in response_body["results"]] == [3]
+    assert response_body["results"][0]["is_complete"] == False
+
+
+def test_search_tasks_pages(client, searchable_tasks):
+    # Act
+    first = client.get("/tasks/search?q=garden&limit=1").get_json()
+    second = client.get(f"/tasks/search?q=garden&limit=1&offset={first['next_offset']}").get_json()
+
+    # Assert
+    assert [result["id"] for result in first["results"]] == [1]
+    assert [result["id"] for result in second["results"]] == [2]
+    assert second["next_offset"] is None
+
+
+def test_search_tasks_sees_new_and_deleted_tasks(client, searchable_tasks):
+    # Arrange
+    client.get("/tasks/search?q=garden")
+
+    # Act
+    client.post("/tasks", json={"title": "Weed the garden", "description": "Before it rains"})
+    client.delete("/tasks/1")
+    client.post("/tasks/bulk", json=[{"title": "Garden fence", "description": "Fix it"}])
+    response = client.get("/tasks/search?q=garden")
+
+    # Assert
+    assert sorted(result["id"] for result in response.get_json()["results"]) == [2, 4, 5]
+
+
+def test_search_tasks_no_matches(client, searchable_tasks):
+    # Act
+    response = client.get("/tasks/search?q=volcano")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json()["results"] == []
+
+
+@pytest.mark.parametrize("query_string", ["", "q=", "q=garden&limit=0", "q=garden&offset=-1", "q=garden&limit=x"])
+def test_search_tasks_invalid_params(client, query_string):
+    # Act
+    response = client.get(f"/tasks/search?{query_string}")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"details": "Invalid data"}
+
+
+def test_search_tasks_escapes_highlights(client):
+    # Arrange
+    db.session.add(Task(title="<img src=x onerror=alert(1)> garden", description="lt & gt"))
+    db.session.commit()
+
+    # Act
+    response = client.get("/tasks/search?q=garden lt")
+    response_body = response.get_json()
+
+    # Assert
+    assert response.status_code == 200
+    assert response_body["results"][0]["title"] == "<img src=x onerror=alert(1)> garden"
+    assert response_body["results"][0]["highlights"] == {
+        "title": "&lt;img src=x onerror=alert(1)&gt; <mark>garden</mark>",
+        "description": "<mark>lt</mark> &amp; gt"
+    }
+
+
+def test_postgres_headlines_are_built_from_escaped_text():
+    # Act
+    sql = str(escape_html(Task.title).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    # Assert
+    assert sql.startswith("replace(replace(replace(replace(replace(task.title, '&', '&amp;')")
@@ -0,0 +1,82 @@
+from app import create_app
+from app.db import db
+from app.json_provider import OrjsonProvider
+from app.models.goal import Goal
+from app.models.task import Task
+from app.serializers import GOAL_TASK_FIELDS, columns, serialize_task_rows
+from datetime import datetime
+from flask.json.provider import DefaultJSONProvider
+
+
+def test_task_to_dict_with_goal(app, one_task_belongs_to_one_goal):
+    # Act
+    task_dict = db.session.get(Task, 1).to_dict()
+
+    # Assert
+    assert task_dict == {
+        "id": 1,
+        "goal_id": 1,
+        "title": "Go on my daily walk 🏞",
+        "description": "Notice something new every day",
+        "is_complete": False
+    }
+
+
+def test_goal_to_dict(app, one_goal):
+    # Act
+    goal_dict = db.session.get(Goal, 1).to_dict()
+
+    # Assert
+    assert goal_dict == {"id": 1, "title": "Build a habit of going outside daily"}
+
+
+def test_serialize_task_rows_matches_to_dict(app, completed_task):
+    # Act
+    rows = db.session.execute(db.select(*columns(Task, GOAL_TASK_FIELDS)))
+
+    # Assert
+    assert serialize_task_rows(rows) == [db.session.get(Task, 1).to_dict()]
+
+
+def test_list_completed_task_is_complete_is_a_boolean(client, completed_task):
+    # Act
+    response = client.get("/tasks")
+
+    # Assert
+    assert response.get_json()[0]["is_complete"] == True
+
+
+def test_update_task_response_is_complete(client, completed_task):
+    # Act
+    response = client.put("/tasks/1", json={"title": "Updated Task Title", "description": "Updated Test Description"})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json()["task"]["is_complete"] == True
+
+
+def test_orjson_provider_matches_default(app):
+    # Arrange
+    value = {"b": [1, 2.5, None], "a": "Water the garden 🌷", "when": datetime(2024, 1, 2, 3, 4, 5)}
+
+    # Act
+    fast = OrjsonProvider(app)
+    default = DefaultJSONProvider(app)
+
+    # Assert
+    assert isinstance(app.json, OrjsonProvider)
+    assert fast.loads(fast.dumps(value)) == default.loads(default.dumps(value))
+    assert list(fast.loads(fast.dumps(value))) == ["a", "b", "when"]
+
+
+def test_default_json_provider_from_config():
+    # Act
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "SLACK_NOTIFICATIONS_ENABLED": False,
+        "JSON_PROVIDER": "default"
+    })
+
+    # Assert
+    assert type(app.json) is DefaultJSONProvider
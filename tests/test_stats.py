@@ -0,0 +1,214 @@
+from app.commands import recount_goals
+from app.db import db
+from app.models.goal import Goal
+from app.models.task import Task
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+import pytest
+
+
+@pytest.fixture
+def goal_with_tasks(app):
+    db.session.add_all([Goal(title="Embrace the gardening life"), Goal(title="Self-care")])
+    db.session.add_all([
+        Task(title="Water the garden 🌷", description="", goal_id=1, completed_at=datetime(2024, 1, 1, 9)),
+        Task(title="Plant tomatoes", description="", goal_id=1, completed_at=datetime(2024, 1, 1, 18)),
+        Task(title="Weed the beds", description="", goal_id=1, completed_at=datetime(2024, 1, 3, 12)),
+        Task(title="Mow the lawn", description="", goal_id=1),
+        Task(title="Take a bath", description="", goal_id=2),
+        Task(title="Answer forgotten email 📧", description="", completed_at=datetime(2024, 1, 2))
+    ])
+    db.session.commit()
+
+
+def goal_counters(goal_id):
+    db.session.expire_all()
+    goal = db.session.get(Goal, goal_id)
+    return goal.task_count, goal.completed_count
+
+
+def test_task_stats(client, goal_with_tasks):
+    # Act
+    response = client.get("/tasks/stats")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json() == {"stats": {
+        "total": 6,
+        "completed": 4,
+        "incomplete": 2,
+        "completion_rate": 0.6667,
+        "completions_per_day": [
+            {"date": "2024-01-01", "count": 2},
+            {"date": "2024-01-02", "count": 1},
+            {"date": "2024-01-03", "count": 1}
+        ]
+    }}
+
+
+def test_task_stats_since(client, goal_with_tasks):
+    # Act
+    response = client.get("/tasks/stats?since=2024-01-02")
+
+    # Assert
+    assert response.get_json()["stats"]["completions_per_day"] == [
+        {"date": "2024-01-02", "count": 1},
+        {"date": "2024-01-03", "count": 1}
+    ]
+    assert response.get_json()["stats"]["total"] == 6
+
+
+def test_task_stats_invalid_since(client):
+    # Act
+    response = client.get("/tasks/stats?since=yesterday")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.get_json() == {"message": "invalid since"}
+
+
+def test_task_stats_no_tasks(client):
+    # Act
+    response = client.get("/tasks/stats")
+
+    # Assert
+    assert response.get_json()["stats"] == {
+        "total": 0, "completed": 0, "incomplete": 0, "completion_rate": 0.0, "completions_per_day": []
+    }
+
+
+@pytest.mark.parametrize("use_counters", [True, False])
+def test_goal_stats(app, client, goal_with_tasks, use_counters):
+    # Arrange
+    app.config["STATS_USE_COUNTERS"] = use_counters
+
+    # Act
+    response = client.get("/goals/1/stats")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_json() == {"id": 1, "stats": {
+        "total": 4,
+        "completed": 3,
+        "incomplete": 1,
+        "completion_rate": 0.75,
+        "completions_per_day": [
+            {"date": "2024-01-01", "count": 2},
+            {"date": "2024-01-03", "count": 1}
+        ]
+    }}
+
+
+def test_goal_stats_not_found(client):
+    # Act
+    response = client.get("/goals/1/stats")
+
+    # Assert
+    assert response.status_code == 404
+    assert response.get_json() == {"message": "Goal not found"}
+
+
+def test_goal_stats_not_modified_until_a_task_changes(client, goal_with_tasks):
+    # Arrange
+    etag = client.get("/goals/1/stats").headers["ETag"]
+
+    # Act
+    unchanged = client.get("/goals/1/stats", headers={"If-None-Match": etag})
+    client.patch("/tasks/4/mark_complete")
+    changed = client.get("/goals/1/stats", headers={"If-None-Match": etag})
+
+    # Assert
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert changed.get_json()["stats"]["completed"] == 4
+
+
+def test_counters_follow_mark_complete_and_incomplete(client, goal_with_tasks):
+    # Act
+    client.patch("/tasks/4/mark_complete")
+    client.patch("/tasks/4/mark_complete")
+    after_complete = goal_counters(1)
+    client.patch("/tasks/1/mark_incomplete")
+    client.patch("/tasks/1/mark_incomplete")
+
+    # Assert
+    assert after_complete == (4, 4)
+    assert goal_counters(1) == (4, 3)
+
+
+@pytest.mark.parametrize("url", ["/tasks/4/mark_complete", "/tasks/1/mark_incomplete"])
+def test_mark_locks_the_task_it_reads(app, client, goal_with_tasks, url):
+    # Arrange
+    # sqlite has no row locks, so the task query is checked as postgres would get it
+    statements = []
+
+    @event.listens_for(db.session, "do_orm_execute")
+    def record(orm_execute_state):
+        statements.append(str(orm_execute_state.statement.compile(dialect=postgresql.dialect())))
+
+    # Act
+    client.patch(url)
+
+    # Assert
+    event.remove(db.session, "do_orm_execute", record)
+    task_selects = [statement for statement in statements if statement.startswith("SELECT task.")]
+    assert task_selects and task_selects[0].endswith("FOR UPDATE")
+
+
+def test_counters_follow_deletes(client, goal_with_tasks):
+    # Act
+    client.delete("/tasks/1")
+    client.delete("/tasks/bulk", json={"task_ids": [2, 4, 5]})
+
+    # Assert
+    assert goal_counters(1) == (1, 1)
+    assert goal_counters(2) == (0, 0)
+
+
+def test_counters_follow_tasks_linked_to_another_goal(client, goal_with_tasks):
+    # Act
+    response = client.post("/goals/2/tasks", json={"task_ids": [1, 4, 5, 6]})
+
+    # Assert
+    assert response.status_code == 200
+    assert goal_counters(1) == (2, 2)
+    assert goal_counters(2) == (4, 2)
+
+
+def test_counters_follow_orm_writes(app, goal_with_tasks):
+    # Act
+    goal = db.session.get(Goal, 2)
+    goal.tasks.append(db.session.get(Task, 1))
+    db.session.add(Task(title="Read a book", description="", goal=goal, completed_at=datetime(2024, 1, 5)))
+    db.session.commit()
+
+    # Assert
+    assert goal_counters(1) == (3, 2)
+    assert goal_counters(2) == (3, 2)
+
+
+def test_counters_are_not_changed_by_a_rollback(app, goal_with_tasks):
+    # Act
+    db.session.get(Task, 4).completed_at = datetime.utcnow()
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+
+    # Assert
+    assert goal_counters(1) == (4, 3)
+
+
+def test_recount_command_repairs_counters(app, goal_with_tasks):
+    # Arrange
+    db.session.execute(db.update(Goal).values(task_count=100, completed_count=100))
+    db.session.commit()
+
+    # Act
+    result = app.test_cli_runner().invoke(recount_goals)
+
+    # Assert
+    assert result.exit_code == 0
+    assert "Recounted the tasks of 2 goals" in result.output
+    assert goal_counters(1) == (4, 3)
+    assert goal_counters(2) == (1, 0)
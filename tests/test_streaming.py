@@ -0,0 +1,78 @@
+import json
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_tasks_with_query_param(client, three_tasks):
+    # Act
+    response = client.get("/tasks?stream=1")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert read_ndjson(response) == [
+        {"id": 1, "title": "Water the garden 🌷", "description": "", "is_complete": False},
+        {"id": 2, "title": "Answer forgotten email 📧", "description": "", "is_complete": False},
+        {"id": 3, "title": "Pay my outstanding tickets 😭", "description": "", "is_complete": False}
+    ]
+
+
+def test_stream_tasks_with_accept_header(client, three_tasks):
+    # Act
+    response = client.get("/tasks?sort=asc", headers={"Accept": "application/x-ndjson"})
+
+    # Assert
+    assert response.mimetype == "application/x-ndjson"
+    assert [task["id"] for task in read_ndjson(response)] == [2, 3, 1]
+
+
+def test_stream_tasks_filter_title(client, three_tasks):
+    # Act
+    response = client.get("/tasks?stream=1&title=garden")
+
+    # Assert
+    assert [task["id"] for task in read_ndjson(response)] == [1]
+
+
+def test_stream_no_saved_tasks(client):
+    # Act
+    response = client.get("/tasks?stream=1")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.get_data() == b""
+
+
+def test_json_is_still_default(client, three_tasks):
+    # Act
+    response = client.get("/tasks", headers={"Accept": "*/*"})
+
+    # Assert
+    assert response.mimetype == "application/json"
+    assert len(response.get_json()) == 3
+
+
+def test_stream_tasks_for_goal(client, one_task_belongs_to_one_goal):
+    # Act
+    response = client.get("/goals/1/tasks?stream=1")
+
+    # Assert
+    assert response.status_code == 200
+    assert read_ndjson(response) == [{
+        "id": 1,
+        "goal_id": 1,
+        "title": "Go on my daily walk 🏞",
+        "description": "Notice something new every day",
+        "is_complete": False
+    }]
+
+
+def test_stream_tasks_for_missing_goal(client):
+    # Act
+    response = client.get("/goals/1/tasks?stream=1")
+
+    # Assert
+    assert response.status_code == 404
+    assert response.get_json() == {"message": "Goal not found"}
@@ -113,3 +113,46 @@ def test_get_task_includes_goal_id(client, one_task_belongs_to_one_goal):
             "is_complete": False
         }
     }
+
+
+def test_post_task_ids_to_goal_reports_missing_tasks(client, one_goal, three_tasks):
+    # Act
+    response = client.post("/goals/1/tasks", json={
+        "task_ids": [3, 99, 1]
+    })
+    response_body = response.get_json()
+
+    # Assert
+    assert response.status_code == 200
+    assert response_body == {
+        "id": 1,
+        "task_ids": [3, 1],
+        "missing_task_ids": [99]
+    }
+    assert sorted(task.id for task in Goal.query.get(1).tasks) == [1, 3]
+
+
+def test_post_task_ids_to_missing_goal(client, three_tasks):
+    # Act
+    response = client.post("/goals/1/tasks", json={
+        "task_ids": [1, 2]
+    })
+    response_body = response.get_json()
+
+    # Assert
+    assert response.status_code == 404
+    assert response_body == {"message": "Goal not found"}
+
+
+def test_post_task_ids_to_goal_in_chunks(app, client, one_goal, three_tasks):
+    # Arrange
+    app.config["BULK_CHUNK_SIZE"] = 2
+
+    # Act
+    response = client.post("/goals/1/tasks", json={
+        "task_ids": [1, 2, 3]
+    })
+
+    # Assert
+    assert response.get_json() == {"id": 1, "task_ids": [1, 2, 3]}
+    assert len(Goal.query.get(1).tasks) == 3
@@ -0,0 +1,9 @@
+# the WSGI entry point for production servers:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# with preload_app on (see gunicorn.conf.py) this module is imported once in the gunicorn
+# master and the workers are forked from it, sharing the imported code copy-on-write.
+from app import create_app
+
+app = create_app()